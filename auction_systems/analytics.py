@@ -0,0 +1,130 @@
+# analytics.py - post-auction analytics report (NumPy vectorized)
+
+import numpy as np
+
+# Quantiles reported for the price distribution of each game level
+PRICE_QUANTILES = (0.25, 0.5, 0.75)
+
+
+def _grouped_quantiles(sorted_values, starts, counts, q):
+    """Linear-interpolated quantile for every group of an already sorted array.
+
+    `sorted_values` must be sorted by (group, value); `starts`/`counts` give the
+    slice of each group. All groups are computed in one vectorized pass.
+    """
+    pos = starts + (counts - 1) * q
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    frac = pos - lo
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * frac
+
+
+def build_report(sales, teams, total_players, unsold_count):
+    """Build the analytics report.
+
+    sales:  rows of (winning_team_id, sold_price, base_price, game_level)
+    teams:  rows of (id, name, budget)
+    total_players: registered players (bidders with a base price)
+    unsold_count:  auctions currently marked 'Unsold'
+    """
+    n_sales = len(sales)
+    team_ids = np.fromiter((row[0] for row in sales), dtype=np.int64, count=n_sales)
+    prices = np.fromiter((row[1] for row in sales), dtype=np.float64, count=n_sales)
+    base = np.fromiter((row[2] if row[2] is not None else np.nan for row in sales), dtype=np.float64, count=n_sales)
+    levels = np.array([row[3] or 'Unknown' for row in sales], dtype=object)
+
+    # --- Premium over base price ---
+    has_base = ~np.isnan(base)
+    premium = prices[has_base] - base[has_base]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        premium_pct = np.where(base[has_base] > 0, premium / base[has_base] * 100.0, np.nan)
+    premium_pct = premium_pct[~np.isnan(premium_pct)]
+
+    premium_summary = {
+        'players': int(premium.size),
+        'total_premium': float(premium.sum()) if premium.size else 0.0,
+        'mean_premium': float(premium.mean()) if premium.size else 0.0,
+        'median_premium': float(np.median(premium)) if premium.size else 0.0,
+        'max_premium': float(premium.max()) if premium.size else 0.0,
+        'mean_premium_pct': float(premium_pct.mean()) if premium_pct.size else 0.0,
+        'median_premium_pct': float(np.median(premium_pct)) if premium_pct.size else 0.0,
+    }
+
+    # --- Spend and budget utilization per team ---
+    n_teams = len(teams)
+    t_ids = np.fromiter((row[0] for row in teams), dtype=np.int64, count=n_teams)
+    t_budget = np.fromiter((row[2] or 0.0 for row in teams), dtype=np.float64, count=n_teams)
+
+    # Map winning_team_id -> position in the teams array; sales for teams that
+    # no longer exist are dropped from the per-team view.
+    order = np.argsort(t_ids)
+    pos = np.searchsorted(t_ids, team_ids, sorter=order) if n_teams else np.zeros(n_sales, dtype=np.int64)
+    pos = np.clip(pos, 0, max(n_teams - 1, 0))
+    known = (t_ids[order[pos]] == team_ids) if n_teams else np.zeros(n_sales, dtype=bool)
+    team_pos = order[pos[known]]
+
+    spend = np.bincount(team_pos, weights=prices[known], minlength=n_teams)
+    bought = np.bincount(team_pos, minlength=n_teams)
+    team_premium = np.bincount(team_pos, weights=np.where(has_base, prices - np.nan_to_num(base), 0.0)[known], minlength=n_teams)
+    starting = spend + t_budget
+    with np.errstate(divide='ignore', invalid='ignore'):
+        utilization = np.where(starting > 0, spend / starting * 100.0, 0.0)
+        avg_price = np.where(bought > 0, spend / np.maximum(bought, 1), 0.0)
+
+    by_team = [
+        {
+            'team_id': int(t_ids[i]),
+            'team_name': teams[i][1],
+            'players_bought': int(bought[i]),
+            'spend': float(spend[i]),
+            'avg_price': float(avg_price[i]),
+            'premium_paid': float(team_premium[i]),
+            'budget_remaining': float(t_budget[i]),
+            'budget_utilization_pct': float(utilization[i]),
+        }
+        for i in np.argsort(-spend, kind='stable')
+    ]
+
+    # --- Price distribution by game_level ---
+    by_level = []
+    if n_sales:
+        level_names, level_codes = np.unique(levels.astype(str), return_inverse=True)
+        sort_idx = np.lexsort((prices, level_codes))
+        sorted_prices = prices[sort_idx]
+        counts = np.bincount(level_codes, minlength=level_names.size)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        sums = np.bincount(level_codes, weights=prices, minlength=level_names.size)
+        mins = sorted_prices[starts]
+        maxs = sorted_prices[starts + counts - 1]
+        quantiles = {q: _grouped_quantiles(sorted_prices, starts, counts, q) for q in PRICE_QUANTILES}
+        for i, name in enumerate(level_names):
+            by_level.append({
+                'game_level': str(name),
+                'sold': int(counts[i]),
+                'total': float(sums[i]),
+                'mean': float(sums[i] / counts[i]),
+                'min': float(mins[i]),
+                'p25': float(quantiles[0.25][i]),
+                'median': float(quantiles[0.5][i]),
+                'p75': float(quantiles[0.75][i]),
+                'max': float(maxs[i]),
+            })
+
+    # --- Unsold rate ---
+    closed = n_sales + unsold_count
+    summary = {
+        'total_players': int(total_players),
+        'sold_players': n_sales,
+        'unsold_players': int(unsold_count),
+        'unsold_rate_pct': float(unsold_count / closed * 100.0) if closed else 0.0,
+        'not_yet_auctioned': max(int(total_players) - closed, 0),
+        'total_spend': float(prices.sum()) if n_sales else 0.0,
+        'mean_price': float(prices.mean()) if n_sales else 0.0,
+    }
+
+    return {
+        'summary': summary,
+        'premium': premium_summary,
+        'by_team': by_team,
+        'by_game_level': by_level,
+    }
@@ -1,37 +1,283 @@
 # app.py - FINAL, SECURED AND STABLE VERSION (PostgreSQL Compatible)
 
-from flask import Flask, render_template, request, redirect, url_for, session, g
+import time
+# Cold-start measurement, reported once module startup finishes
+BOOT_STARTED = time.perf_counter()
+
+from flask import Flask, render_template, request, redirect, url_for, session, g, jsonify, has_request_context
 from flask_socketio import SocketIO, emit, join_room, leave_room
-import sqlite3
 # सुरक्षा के लिए पासवर्ड हैशिंग लाइब्रेरी
 from werkzeug.security import generate_password_hash, check_password_hash
 import functools
-import time
-from threading import Timer
-from datetime import datetime, timedelta
+import click
+from datetime import datetime, timedelta, timezone
+import gzip
+import hashlib
 import io
 import csv
-from flask import Response
+from flask import Response, send_file
 import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import json
+import queue
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from clock import RealClock
+import proxy_bidding
+import query_trace
+import settings_cache
+import player_index
+import storage
+import backup
+import sampler
 
 app = Flask(__name__)
 # सीक्रेट की (इसे प्रोडक्शन में बदलें!)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'a_very_secure_random_string_for_development')
-socketio = SocketIO(app)
+# Compact Socket.IO frames: msgpack, short field keys, money in integer paise (see wire.py)
+SOCKETIO_COMPACT = os.getenv('SOCKETIO_COMPACT', '0') == '1'
+# Spectator tier: anonymous viewers connect to the read-only /spectate namespace and
+# get one aggregated snapshot per event every SPECTATOR_TICK_SECONDS. SPECTATOR_WORKER=1
+# makes a process serve only spectators; run those separately and route
+# /SPECTATOR_SOCKETIO_PATH/ to them, so viewers never share a worker with bidders.
+SPECTATOR_TICK_SECONDS = float(os.getenv('SPECTATOR_TICK_SECONDS', 1.0))
+SPECTATOR_WORKER = os.getenv('SPECTATOR_WORKER', '0') == '1'
+SPECTATOR_SOCKETIO_PATH = os.getenv('SPECTATOR_SOCKETIO_PATH', 'socket.io')
+SPECTATOR_NAMESPACE = '/spectate'
+SPECTATOR_ACTIVITY_LIMIT = 20
+# Response compression: HTML, JSON, CSV, JS and CSS bodies of at least COMPRESS_MIN_BYTES
+# are gzipped (brotli when the optional `brotli` package is installed and the
+# browser accepts it). Socket.IO long-polling frames use the same threshold. Both happen
+# in the app, so they work the same under waitress (the Procfile), gunicorn or the dev server.
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+COMPRESS_MIMETYPES = {'text/html', 'application/json', 'text/csv', 'text/plain', 'text/css', 'text/javascript', 'application/javascript'}
+# Static files linked through asset_url() carry a content hash and are cached this long
+STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', 365 * 24 * 3600))
+socketio_options = {'path': SPECTATOR_SOCKETIO_PATH} if SPECTATOR_WORKER else {}
+socketio_options['compression_threshold'] = COMPRESS_MIN_BYTES
+if SOCKETIO_COMPACT:
+    import wire
+    socketio = SocketIO(app, serializer=wire.CompactPacket, **socketio_options)
+else:
+    socketio = SocketIO(app, **socketio_options)
+
+@app.context_processor
+def inject_socket_wire():
+    # Pages with a socket include _socket_wire.html, which decodes compact frames
+    return {'socket_wire': wire.client_schema() if SOCKETIO_COMPACT else None}
+
+# --- Compression and Static Assets ---
+# Page scripts live in static/js and are linked with asset_url(), whose ?v= is a
+# hash of the file: the URL changes with the content, so the file can be cached
+# for STATIC_MAX_AGE and repeat page loads only fetch the HTML.
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+asset_hashes = {}  # filename -> (mtime, content hash)
+compressed_assets = {}  # (path, etag, encoding) -> compressed body of a static file
+
+@app.template_global()
+def asset_url(filename):
+    path = os.path.join(app.static_folder, filename)
+    mtime = os.path.getmtime(path)
+    cached = asset_hashes.get(filename)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as f:
+            cached = asset_hashes[filename] = (mtime, hashlib.sha1(f.read()).hexdigest()[:12])
+    return url_for('static', filename=filename, v=cached[1])
+
+def compress_body(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, COMPRESS_LEVEL, mtime=0)
+
+@app.after_request
+def compress_response(response):
+    # Registered first, so it runs after every other after_request hook
+    if request.endpoint == 'static' and request.args.get('v') and response.status_code in (200, 304):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+    if (response.status_code != 200 or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESS_MIMETYPES or response.is_streamed and not response.direct_passthrough):
+        return response
+    response.vary.add('Accept-Encoding')
+    encodings = request.accept_encodings
+    encoding = 'br' if brotli is not None and encodings['br'] else 'gzip' if encodings['gzip'] else None
+    if encoding is None or (response.content_length is not None and response.content_length < COMPRESS_MIN_BYTES):
+        return response
+
+    if response.direct_passthrough:
+        # A static file: compress it once per version
+        key = (request.path, response.get_etag()[0], encoding)
+        body = compressed_assets.get(key)
+        if body is None:
+            response.direct_passthrough = False
+            body = compressed_assets[key] = compress_body(response.get_data(), encoding)
+        elif hasattr(response.response, 'close'):
+            response.response.close()
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_BYTES:
+            return response
+        body = compress_body(data, encoding)
+    response.direct_passthrough = False
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # Same resource, different bytes: a strong ETag would be wrong; If-None-Match still matches a weak one
+        response.set_etag(etag, weak=True)
+    return response
 
 # --- Database Setup ---
 
 DATABASE = 'auction.db'
 DATABASE_URL = os.getenv('DATABASE_URL')
-# ऑक्शन के लिए टाइमर की अवधि
-BID_DURATION = 15 # सेकंड में बिड की अवधि
-NO_BID_DURATION = 120 # सेकंड में, अगर कोई बोली नहीं लगती है
 
-# ऑक्शन ID के अनुसार एक्टिव बिड को ट्रैक करें
+# 'sql' keeps data in SQLite or PostgreSQL (DATABASE_URL); 'memory' keeps it in
+# this process only (memory_storage.py), for simulations and load tests of the app
+# logic without database I/O. Memory data is lost when the process exits.
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sql')
+
+# Only the driver for the configured database is imported
+if DATABASE_URL:
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+else:
+    import sqlite3
+
+# Bump whenever init_db() gains new tables, columns or migrations
+SCHEMA_VERSION = 5
+# Teams, auctions and players belong to an auction event (league). Databases from
+# before events existed are migrated into this one, which is also the default.
+DEFAULT_EVENT_ID = 1
+# Run init-db automatically when a worker finds an out-of-date schema.
+# Set to 0 in production and run 'flask init-db' as a release step instead.
+AUTO_MIGRATE = os.getenv('AUTO_MIGRATE', '1') == '1'
+# Optional PostgreSQL read replica for dashboards and exports
+DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+# After a user's own write, their reads stay on the primary for this long
+REPLICA_STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', 5))
+# ऑक्शन के लिए टाइमर की अवधि
+BID_DURATION = int(os.getenv('BID_DURATION', 15)) # सेकंड में बिड की अवधि
+NO_BID_DURATION = int(os.getenv('NO_BID_DURATION', 120)) # सेकंड में, अगर कोई बोली नहीं लगती है
+# Bulk re-auction: the no-bid deadlines of the batch are spaced this far apart,
+# so the players come up (and close) one after another instead of all at once
+REAUCTION_STAGGER_SECONDS = float(os.getenv('REAUCTION_STAGGER_SECONDS', 10))
+# Step used when a max (proxy) bid outbids a rival; matches the feed's minimum raise
+BID_INCREMENT = float(os.getenv('BID_INCREMENT', 100))
+# Most expired auctions the settlement worker closes in one transaction
+SETTLEMENT_BATCH_MAX = int(os.getenv('SETTLEMENT_BATCH_MAX', 100))
+# Player sign-ups are group-committed: the intake worker waits up to
+# REGISTRATION_BATCH_WAIT_MS for more sign-ups, up to REGISTRATION_BATCH_MAX per commit
+REGISTRATION_BATCH_MAX = int(os.getenv('REGISTRATION_BATCH_MAX', 50))
+REGISTRATION_BATCH_WAIT_MS = float(os.getenv('REGISTRATION_BATCH_WAIT_MS', 20))
+# Bulk team provisioning: most teams per upload, and threads hashing their passwords
+# (the hash releases the GIL, so they run in parallel)
+BULK_TEAMS_MAX = int(os.getenv('BULK_TEAMS_MAX', 256))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 4))
+# The player search index is updated in place by this worker; it is rebuilt from
+# the database when older than this, to pick up changes made by other workers
+PLAYER_INDEX_MAX_AGE = float(os.getenv('PLAYER_INDEX_MAX_AGE', 60))
+# Most players one search returns
+PLAYER_SEARCH_MAX_LIMIT = 200
+
+# Tuned SQLite mode: WAL journal, pooled read connections and a single
+# group-committing writer thread (see sqlite_writer.py). Ignored on PostgreSQL.
+SQLITE_TUNED = os.getenv('SQLITE_TUNED', '0') == '1'
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+SQLITE_READ_POOL_SIZE = int(os.getenv('SQLITE_READ_POOL_SIZE', 8))
+SQLITE_GROUP_COMMIT_MAX = int(os.getenv('SQLITE_GROUP_COMMIT_MAX', 64))
+# Longest a committed write waits for the next session's statements before committing without it
+SQLITE_GROUP_COMMIT_WAIT_MS = float(os.getenv('SQLITE_GROUP_COMMIT_WAIT_MS', 2))
+
+# Per-request query tracing (see query_trace.py), off unless QUERY_TRACE=1: it times every
+# statement. A statement run QUERY_REPEAT_THRESHOLD times in one request/socket event is
+# reported as a likely N+1; statements slower than SLOW_QUERY_MS go to SLOW_QUERY_LOG
+# (JSON lines) or stdout.
+QUERY_TRACE = os.getenv('QUERY_TRACE', '0') == '1'
+QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', 5))
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG')
+# Add X-Query-Count / X-Query-Time-Ms headers to every HTTP response (needs QUERY_TRACE=1)
+QUERY_DEBUG_HEADER = os.getenv('QUERY_DEBUG_HEADER', '0') == '1'
+# On-demand sampling profiler (/admin/profile, see sampler.py): longest run allowed
+# and the default gap between samples
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', 60))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 10))
+# system_settings are cached per worker. PostgreSQL workers are told about changes
+# with LISTEN/NOTIFY; SQLite workers drop their copy every SETTINGS_POLL_SECONDS.
+SETTINGS_CHANNEL = 'settings_changed'
+SETTINGS_POLL_SECONDS = float(os.getenv('SETTINGS_POLL_SECONDS', 5))
+
+# ऑक्शन ID के अनुसार एक्टिव बिड को ट्रैक करें, one shard per event:
+# event_id -> {auction_id: {'thread': timer, 'end_time': deadline}}
 active_bids = {} 
 
+# Source of time for auction deadlines and timers. The replay harness swaps in
+# a VirtualClock so timers fire deterministically (see set_clock / replay.py).
+clock = RealClock()
+
+# Maximum bids registered per auction, resolved in memory by proxy_bidding.resolve
+proxy_book = proxy_bidding.ProxyBook()
+
+# Optional event log for record-and-replay: RECORD_EVENTS=/path/to/events.jsonl
+RECORD_EVENTS = os.getenv('RECORD_EVENTS')
+event_recorder = None
+if RECORD_EVENTS:
+    from replay import EventRecorder
+    event_recorder = EventRecorder(RECORD_EVENTS, clock)
+
+# Admin player search (see /admin/players/search), loaded on first use
+player_search = player_index.PlayerIndex()
+player_search_loaded_at = None
+player_search_lock = threading.Lock()
+
+# Analytics report cache per event: event_id -> (fingerprint, report),
+# reused until the next sale changes the data
+analytics_cache = {}
+analytics_lock = threading.Lock()
+
+# CSV exports per event: (event_id, export) -> (data_version, body, etag, built_at)
+export_cache = {}
+export_lock = threading.Lock()
+
+slow_query_log = query_trace.SlowQueryLog(SLOW_QUERY_MS, SLOW_QUERY_LOG) if QUERY_TRACE else None
+
+# username -> time of their last Socket.IO write (HTTP writes use the session cookie).
+# Entries older than REPLICA_STICKY_SECONDS are pruned on every write.
+recent_writers = {}
+recent_writers_lock = threading.Lock()
+
+sqlite_engine = None
+sqlite_engine_lock = threading.Lock()
+
+def get_sqlite_engine():
+    """Start the tuned SQLite engine (writer thread + read pool) on first use."""
+    global sqlite_engine
+    with sqlite_engine_lock:
+        if sqlite_engine is None:
+            import sqlite_writer
+            sqlite_engine = sqlite_writer.SQLiteEngine(
+                DATABASE,
+                busy_timeout_ms=SQLITE_BUSY_TIMEOUT_MS,
+                mmap_size=SQLITE_MMAP_SIZE,
+                cache_size_kb=SQLITE_CACHE_SIZE_KB,
+                read_pool_size=SQLITE_READ_POOL_SIZE,
+                max_batch=SQLITE_GROUP_COMMIT_MAX,
+                group_wait=SQLITE_GROUP_COMMIT_WAIT_MS / 1000.0,
+            )
+    return sqlite_engine
+
 def get_db_connection():
     """डेटाबेस कनेक्शन प्राप्त करें।"""
     if DATABASE_URL:
@@ -41,19 +287,148 @@ def get_db_connection():
     else:
         conn = getattr(g, '_database', None)
         if conn is None:
-            conn = g._database = sqlite3.connect(DATABASE)
-            conn.row_factory = sqlite3.Row
+            if SQLITE_TUNED:
+                # Reads use a pooled connection, writes go through the writer thread
+                conn = g._database = get_sqlite_engine().connect()
+            else:
+                conn = g._database = sqlite3.connect(DATABASE)
+                conn.row_factory = sqlite3.Row
+    return conn
+
+def get_read_connection(stale_ok=False):
+    """Connection for read-only pages and exports.
+
+    Uses the replica when DATABASE_REPLICA_URL is set, except for a user who
+    wrote within the last REPLICA_STICKY_SECONDS (read-your-writes) or when
+    the replica is unreachable. `stale_ok` readers (spectator snapshots) always
+    take the replica, since they have no writes of their own to see.
+    """
+    if not (DATABASE_URL and DATABASE_REPLICA_URL) or (not stale_ok and wrote_recently()):
+        return get_db_connection()
+    conn = getattr(g, '_database_replica', None)
+    if conn is None:
+        try:
+            conn = g._database_replica = psycopg2.connect(DATABASE_REPLICA_URL)
+            conn.set_session(readonly=True, autocommit=True)
+        except psycopg2.OperationalError as e:
+            print(f"Replica unavailable, reading from primary: {e}")
+            return get_db_connection()
     return conn
 
+def wrote_recently():
+    """True if the current user wrote within the read-your-writes window."""
+    if not has_request_context():
+        return True
+    last_write = max(session.get('_last_write_at', 0), recent_writers.get(session.get('username'), 0))
+    return time.time() - last_write < REPLICA_STICKY_SECONDS
+
+def mark_user_write():
+    """Pin the current user's reads to the primary for REPLICA_STICKY_SECONDS."""
+    now = time.time()
+    session['_last_write_at'] = now
+    username = session.get('username')
+    if username:
+        with recent_writers_lock:
+            for writer, last_write in list(recent_writers.items()):
+                if now - last_write >= REPLICA_STICKY_SECONDS:
+                    del recent_writers[writer]
+            recent_writers[username] = now
+
+@app.after_request
+def track_user_writes(response):
+    # Every POST route writes to the primary
+    if DATABASE_REPLICA_URL and request.method == 'POST':
+        mark_user_write()
+    return response
+
+def set_clock(new_clock):
+    """Replace the clock used for auction timers and deadlines."""
+    global clock
+    clock = new_clock
+
+def record_event(kind, **fields):
+    if event_recorder is not None:
+        event_recorder.record(kind, **fields)
+
+@app.before_request
+def spectator_worker_routes():
+    # A spectator worker serves the watch page and nothing else
+    if SPECTATOR_WORKER and request.endpoint not in ('watch', 'static'):
+        return "Not Found", 404
+
+@app.before_request
+def record_http_action():
+    # Admin actions, registrations and logins are all POSTs
+    if event_recorder is not None and request.method == 'POST':
+        event_recorder.record_request(request, session)
+
+def auction_deadline(duration):
+    """Deadline `duration` seconds from now on the auction clock (stored as auctions.ends_at)."""
+    return round(clock.now() + duration, 3)
+
+def schedule_auction_timer(event_id, auction_id, ends_at, callback):
+    """(Re)start an auction's timer on the current clock so it fires at `ends_at`."""
+    timers = active_bids.setdefault(event_id, {})
+    if auction_id in timers:
+        timers[auction_id]['thread'].cancel()
+    timer = clock.call_later(max(0.0, ends_at - clock.now()), callback, auction_id)
+    timers[auction_id] = {'thread': timer, 'end_time': ends_at}
+
+def rearm_auction_timer(auction):
+    """Arm the timer of a live auction from its stored deadline (no-op for any other auction)."""
+    if auction and auction['status'] == 'live' and auction['ends_at'] is not None:
+        callback = end_bidding if auction['highest_bidding_team_id'] is not None else mark_as_unsold
+        schedule_auction_timer(auction['event_id'], auction['id'], auction['ends_at'], callback)
+
+def auction_deadlines(event_id):
+    """auction_id -> deadline (server clock, epoch seconds) of the event's running timers."""
+    return {auction_id: data['end_time'] for auction_id, data in list(active_bids.get(event_id, {}).items())}
+
 def get_dict_cursor(conn):
     """Get a cursor that returns rows as dictionaries."""
     if DATABASE_URL:
-        return conn.cursor(cursor_factory=RealDictCursor)
+        return trace_cursor(conn.cursor(cursor_factory=RealDictCursor))
     else:
         # For SQLite, we want the default row_factory to apply, 
         # so we just return a standard cursor.
         # The row_factory is set in get_db_connection for SQLite.
-        return conn.cursor()
+        return trace_cursor(conn.cursor())
+
+def get_query_trace():
+    """The QueryTrace for the current HTTP request, socket event or worker context."""
+    trace = getattr(g, '_query_trace', None)
+    if trace is None:
+        if not has_request_context():
+            label = 'background'
+        elif getattr(request, 'event', None):
+            # Flask-SocketIO sets request.event while a handler runs
+            label = f"socket:{request.event['message']}"
+        else:
+            label = f"{request.method} {request.endpoint or request.path}"
+        trace = g._query_trace = query_trace.QueryTrace(label)
+    return trace
+
+def trace_cursor(cur):
+    """Wrap a cursor so its statements are timed and counted for this request."""
+    if not QUERY_TRACE:
+        return cur
+    return query_trace.TracedCursor(cur, get_query_trace(), slow_query_log)
+
+@app.after_request
+def add_query_debug_header(response):
+    if QUERY_DEBUG_HEADER:
+        trace = getattr(g, '_query_trace', None)
+        response.headers['X-Query-Count'] = str(trace.count if trace else 0)
+        response.headers['X-Query-Time-Ms'] = f"{trace.total_ms if trace else 0.0:.2f}"
+    return response
+
+@app.teardown_appcontext
+def report_repeated_queries(exception):
+    trace = getattr(g, '_query_trace', None)
+    if trace is None:
+        return
+    for sql, times in trace.repeated(QUERY_REPEAT_THRESHOLD).items():
+        print(f"Possible N+1 in {trace.label}: ran {times}x: {sql}")
 
 @app.teardown_appcontext
 def close_connection(exception):
@@ -64,194 +439,120 @@ def close_connection(exception):
         conn = getattr(g, '_database', None)
     if conn is not None:
         conn.close()
+    replica = getattr(g, '_database_replica', None)
+    if replica is not None:
+        replica.close()
+
+# --- Storage ---
+# Every query lives in a storage backend (storage.py / memory_storage.py). The SQL
+# backends get their connections and cursors from the helpers above, so the read
+# replica, the tuned SQLite writer and query tracing apply to all of them.
+if STORAGE_BACKEND == 'memory':
+    import memory_storage
+    store = memory_storage.MemoryStorage()
+elif DATABASE_URL:
+    store = storage.PostgresStorage(get_db_connection, get_read_connection, get_dict_cursor, SETTINGS_CHANNEL)
+else:
+    store = storage.SQLiteStorage(get_db_connection, get_read_connection, get_dict_cursor)
+IntegrityError = store.IntegrityError
 
 # --- init_db Function ---
 def init_db():
     """डेटाबेस को इनिशियलाइज़ करें और टेबल बनाएं।"""
-    conn = get_db_connection()
-    cur = conn.cursor()
+    store.init_schema()
+    store.commit()
+
+def load_system_settings():
+    """Read the whole system_settings table ({} if it does not exist yet)."""
+    with app.app_context(): # own connection, also used from the listener thread
+        return store.load_settings()
+
+settings = settings_cache.SettingsCache(load_system_settings)
+
+def load_events():
+    """Read every auction event as {id: row} ({} if the table does not exist yet)."""
+    with app.app_context(): # own connection, also used from the listener thread
+        return store.load_events()
+
+# Event settings change as rarely as system_settings and are invalidated with them
+auction_events = settings_cache.SettingsCache(load_events)
+settings_watcher_pid = None
+settings_watcher_lock = threading.Lock()
+
+def watch_settings():
+    """Start this process's invalidation thread (once per worker, also after a fork)."""
+    global settings_watcher_pid
+    with settings_watcher_lock:
+        if settings_watcher_pid == os.getpid():
+            return
+        settings_watcher_pid = os.getpid()
+        if STORAGE_BACKEND == 'memory':
+            # One process holds all the data; writes invalidate the caches directly
+            return
+        if DATABASE_URL:
+            settings_cache.start_pg_listener(DATABASE_URL, SETTINGS_CHANNEL, invalidate_settings)
+        elif SETTINGS_POLL_SECONDS > 0:
+            settings_cache.start_poller(SETTINGS_POLL_SECONDS, invalidate_settings)
+
+def invalidate_settings():
+    settings.invalidate()
+    auction_events.invalidate()
+
+def get_setting(key, default=None):
+    """Cached system_settings value; no query unless the cache was invalidated."""
+    if settings_watcher_pid != os.getpid():
+        watch_settings()
+    return settings.get(key, default)
+
+def get_event(event_id):
+    """Cached events row as a dict, None if there is no such event."""
+    if settings_watcher_pid != os.getpid():
+        watch_settings()
+    return auction_events.get(event_id)
+
+def list_events():
+    if settings_watcher_pid != os.getpid():
+        watch_settings()
+    return list(auction_events.all().values())
+
+def get_schema_version():
+    """Return the stamped schema version, 0 for a fresh or pre-versioning database."""
+    # Also warms the settings cache, so startup still costs a single query
+    return int(settings.get('schema_version', 0))
+
+def bootstrap_db():
+    """Create the default admin user and settings, then stamp the schema version."""
+    # सुनिश्चित करें कि एक डिफ़ॉल्ट एडमिन यूज़र मौजूद है
+    with store.transaction():
+        if store.get_user('admin') is None:
+            hashed_password = generate_password_hash('adminpass')
+            store.add_user('admin', hashed_password, 'admin', is_approved=True)
 
-    if DATABASE_URL:
-        # --- PostgreSQL Syntax ---
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                username TEXT NOT NULL UNIQUE,
-                password TEXT NOT NULL,
-                role TEXT NOT NULL,
-                is_approved INTEGER NOT NULL DEFAULT 0,
-                team_id INTEGER,
-                can_bid INTEGER DEFAULT 0,
-                discord_name TEXT,
-                base_price REAL,
-                game_level TEXT
-            )
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS teams (
-                id SERIAL PRIMARY KEY,
-                name TEXT NOT NULL UNIQUE,
-                budget REAL NOT NULL DEFAULT 0
-            )
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS auctions (
-                id SERIAL PRIMARY KEY,
-                title TEXT NOT NULL,
-                current_price REAL NOT NULL,
-                highest_bidding_team_id INTEGER,
-                status TEXT NOT NULL
-            )
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS sold_players (
-                id SERIAL PRIMARY KEY,
-                player_name TEXT NOT NULL,
-                winning_team_id INTEGER NOT NULL,
-                sold_price REAL NOT NULL
-            )
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS activity_log (
-                id SERIAL PRIMARY KEY,
-                message TEXT NOT NULL,
-                timestamp TEXT NOT NULL
-            )
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS system_settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL
-            )
-        """)
-        # Add FOREIGN KEY constraints for PostgreSQL after tables are created
-        try:
-            cur.execute("ALTER TABLE users ADD CONSTRAINT fk_team_id FOREIGN KEY (team_id) REFERENCES teams (id)")
-        except psycopg2.Error:
-            pass # Constraint likely already exists
-        try:
-            cur.execute("ALTER TABLE auctions ADD CONSTRAINT fk_highest_bidding_team_id FOREIGN KEY (highest_bidding_team_id) REFERENCES teams (id)")
-        except psycopg2.Error:
-            pass # Constraint likely already exists
-        try:
-            cur.execute("ALTER TABLE sold_players ADD CONSTRAINT fk_winning_team_id FOREIGN KEY (winning_team_id) REFERENCES teams (id)")
-        except psycopg2.Error:
-            pass # Constraint likely already exists
+        # Registration window and default team budget live on each event (see init_db)
+        store.set_setting('schema_version', str(SCHEMA_VERSION))
+    invalidate_settings()
 
-    else:
-        # --- SQLite Syntax ---
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL UNIQUE,
-                password TEXT NOT NULL,
-                role TEXT NOT NULL, -- 'admin', 'bidder'
-                is_approved INTEGER NOT NULL DEFAULT 0,
-                team_id INTEGER,
-                can_bid INTEGER DEFAULT 0,
-                discord_name TEXT,
-                base_price REAL,
-                game_level TEXT,
-                FOREIGN KEY (team_id) REFERENCES teams (id)
-            )
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS teams (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                budget REAL NOT NULL DEFAULT 0
-            )
-        """)
-        # Check if 'budget' column exists in 'teams' table and add it if not
-        cursor_pragma = conn.execute("PRAGMA table_info(teams)")
-        columns = [col[1] for col in cursor_pragma.fetchall()]
-        if 'budget' not in columns:
-            cur.execute("ALTER TABLE teams ADD COLUMN budget REAL NOT NULL DEFAULT 0")
-            print("Added 'budget' column to 'teams' table.") # For debugging
-        
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS auctions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                current_price REAL NOT NULL,
-                highest_bidding_team_id INTEGER,
-                status TEXT NOT NULL, -- 'live' or 'closed'
-                FOREIGN KEY (highest_bidding_team_id) REFERENCES teams (id)
-            )
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS sold_players (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                player_name TEXT NOT NULL,
-                winning_team_id INTEGER NOT NULL,
-                sold_price REAL NOT NULL,
-                FOREIGN KEY (winning_team_id) REFERENCES teams (id)
-            )
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS activity_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                message TEXT NOT NULL,
-                timestamp TEXT NOT NULL
-            )
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS system_settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL
-            )
-        """)
-    
-    conn.commit()
-    cur.close()
+@app.cli.command('init-db')
+def init_db_command():
+    """Create or migrate the schema and bootstrap the admin user and settings."""
+    init_db()
+    bootstrap_db()
+    print(f"Database initialized at schema version {SCHEMA_VERSION}.")
 
 # --- app_context Block ---
-# एप्लिकेशन शुरू होने पर डेटाबेस और एडमिन उपयोगकर्ता को इनिशियलाइज़ करें
+# Worker startup costs one query when the schema is current; DDL and the
+# admin/settings bootstrap only run when it is not (or via 'flask init-db').
 with app.app_context():
-    init_db()
-    # सुनिश्चित करें कि एक डिफ़ॉल्ट एडमिन यूज़र मौजूद है
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    if DATABASE_URL:
-        # --- PostgreSQL Syntax ---
-        cur.execute("SELECT id FROM users WHERE username = %s", ('admin',))
-        admin = cur.fetchone()
-        if admin is None:
-            hashed_password = generate_password_hash('adminpass')
-            cur.execute(
-                "INSERT INTO users (username, password, role, is_approved, team_id, can_bid) VALUES (%s, %s, %s, %s, %s, %s)",
-                ('admin', hashed_password, 'admin', True, None, 0)
-            )
-        
-        cur.execute("SELECT value FROM system_settings WHERE key = 'registration_open_until'")
-        if cur.fetchone() is None:
-            cur.execute("INSERT INTO system_settings (key, value) VALUES (%s, %s)", ('registration_open_until', '0'))
-        
-        cur.execute("SELECT value FROM system_settings WHERE key = 'default_team_budget'")
-        if cur.fetchone() is None:
-            cur.execute("INSERT INTO system_settings (key, value) VALUES (%s, %s)", ('default_team_budget', '100000.0'))
+    schema_version = get_schema_version()
+    if schema_version == SCHEMA_VERSION:
+        schema_state = 'current'
+    elif AUTO_MIGRATE or STORAGE_BACKEND == 'memory':
+        init_db()
+        bootstrap_db()
+        schema_state = f'migrated {schema_version} -> {SCHEMA_VERSION}'
     else:
-        # --- SQLite Syntax ---
-        cur.execute("SELECT id FROM users WHERE username = ?", ('admin',))
-        admin = cur.fetchone()
-        if admin is None:
-            hashed_password = generate_password_hash('adminpass')
-            cur.execute(
-                "INSERT INTO users (username, password, role, is_approved, team_id, can_bid) VALUES (?, ?, ?, ?, ?, ?)",
-                ('admin', hashed_password, 'admin', True, None, 0)
-            )
-
-        cur.execute("SELECT value FROM system_settings WHERE key = 'registration_open_until'")
-        if cur.fetchone() is None:
-            cur.execute("INSERT INTO system_settings (key, value) VALUES (?, ?)", ('registration_open_until', '0'))
-
-        cur.execute("SELECT value FROM system_settings WHERE key = 'default_team_budget'")
-        if cur.fetchone() is None:
-            cur.execute("INSERT INTO system_settings (key, value) VALUES (?, ?)", ('default_team_budget', '100000.0'))
-            
-    conn.commit()
-    cur.close()
+        schema_state = f'out of date ({schema_version}), run flask init-db'
+        print(f"Database schema version {schema_version} != {SCHEMA_VERSION}; run 'flask init-db'.")
 
 
 # --- User Authentication and Role Management ---
@@ -259,98 +560,103 @@ with app.app_context():
 def is_admin():
     return session.get('role') == 'admin'
 
+# --- Admin Actions over XHR ---
+# Admin action routes also serve fetch()/XHR calls from the dashboards. Those
+# get only the changed entities back as JSON instead of a redirect, so the page
+# patches itself instead of re-running every dashboard query.
+
+def wants_json():
+    """True when the caller asked for a JSON delta instead of a redirect."""
+    return (request.is_json
+            or request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+            or request.accept_mimetypes.best == 'application/json')
+
+def action_form():
+    """Form fields of an admin action, sent either form-encoded or as JSON."""
+    if request.is_json:
+        return request.get_json(silent=True) or {}
+    return request.form
+
+def action_done(delta, endpoint, **redirect_args):
+    """Successful admin action: the JSON delta for XHR callers, else the usual redirect."""
+    if wants_json():
+        return jsonify(dict(delta, ok=True))
+    return redirect(url_for(endpoint, **redirect_args))
+
+def action_failed(message, status, endpoint, **redirect_args):
+    """Failed admin action; non-JSON callers get the redirect (or plain text) they always did."""
+    if wants_json():
+        return jsonify({'ok': False, 'error': message}), status
+    if endpoint is None:
+        return message, status
+    return redirect(url_for(endpoint, **redirect_args))
+
+def admin_only():
+    """Response for a non-admin hitting an admin action."""
+    return action_failed('Admin access required.', 403, 'index')
+
+def registration_state(event_id):
+    """An event's registration status as shown in the dashboard's System Controls."""
+    event = get_event(event_id)
+    open_until_timestamp = float(event['registration_open_until']) if event else 0.0
+    is_open = clock.now() < open_until_timestamp
+    return {
+        'status': 'open' if is_open else 'closed',
+        'status_display': 'Open' if is_open else 'Closed',
+        'ends_at': datetime.fromtimestamp(open_until_timestamp).strftime('%Y-%m-%d %H:%M:%S') if is_open else None,
+    }
+
+# --- Auction Events ---
+# Players and teams belong to one event, taken from their account at login.
+# Admins manage one event at a time, picked on the dashboard. Socket.IO clients
+# join their event's room, so live updates only reach that event's pages.
+
+def current_event_id():
+    """The event the logged-in user (or the admin's dashboard) is working in."""
+    return session.get('event_id') or DEFAULT_EVENT_ID
+
+def event_room(event_id):
+    return f'event-{event_id}'
+
 def get_current_user():
-    conn = get_db_connection()
-    cur = get_dict_cursor(conn)
-    
     try:
-        if DATABASE_URL:
-            cur.execute("SELECT * FROM users WHERE username = %s", (session.get('username'),))
-        else:
-            cur.execute("SELECT * FROM users WHERE username = ?", (session.get('username'),))
-        user = cur.fetchone()
+        user = store.get_user(session.get('username'))
     except Exception as e:
         print(f"Error in get_current_user: {e}")
         user = None
-    finally:
-        cur.close()
-        
     return user
 
 def is_approved_bidder():
     user = get_current_user()
     if not user:
         return False
-        
-    if DATABASE_URL:
-        # PostgreSQL with RealDictCursor returns dicts
-        return session.get('role') == 'bidder' and user and user['is_approved']
-    else:
-        # SQLite with row_factory returns Row objects (which act like dicts)
-        return session.get('role') == 'bidder' and user and user['is_approved']
+    return session.get('role') == 'bidder' and user['is_approved']
 
 
 # --- [FIXED] broadcast_stats Function ---
-def broadcast_stats():
-    """Calculates and broadcasts auction stats to all clients."""
+def broadcast_stats(event_id):
+    """Calculates and broadcasts an event's auction stats to its clients."""
     with app.app_context():
-        conn = get_db_connection() 
-        cur = get_dict_cursor(conn)
-        
-        if DATABASE_URL:
-            cur.execute("SELECT COUNT(id) AS count FROM users WHERE role = 'bidder' AND base_price IS NOT NULL")
-            total_players_result = cur.fetchone()
-            total_players = total_players_result['count'] if total_players_result and 'count' in total_players_result else 0
-            
-            cur.execute("SELECT COUNT(id) AS count FROM sold_players")
-            sold_result = cur.fetchone()
-            sold_players_count = sold_result['count'] if sold_result and 'count' in sold_result else 0
-            
-            cur.execute("SELECT COUNT(id) AS count FROM auctions WHERE status = 'Unsold'")
-            unsold_result = cur.fetchone()
-            unsold_auctions_count = unsold_result['count'] if unsold_result and 'count' in unsold_result else 0
-        else:
-            cur.execute("SELECT COUNT(id) AS count FROM users WHERE role = 'bidder' AND base_price IS NOT NULL")
-            total_players_result = cur.fetchone()
-            total_players = total_players_result['count'] if total_players_result and 'count' in total_players_result else 0
-            
-            cur.execute("SELECT COUNT(id) AS count FROM sold_players")
-            sold_result = cur.fetchone()
-            sold_players_count = sold_result['count'] if sold_result and 'count' in sold_result else 0
-            
-            cur.execute("SELECT COUNT(id) AS count FROM auctions WHERE status = 'Unsold'")
-            unsold_result = cur.fetchone()
-            unsold_auctions_count = unsold_result['count'] if unsold_result and 'count' in unsold_result else 0
-            
-        cur.close()
-        unsold_players = unsold_auctions_count # Simplified logic
-        stats = {'total_players': total_players, 'sold_players': sold_players_count, 'unsold_players': unsold_players}
-        socketio.emit('stats_update', stats)
+        stats = store.event_stats(event_id)
+        socketio.emit('stats_update', stats, to=event_room(event_id))
 
-def log_activity(message):
-    """Broadcasts a generic activity message to all clients."""
+def log_activity(message, event_id):
+    """Broadcasts a generic activity message to the event's clients."""
     with app.app_context(): # Added app_context for thread safety
-        conn = get_db_connection()
-        cur = get_dict_cursor(conn)
         timestamp = time.strftime('%H:%M:%S')
         
         try:
-            if DATABASE_URL:
-                cur.execute("INSERT INTO activity_log (message, timestamp) VALUES (%s, %s)", (message, timestamp))
-            else:
-                cur.execute("INSERT INTO activity_log (message, timestamp) VALUES (?, ?)", (message, timestamp))
-            conn.commit()
+            store.add_activity([(message, timestamp, event_id)])
+            store.commit()
         except Exception as e:
             print(f"Error logging activity: {e}")
-            conn.rollback() # Rollback on error
-        finally:
-            cur.close()
+            store.rollback() # Rollback on error
 
         activity_data = { 
             'message': message,
             'timestamp': time.strftime('%H:%M:%S')
         }
-        socketio.emit('new_activity', activity_data)
+        socketio.emit('new_activity', activity_data, to=event_room(event_id))
 
 
 # --- Routes ---
@@ -369,37 +675,20 @@ def index():
     if is_admin(): # If admin, redirect to admin dashboard
         return redirect(url_for('admin_dashboard'))
     
-    conn = get_db_connection()
-    cur = get_dict_cursor(conn)
-    
     # यूज़र की टीम का नाम प्राप्त करें
     team_name = "Not Assigned"
     team_budget = 0
     if user['team_id']:
-        if DATABASE_URL:
-            cur.execute("SELECT name, budget FROM teams WHERE id = %s", (user['team_id'],))
-        else:
-            cur.execute("SELECT name, budget FROM teams WHERE id = ?", (user['team_id'],))
-        team = cur.fetchone() 
+        team = store.get_team(user['team_id'])
         if team:
             team_name = team['name']
             team_budget = team['budget']
 
-    if DATABASE_URL:
-        cur.execute("""
-            SELECT t.name as team_name, sp.player_name
-            FROM sold_players sp
-            JOIN teams t ON sp.winning_team_id = t.id
-            ORDER BY t.name, sp.player_name
-        """)
-    else:
-        cur.execute("""
-            SELECT t.name as team_name, sp.player_name
-            FROM sold_players sp
-            JOIN teams t ON sp.winning_team_id = t.id
-            ORDER BY t.name, sp.player_name
-        """)
-    sold_players_by_team_list = cur.fetchall()
+    event_id = current_event_id()
+    # The team roster is read-only and can lag slightly: serve it from the replica
+    roster = store.reader()
+    sold_players_by_team_list = roster.sold_players(event_id)
+    all_teams = roster.list_teams(event_id)
     
     sold_players_by_team = {}
     for player in sold_players_by_team_list:
@@ -407,54 +696,17 @@ def index():
             sold_players_by_team[player['team_name']] = []
         sold_players_by_team[player['team_name']].append(player['player_name'])
 
-    if DATABASE_URL:
-        cur.execute("""
-            SELECT a.id, a.title, a.current_price, a.status, t.name as highest_bidder_username FROM auctions a
-            LEFT JOIN teams t ON a.highest_bidding_team_id = t.id
-            WHERE a.status = 'live'
-        """)
-    else:
-        cur.execute("""
-            SELECT a.id, a.title, a.current_price, a.status, t.name as highest_bidder_username FROM auctions a
-            LEFT JOIN teams t ON a.highest_bidding_team_id = t.id
-            WHERE a.status = 'live'
-        """)
-    auctions = cur.fetchall()
+    auctions = store.list_auctions(event_id, status='live')
+    stats = store.event_stats(event_id)
     
-    cur.execute("SELECT name FROM teams")
-    all_teams = cur.fetchall()
-
-    if DATABASE_URL:
-        cur.execute("SELECT COUNT(id) AS count FROM users WHERE role = 'bidder' AND base_price IS NOT NULL")
-        total_players_result = cur.fetchone()
-        total_players = total_players_result['count'] if total_players_result and 'count' in total_players_result else 0
-        
-        cur.execute("SELECT COUNT(id) AS count FROM sold_players")
-        sold_result = cur.fetchone()
-        sold_players = sold_result['count'] if sold_result and 'count' in sold_result else 0
-        
-        cur.execute("SELECT COUNT(id) AS count FROM auctions WHERE status = 'Unsold'")
-        unsold_result = cur.fetchone()
-        unsold_players_count = unsold_result['count'] if unsold_result and 'count' in unsold_result else 0
-    else:
-        cur.execute("SELECT COUNT(id) AS count FROM users WHERE role = 'bidder' AND base_price IS NOT NULL")
-        total_players_result = cur.fetchone()
-        total_players = total_players_result['count'] if total_players_result and 'count' in total_players_result else 0
-        
-        cur.execute("SELECT COUNT(id) AS count FROM sold_players")
-        sold_result = cur.fetchone()
-        sold_players = sold_result['count'] if sold_result and 'count' in sold_result else 0
-        
-        cur.execute("SELECT COUNT(id) AS count FROM auctions WHERE status = 'Unsold'")
-        unsold_result = cur.fetchone()
-        unsold_players_count = unsold_result['count'] if unsold_result and 'count' in unsold_result else 0
-        
-    cur.close()
-    
-    unsold_players = unsold_players_count
+    total_players = stats['total_players']
+    sold_players = stats['sold_players']
+    unsold_players = stats['unsold_players']
+    event = get_event(event_id)
 
     return render_template('auction_feed.html', 
                            auctions=auctions, 
+                           event_name=event['name'] if event else None,
                            current_username=session.get('username'),
                            team_name=team_name,
                            team_budget=team_budget,
@@ -465,27 +717,122 @@ def index():
                            sold_players=sold_players,
                            unsold_players=unsold_players)
 
+@app.route('/watch')
+def watch():
+    # Public, read-only view of an event for streams: /watch?event=<id>
+    event_id = request.args.get('event', DEFAULT_EVENT_ID, type=int)
+    event = get_event(event_id)
+    if event is None:
+        return "This auction event does not exist.", 404
+    return render_template('spectate.html', event=event, socketio_path=SPECTATOR_SOCKETIO_PATH)
+
+# --- Registration Intake ---
+# /register hashes the password in its own thread, then hands the row to one
+# intake worker. The worker inserts a whole batch with a single statement and
+# commit, writes one activity entry and sends one stats update per batch.
+
+registration_queue = queue.Queue()
+registration_thread = None
+registration_thread_lock = threading.Lock()
+
+class PendingRegistration:
+    """One queued sign-up; `result` is 'ok', 'conflict' or an error message."""
+
+    def __init__(self, username, password_hash, discord_name, base_price, game_level, event_id):
+        self.row = (username, password_hash, discord_name, base_price, game_level, event_id)
+        self.username = username
+        self.result = None
+        self.done = threading.Event()
+
+def submit_registration(pending, timeout=30):
+    """Queue a sign-up and wait for the batch it lands in to commit."""
+    global registration_thread
+    with registration_thread_lock:
+        if registration_thread is None:
+            registration_thread = threading.Thread(target=registration_worker, name='registration', daemon=True)
+            registration_thread.start()
+    registration_queue.put(pending)
+    if not pending.done.wait(timeout):
+        return 'Registration timed out, please try again.'
+    return pending.result
+
+def registration_worker():
+    while True:
+        batch = [registration_queue.get()]
+        deadline = time.monotonic() + REGISTRATION_BATCH_WAIT_MS / 1000.0
+        while len(batch) < REGISTRATION_BATCH_MAX:
+            try:
+                batch.append(registration_queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        try:
+            insert_registrations(batch)
+        except Exception as e:
+            print(f"Error in registration worker: {e}")
+            for pending in batch:
+                if pending.result is None:
+                    pending.result = f"An error occurred: {e}"
+        finally:
+            for pending in batch:
+                pending.done.set()
+
+def insert_registrations(batch):
+    """Insert a batch of sign-ups in one transaction; taken usernames become 'conflict'."""
+    # A repeated username inside the batch conflicts with its first occurrence
+    first = {}
+    for pending in batch:
+        if pending.username in first:
+            pending.result = 'conflict'
+        else:
+            first[pending.username] = pending
+    rows = [pending.row for pending in first.values()]
+
+    with app.app_context():
+        try:
+            inserted_ids = store.add_players(rows)
+
+            # One activity entry per event that got new players
+            inserted_by_event = {}
+            for username in inserted_ids:
+                inserted_by_event.setdefault(first[username].row[5], []).append(username)
+            timestamp = time.strftime('%H:%M:%S')
+            messages = {}
+            for event_id, inserted in inserted_by_event.items():
+                if len(inserted) == 1:
+                    messages[event_id] = f"New player '{inserted[0]}' has registered."
+                else:
+                    messages[event_id] = f"{len(inserted)} new players have registered: {', '.join(inserted)}."
+            store.add_activity([(message, timestamp, event_id) for event_id, message in messages.items()])
+            store.commit()
+        except Exception:
+            store.rollback()
+            raise
+
+    for username, pending in first.items():
+        pending.result = 'ok' if username in inserted_ids else 'conflict'
+        if username in inserted_ids:
+            _, _, discord_name, base_price, game_level, event_id = pending.row
+            index_player({'id': inserted_ids[username], 'username': username, 'discord_name': discord_name,
+                          'base_price': base_price, 'game_level': game_level, 'status': 'ready',
+                          'event_id': event_id})
+    for event_id, message in messages.items():
+        socketio.emit('new_activity', {'message': message, 'timestamp': timestamp}, to=event_room(event_id))
+        broadcast_stats(event_id)
+
 @app.route('/register', methods=('GET', 'POST'))
 def register():
-    conn = get_db_connection()
-    cur = get_dict_cursor(conn)
-    cur.execute("SELECT value FROM system_settings WHERE key = 'registration_open_until'")
-    setting = cur.fetchone()
-
-    registration_open = False
-    open_until_timestamp = 0.0
-    if setting:
-        # Handle potential string or dict access
-        setting_value = setting['value'] if isinstance(setting, dict) else setting[0]
-        open_until_timestamp = float(setting_value)
-        if time.time() < open_until_timestamp:
-            registration_open = True
+    # Each event shares its own sign-up link: /register?event=<id>
+    event_id = request.args.get('event', DEFAULT_EVENT_ID, type=int)
+    event = get_event(event_id)
+    if event is None:
+        return render_template('register.html', error="This auction event does not exist.", registration_closed=True)
+    open_until_timestamp = float(event['registration_open_until'])
+    registration_open = clock.now() < open_until_timestamp
 
     if not registration_open:
-        cur.close()
         return render_template('register.html', 
                                error="Player registration is currently closed. Please check back later.", 
-                               registration_closed=True)
+                               registration_closed=True, event=event)
 
     if request.method == 'POST':
         username = request.form['username']
@@ -494,78 +841,59 @@ def register():
         base_price = float(request.form['base_price'])
         game_level = request.form['game_level']
 
-        try:
-            if DATABASE_URL:
-                cur.execute("INSERT INTO users (username, password, role, is_approved, discord_name, base_price, game_level) VALUES (%s, %s, %s, %s, %s, %s, %s)", (username, password_hash, 'bidder', True, discord_name, base_price, game_level))
-            else:
-                cur.execute("INSERT INTO users (username, password, role, is_approved, discord_name, base_price, game_level) VALUES (?, ?, ?, ?, ?, ?, ?)", (username, password_hash, 'bidder', 1, discord_name, base_price, game_level))
-
-            conn.commit()
-            cur.close()
-            # Broadcast updated stats
-            broadcast_stats()
-            log_activity(f"New player '{username}' has registered.")
+        # Stats and the activity entry are sent once per intake batch
+        result = submit_registration(PendingRegistration(username, password_hash, discord_name, base_price, game_level, event_id))
+        if result == 'ok':
             return redirect(url_for('login', message="Registration successful! You can now log in."))
+        if result == 'conflict':
+            return render_template('register.html', error="Username already exists.", registration_open_until=open_until_timestamp, event=event)
+        return render_template('register.html', error=result, registration_open_until=open_until_timestamp, event=event)
 
-        except (sqlite3.IntegrityError, psycopg2.IntegrityError):
-            cur.close()
-            return render_template('register.html', error="Username already exists.", registration_open_until=open_until_timestamp)
-        except Exception as e:
-            cur.close()
-            return render_template('register.html', error=f"An error occurred: {e}", registration_open_until=open_until_timestamp)
-
-    cur.close()
-    return render_template('register.html', registration_open_until=open_until_timestamp)
+    return render_template('register.html', registration_open_until=open_until_timestamp, event=event)
 
 @app.route('/register_team', methods=['GET', 'POST'])
 def register_team():
     if not is_admin():
-        return redirect(url_for('index'))
+        return admin_only()
     if request.method == 'POST':
-        team_name = request.form['team_name'].strip()
-        password = request.form['password']
+        form = action_form()
+        team_name = (form.get('team_name') or '').strip()
+        password = form.get('password') or ''
         if not team_name or not password:
-            return redirect(url_for('manage_teams', error="Team name and password cannot be empty."))
+            return action_failed("Team name and password cannot be empty.", 400, 'manage_teams', error="Team name and password cannot be empty.")
         
-        conn = get_db_connection()
-        cur = get_dict_cursor(conn)
+        # The team's login shares its name: check both before paying for the hash
+        if store.taken_team_names([team_name]):
+            store.rollback()
+            return action_failed(f"Team name '{team_name}' already exists.", 409, 'manage_teams', error=f"Team name '{team_name}' already exists.")
+
+        # Hash before the INSERTs so the write transaction stays short
+        password_hash = generate_password_hash(password)
+        event_id = current_event_id()
         
         try:
-            cur.execute("SELECT value FROM system_settings WHERE key = 'default_team_budget'")
-            default_budget_setting = cur.fetchone()
-            default_budget = float(default_budget_setting['value']) if default_budget_setting else 100000.0
-
-            if DATABASE_URL:
-                cur.execute("INSERT INTO teams (name, budget) VALUES (%s, %s) RETURNING id", (team_name, float(default_budget)))
-                team_id = cur.fetchone()['id']
-            else:
-                cur.execute("INSERT INTO teams (name, budget) VALUES (?, ?)", (team_name, float(default_budget)))
-                team_id = cur.lastrowid
-            
-            password_hash = generate_password_hash(password)
-            
-            if DATABASE_URL:
-                cur.execute("INSERT INTO users (username, password, role, is_approved, team_id, can_bid) VALUES (%s, %s, %s, %s, %s, %s)", (team_name, password_hash, 'bidder', True, team_id, True))
-            else:
-                cur.execute("INSERT INTO users (username, password, role, is_approved, team_id, can_bid) VALUES (?, ?, ?, ?, ?, ?)", (team_name, password_hash, 'bidder', 1, team_id, 1))
-
-            conn.commit()
-            cur.close()
+            event = get_event(event_id)
+            default_budget = float(event['default_team_budget']) if event else 100000.0
+
+            team_id = store.add_team(team_name, float(default_budget), event_id)
+            store.add_user(team_name, password_hash, 'bidder', is_approved=True, team_id=team_id, can_bid=True, event_id=event_id)
+            store.bump_data_version([event_id])
+            store.commit()
+            auction_events.invalidate()
             
-            team_data = {'name': team_name, 'budget': float(default_budget)}
-            socketio.emit('new_team_added', team_data)
-            log_activity(f"A new team has been created: '{team_name}'.")
-            return redirect(url_for('manage_teams', success=f"Team '{team_name}' created successfully."))
+            team_data = {'id': team_id, 'name': team_name, 'budget': float(default_budget)}
+            socketio.emit('new_team_added', team_data, to=event_room(event_id))
+            log_activity(f"A new team has been created: '{team_name}'.", event_id)
+            return action_done({'team': team_data}, 'manage_teams', success=f"Team '{team_name}' created successfully.")
         
-        except (sqlite3.IntegrityError, psycopg2.IntegrityError):
-            conn.rollback()
-            cur.close()
-            return redirect(url_for('manage_teams', error=f"Team name '{team_name}' already exists."))
+        except IntegrityError:
+            store.rollback()
+            return action_failed(f"Team name '{team_name}' already exists.", 409, 'manage_teams', error=f"Team name '{team_name}' already exists.")
         except Exception as e:
-            conn.rollback()
-            cur.close()
-            return redirect(url_for('manage_teams', error=f"An error occurred: {e}"))
+            store.rollback()
+            return action_failed(f"An error occurred: {e}", 500, 'manage_teams', error=f"An error occurred: {e}")
             
+
     return redirect(url_for('manage_teams'))
 
 @app.route('/login_player', methods=('GET', 'POST'))
@@ -577,21 +905,18 @@ def login_player(): # This is the player login route
         username = request.form['username']
         password = request.form['password']
         
-        conn = get_db_connection()
-        cur = get_dict_cursor(conn)
-        
-        if DATABASE_URL:
-            cur.execute("SELECT * FROM users WHERE username = %s AND (role = 'admin' OR base_price IS NOT NULL)", (username,))
-        else:
-            cur.execute("SELECT * FROM users WHERE username = ? AND (role = 'admin' OR base_price IS NOT NULL)", (username,))
-        user = cur.fetchone()
-        cur.close()
-        
+        user = store.get_user(username)
+        # Players and the admin log in here; team accounts use /login_team
+        if user and user['role'] != 'admin' and user['base_price'] is None:
+            user = None
+
         if user and check_password_hash(user['password'], password):
             session['username'] = user['username']
             session['role'] = user['role']
             if user['role'] == 'bidder' and user['team_id']: # Store team_id for players if assigned
                 session['team_id'] = user['team_id']
+            if user['event_id']: # Players see their own event; admins pick one on the dashboard
+                session['event_id'] = user['event_id']
             return redirect(url_for('index'))
         else:
             message = None # Clear message if login fails
@@ -614,20 +939,16 @@ def login_team():
         username = request.form['username']
         password = request.form['password']
         
-        conn = get_db_connection()
-        cur = get_dict_cursor(conn)
-        
-        if DATABASE_URL:
-            cur.execute("SELECT * FROM users WHERE username = %s AND role = 'bidder' AND base_price IS NULL", (username,))
-        else:
-            cur.execute("SELECT * FROM users WHERE username = ? AND role = 'bidder' AND base_price IS NULL", (username,))
-        user = cur.fetchone()
-        cur.close()
-        
+        user = store.get_user(username)
+        # Team accounts are bidders without a base price
+        if user and not (user['role'] == 'bidder' and user['base_price'] is None):
+            user = None
+
         if user and check_password_hash(user['password'], password):
             session['username'] = user['username']
             session['role'] = user['role']
             session['team_id'] = user['team_id']
+            session['event_id'] = user['event_id']
             return redirect(url_for('index'))
         else:
             error = "Invalid team username or password."
@@ -649,349 +970,436 @@ def admin_dashboard():
     if not is_admin():
         return redirect(url_for('index'))
 
-    conn = get_db_connection()
-    cur = get_dict_cursor(conn)
-    
-    if DATABASE_URL:
-        cur.execute("""
-            SELECT a.id, a.title, a.current_price, a.status, t.name as highest_bidder_username
-            FROM auctions a
-            LEFT JOIN teams t ON a.highest_bidding_team_id = t.id
-            ORDER BY a.id DESC
-        """)
-    else:
-        cur.execute("""
-            SELECT a.id, a.title, a.current_price, a.status, t.name as highest_bidder_username
-            FROM auctions a
-            LEFT JOIN teams t ON a.highest_bidding_team_id = t.id
-            ORDER BY a.id DESC
-        """)
-    all_auctions = cur.fetchall()
-    
-    cur.execute("SELECT id, name FROM teams")
-    teams = cur.fetchall()
-
-    if DATABASE_URL:
-        cur.execute("""
-            SELECT u.id, u.username, u.discord_name, u.base_price, u.game_level
-            FROM users u LEFT JOIN auctions a ON u.username = a.title
-            WHERE u.role = 'bidder' AND a.id IS NULL AND u.base_price IS NOT NULL
-            ORDER BY u.id DESC
-        """)
-    else:
-        cur.execute("""
-            SELECT u.id, u.username, u.discord_name, u.base_price, u.game_level
-            FROM users u LEFT JOIN auctions a ON u.username = a.title
-            WHERE u.role = 'bidder' AND a.id IS NULL AND u.base_price IS NOT NULL
-            ORDER BY u.id DESC
-        """)
-    players_ready_for_auction = cur.fetchall()
-
-    # --- START FIX: Robust fetching for stats ---
-    if DATABASE_URL:
-        cur.execute("SELECT COUNT(id) AS count FROM users WHERE role = 'bidder' AND base_price IS NOT NULL")
-        total_players_result = cur.fetchone()
-        total_players = total_players_result['count'] if total_players_result and 'count' in total_players_result else 0
-        
-        cur.execute("SELECT COUNT(id) AS count FROM sold_players")
-        sold_result = cur.fetchone()
-        sold_players = sold_result['count'] if sold_result and 'count' in sold_result else 0
-    else:
-        cur.execute("SELECT COUNT(id) AS count FROM users WHERE role = 'bidder' AND base_price IS NOT NULL")
-        total_players_result = cur.fetchone()
-        total_players = total_players_result['count'] if total_players_result and 'count' in total_players_result else 0
-        
-        cur.execute("SELECT COUNT(id) AS count FROM sold_players")
-        sold_result = cur.fetchone()
-        sold_players = sold_result['count'] if sold_result and 'count' in sold_result else 0
-
-    # --- END FIX: Robust fetching for stats ---
-    
+    event_id = current_event_id()
+    event = get_event(event_id)
+    if event is None:
+        # The selected event no longer exists
+        session.pop('event_id', None)
+        event_id = DEFAULT_EVENT_ID
+        event = get_event(event_id)
+
+    reads = store.reader()
+    all_auctions = reads.list_auctions(event_id, newest_first=True)
+    teams = reads.list_teams(event_id)
+    players_ready_for_auction = reads.players_ready(event_id)
+
+    stats = reads.event_stats(event_id)
+    total_players = stats['total_players']
+    sold_players = stats['sold_players']
     unsold_players = total_players - sold_players
     
-    if DATABASE_URL:
-        cur.execute("""
-            SELECT a.id, a.title, u.discord_name, u.base_price, u.game_level
-            FROM auctions a
-            JOIN users u ON a.title = u.username
-            WHERE a.status = 'Unsold'
-        """)
-    else:
-        cur.execute("""
-            SELECT a.id, a.title, u.discord_name, u.base_price, u.game_level
-            FROM auctions a
-            JOIN users u ON a.title = u.username
-            WHERE a.status = 'Unsold'
-        """)
-    unsold_auctions = cur.fetchall()
+    unsold_auctions = reads.unsold_auctions(event_id)
 
     # Get registration status
-    cur.execute("SELECT value FROM system_settings WHERE key = 'registration_open_until'")
-    setting = cur.fetchone()
-    registration_status = 'closed'
-    registration_ends_at = None
-    if setting:
-        # Handling for both RealDictCursor (dict) and standard cursor (Row/tuple access)
-        setting_value = setting['value'] if isinstance(setting, dict) and 'value' in setting else setting[0] if isinstance(setting, tuple) and len(setting) > 0 else '0'
-        open_until_timestamp = float(setting_value)
-        if time.time() < open_until_timestamp:
-            registration_status = 'open'
-            ends_dt = datetime.fromtimestamp(open_until_timestamp)
-            registration_ends_at = ends_dt.strftime('%Y-%m-%d %H:%M:%S')
-
-    registration_status_display = "Open" if registration_status == 'open' else "Closed"
+    registration = registration_state(event_id)
 
     # Get default budget
-    cur.execute("SELECT value FROM system_settings WHERE key = 'default_team_budget'")
-    default_budget_setting = cur.fetchone()
-    default_team_budget = float(default_budget_setting['value']) if default_budget_setting else 0.0
-
-    cur.execute("SELECT id, name, budget FROM teams ORDER BY name")
-    teams_with_budgets = cur.fetchall()
-    cur.close()
-
+    default_team_budget = float(event['default_team_budget']) if event else 0.0
 
     return render_template('admin_dashboard.html', 
+                           event=event,
+                           events=list_events(),
                            auctions=all_auctions,
                            teams=teams,
                            players_ready_for_auction=players_ready_for_auction,
                            total_players=total_players,
-                           teams_with_budgets=teams_with_budgets,
+                           teams_with_budgets=teams,
                            default_team_budget=default_team_budget,
                            sold_players=sold_players,
                            unsold_players=unsold_players, # This is a count
                            unsold_auctions=unsold_auctions, # This is the list of auctions
-                           registration_status=registration_status,
-                           registration_status_display=registration_status_display,
-                           registration_ends_at=registration_ends_at)
+                           registration_status=registration['status'],
+                           registration_status_display=registration['status_display'],
+                           registration_ends_at=registration['ends_at'])
 
 def mark_as_unsold(auction_id):
     """यदि कोई बोली नहीं लगाई जाती है तो नीलामी को 'Unsold' के रूप में चिह्नित करता है।"""
-    with app.app_context():
-        conn = get_db_connection()
-        cur = get_dict_cursor(conn)
-        
-        try:
-            if DATABASE_URL:
-                cur.execute("SELECT * FROM auctions WHERE id = %s AND status = 'live'", (auction_id,))
-            else:
-                cur.execute("SELECT * FROM auctions WHERE id = ? AND status = 'live'", (auction_id,))
-            auction = cur.fetchone()
-            
-            if auction and auction['highest_bidding_team_id'] is None:
-                if DATABASE_URL:
-                    cur.execute("UPDATE auctions SET status = 'Unsold' WHERE id = %s", (auction_id,))
-                else:
-                    cur.execute("UPDATE auctions SET status = 'Unsold' WHERE id = ?", (auction_id,))
-                conn.commit()
-                
-                player_name = auction['title']
-                log_activity(f"Player '{player_name}' went unsold as no bids were placed.")
-                socketio.emit('player_unsold', {'auction_id': auction_id, 'player_name': player_name})
-                broadcast_stats()
-        except Exception as e:
-            print(f"Error in mark_as_unsold: {e}")
-            conn.rollback()
-        finally:
-            cur.close()
+    record_event('timer', name='mark_as_unsold', auction_id=auction_id)
+    # Only closes the auction if it still has no bidder when settled
+    enqueue_settlement(auction_id, True)
+
+@app.route('/admin/events', methods=['POST'])
+def create_event():
+    """Create a new auction event (league) and switch the dashboard to it."""
+    if not is_admin():
+        return admin_only()
+    form = action_form()
+    name = (form.get('name') or '').strip()
+    if not name:
+        return action_failed("Event name cannot be empty.", 400, 'admin_dashboard', error="Event name cannot be empty.")
+    try:
+        default_budget = float(form.get('default_team_budget') or 100000.0)
+    except ValueError:
+        return action_failed("Default team budget must be a number.", 400, 'admin_dashboard', error="Default team budget must be a number.")
+
+    try:
+        event_id = store.create_event(name, default_budget)
+        store.commit()
+        auction_events.invalidate()
+    except IntegrityError:
+        store.rollback()
+        return action_failed(f"Event '{name}' already exists.", 409, 'admin_dashboard', error=f"Event '{name}' already exists.")
+    except Exception as e:
+        print(f"Error creating event: {e}")
+        store.rollback()
+        return action_failed(f"Could not create the event: {e}", 500, 'admin_dashboard')
+
+    session['event_id'] = event_id
+    log_activity(f"Auction event '{name}' was created.", event_id)
+    return action_done({'event': get_event(event_id)}, 'admin_dashboard')
+
+@app.route('/admin/events/select', methods=['POST'])
+def select_event():
+    """Switch the event the admin dashboard and admin actions work on."""
+    if not is_admin():
+        return admin_only()
+    try:
+        event_id = int(action_form().get('event_id'))
+    except (TypeError, ValueError):
+        event_id = None
+    event = get_event(event_id)
+    if event is None:
+        return action_failed("Event not found.", 404, 'admin_dashboard', error="Event not found.")
+    session['event_id'] = event_id
+    return action_done({'event': event}, 'admin_dashboard')
 
 @app.route('/admin/toggle_registration', methods=['POST'])
 def toggle_registration():
     if not is_admin():
-        return redirect(url_for('index'))
+        return admin_only()
 
-    action = request.form.get('action')
-    conn = get_db_connection()
-    cur = conn.cursor()
+    action = action_form().get('action')
+    event_id = current_event_id()
 
     try:
         if action == 'open':
             # Set registration to be open for the next 24 hours
-            open_until = time.time() + (24 * 60 * 60)
-            if DATABASE_URL:
-                cur.execute("UPDATE system_settings SET value = %s WHERE key = 'registration_open_until'", (str(open_until),))
-            else:
-                cur.execute("UPDATE system_settings SET value = ? WHERE key = 'registration_open_until'", (str(open_until),))
-            log_activity("Admin has opened player registration for 24 hours.")
+            open_until = clock.now() + (24 * 60 * 60)
+            store.update_event(event_id, registration_open_until=open_until)
+            store.commit()
+            auction_events.invalidate()
+            log_activity("Admin has opened player registration for 24 hours.", event_id)
         elif action == 'close':
             # Close registration immediately
-            if DATABASE_URL:
-                cur.execute("UPDATE system_settings SET value = '0' WHERE key = 'registration_open_until'")
-            else:
-                cur.execute("UPDATE system_settings SET value = '0' WHERE key = 'registration_open_until'")
-            log_activity("Admin has closed player registration.")
-        
-        conn.commit()
+            store.update_event(event_id, registration_open_until=0)
+            store.commit()
+            auction_events.invalidate()
+            log_activity("Admin has closed player registration.", event_id)
     except Exception as e:
         print(f"Error toggling registration: {e}")
-        conn.rollback()
-    finally:
-        cur.close()
+        store.rollback()
+        return action_failed(f"Could not update registration: {e}", 500, 'admin_dashboard')
       
-    return redirect(url_for('admin_dashboard'))
+    return action_done({'registration': registration_state(event_id)}, 'admin_dashboard')
 
 @app.route('/admin/update_budget', methods=['POST'])
 def update_budget():
     if not is_admin():
-        return redirect(url_for('index'))
+        return admin_only()
 
-    new_budget = request.form.get('default_budget')
-    conn = get_db_connection()
-    cur = conn.cursor()
+    try:
+        new_budget = float(action_form().get('default_budget'))
+    except (TypeError, ValueError):
+        new_budget = None
+    # NaN fails the comparison; inf would never be spent down
+    if new_budget is None or not 0 < new_budget < float('inf'):
+        return action_failed("Default team budget must be a positive number.", 400, 'admin_dashboard', error="Default team budget must be a positive number.")
+    event_id = current_event_id()
     
     try:
-        if DATABASE_URL:
-            cur.execute("UPDATE system_settings SET value = %s WHERE key = 'default_team_budget'", (new_budget,))
-        else:
-            cur.execute("UPDATE system_settings SET value = ? WHERE key = 'default_team_budget'", (new_budget,))
-        conn.commit()
-        log_activity(f"Admin updated default team budget to {new_budget}.")
+        store.update_event(event_id, default_team_budget=new_budget)
+        store.commit()
+        auction_events.invalidate()
+        log_activity(f"Admin updated default team budget to {new_budget}.", event_id)
     except Exception as e:
         print(f"Error updating budget: {e}")
-        conn.rollback()
-    finally:
-        cur.close()
+        store.rollback()
+        return action_failed(f"Could not update the default budget: {e}", 500, 'admin_dashboard')
         
-    return redirect(url_for('admin_dashboard'))
+    return action_done({'default_team_budget': float(get_event(event_id)['default_team_budget'])}, 'admin_dashboard')
 
 @app.route('/admin/update_team_budget', methods=['POST'])
 def update_team_budget():
     if not is_admin():
-        return redirect(url_for('index'))
-    team_id = request.form.get('team_id')
-    new_budget = request.form.get('new_budget')
-    conn = get_db_connection()
-    cur = get_dict_cursor(conn)
+        return admin_only()
+    form = action_form()
+    team_id = form.get('team_id')
+    new_budget = form.get('new_budget')
+    team = None
     try:
-        if DATABASE_URL:
-            cur.execute("UPDATE teams SET budget = %s WHERE id = %s", (new_budget, team_id))
-        else:
-            cur.execute("UPDATE teams SET budget = ? WHERE id = ?", (new_budget, team_id))
-        conn.commit()
-        log_activity(f"Admin updated team id '{team_id}' budget to {new_budget}.")
+        team = store.set_team_budget(team_id, new_budget)
+        if team:
+            store.bump_data_version([team['event_id']])
+        store.commit()
+        if team:
+            auction_events.invalidate()
+            log_activity(f"Admin updated team id '{team_id}' budget to {new_budget}.", team['event_id'])
     except Exception as e:
         print(f"Error updating team budget: {e}")
-        conn.rollback()
-    finally:
-        cur.close()
-    return redirect(url_for('manage_teams'))
+        store.rollback()
+        return action_failed(f"Could not update the team budget: {e}", 500, 'manage_teams')
+    if not team:
+        return action_failed("Team not found.", 404, 'manage_teams')
+    return action_done({'team': {'id': team['id'], 'name': team['name'], 'budget': float(team['budget'])}}, 'manage_teams')
+
+def bulk_team_rows():
+    """(name, password, budget or None) rows of a bulk team upload.
+
+    JSON callers send {"teams": [{"name", "password", "budget"?}, ...]}; forms send
+    CSV lines of team_name,password[,budget] as an uploaded `teams_file` or pasted
+    `teams_csv`. A header row is skipped. Raises ValueError on a bad row.
+    """
+    if request.is_json:
+        teams = (request.get_json(silent=True) or {}).get('teams') or []
+        entries = [(team.get('name'), team.get('password'), team.get('budget')) for team in teams]
+    else:
+        upload = request.files.get('teams_file')
+        text = upload.read().decode('utf-8-sig') if upload and upload.filename else request.form.get('teams_csv', '')
+        entries = [(row + [None, None])[:3] for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+        if entries and (entries[0][0] or '').strip().lower() in ('team_name', 'name', 'team'):
+            entries = entries[1:]
+    rows, seen = [], set()
+    for line, (name, password, budget) in enumerate(entries, start=1):
+        name = (name or '').strip()
+        if not name or not password:
+            raise ValueError(f"Row {line}: team name and password cannot be empty.")
+        if name in seen:
+            raise ValueError(f"Row {line}: team '{name}' appears twice.")
+        seen.add(name)
+        if budget is not None and str(budget).strip() != '':
+            budget = float(budget)
+            if budget < 0:
+                raise ValueError(f"Row {line}: budget cannot be negative.")
+        else:
+            budget = None
+        rows.append((name, password, budget))
+    return rows
+
+@app.route('/admin/bulk_teams', methods=['POST'])
+def bulk_register_teams():
+    """Create many teams and their logins in one transaction (one emit, one log entry)."""
+    if not is_admin():
+        return admin_only()
+    try:
+        rows = bulk_team_rows()
+    except (ValueError, UnicodeDecodeError) as e:
+        return action_failed(str(e), 400, 'manage_teams', error=str(e))
+    if not rows:
+        return action_failed("No teams to create.", 400, 'manage_teams', error="No teams to create.")
+    if len(rows) > BULK_TEAMS_MAX:
+        message = f"At most {BULK_TEAMS_MAX} teams per upload."
+        return action_failed(message, 400, 'manage_teams', error=message)
+
+    event_id = current_event_id()
+    # Check names before paying for the hashes; the INSERT still guards against races
+    taken = store.taken_team_names([name for name, _, _ in rows])
+    store.rollback()
+    if taken:
+        message = f"Already taken: {', '.join(sorted(taken))}. No teams were created."
+        return action_failed(message, 409, 'manage_teams', error=message)
+
+    # Hash outside the transaction, several at a time
+    with ThreadPoolExecutor(max_workers=max(1, min(PASSWORD_HASH_WORKERS, len(rows)))) as pool:
+        hashes = list(pool.map(generate_password_hash, [password for _, password, _ in rows]))
+
+    try:
+        event = get_event(event_id)
+        default_budget = float(event['default_team_budget']) if event else 100000.0
+        teams = store.add_teams([(name, default_budget if budget is None else budget, password_hash)
+                                 for (name, _, budget), password_hash in zip(rows, hashes)], event_id)
+        store.bump_data_version([event_id])
+        store.commit()
+        auction_events.invalidate()
+    except IntegrityError:
+        store.rollback()
+        return action_failed("A team name is already taken. No teams were created.", 409, 'manage_teams',
+                             error="A team name is already taken. No teams were created.")
+    except Exception as e:
+        store.rollback()
+        return action_failed(f"An error occurred: {e}", 500, 'manage_teams', error=f"An error occurred: {e}")
+
+    teams = [{'id': team['id'], 'name': team['name'], 'budget': float(team['budget'])} for team in teams]
+    socketio.emit('teams_added', {'teams': teams}, to=event_room(event_id))
+    log_activity(f"{len(teams)} teams were created in bulk.", event_id)
+    return action_done({'teams': teams}, 'manage_teams', success=f"{len(teams)} teams created successfully.")
+
+@app.route('/admin/bulk_team_budgets', methods=['POST'])
+def bulk_update_team_budgets():
+    """Set (mode=set) or shift (mode=delta) the budget of every team, or of the
+    `team_ids` given, with a single UPDATE. Deltas never take a budget below zero."""
+    if not is_admin():
+        return admin_only()
+    form = action_form()
+    mode = form.get('mode', 'set')
+    team_ids = form.get('team_ids') if request.is_json else form.getlist('team_ids')
+    try:
+        if team_ids is not None and not isinstance(team_ids, list):
+            raise TypeError
+        team_ids = [int(team_id) for team_id in team_ids or ()]
+    except (TypeError, ValueError):
+        return action_failed("team_ids must be a list of team ids.", 400, 'manage_teams', error="team_ids must be a list of team ids.")
+    try:
+        amount = float(form.get('amount'))
+    except (TypeError, ValueError):
+        return action_failed("Amount must be a number.", 400, 'manage_teams', error="Amount must be a number.")
+    if mode not in ('set', 'delta') or (mode == 'set' and amount < 0):
+        return action_failed("Choose a non-negative budget or a delta.", 400, 'manage_teams', error="Choose a non-negative budget or a delta.")
+
+    event_id = current_event_id()
+    try:
+        teams = store.update_team_budgets(event_id, budget=amount if mode == 'set' else None,
+                                          delta=amount if mode == 'delta' else None, team_ids=team_ids or None)
+        if teams:
+            store.bump_data_version([event_id])
+        store.commit()
+    except Exception as e:
+        print(f"Error updating team budgets: {e}")
+        store.rollback()
+        return action_failed(f"Could not update the team budgets: {e}", 500, 'manage_teams')
+    if not teams:
+        return action_failed("No teams to update.", 404, 'manage_teams')
+
+    auction_events.invalidate()
+    teams = [{'id': team['id'], 'name': team['name'], 'budget': float(team['budget'])} for team in teams]
+    socketio.emit('team_budgets_updated', {'teams': teams}, to=event_room(event_id))
+    change = f"set to {amount:.2f}" if mode == 'set' else f"changed by {amount:+.2f}"
+    log_activity(f"Admin {change} the budget of {len(teams)} teams.", event_id)
+    return action_done({'teams': teams}, 'manage_teams')
 
 @app.route('/admin/reauction/<int:auction_id>', methods=['POST'])
 def reauction_player(auction_id):
     """एक बिना बिके खिलाड़ी को फिर से नीलाम करता है।"""
     if not is_admin():
-        return redirect(url_for('index'))
-    conn = get_db_connection()
-    cur = get_dict_cursor(conn)
+        return admin_only()
     try:
-        if DATABASE_URL:
-            cur.execute("SELECT * FROM auctions WHERE id = %s AND status = 'Unsold'", (auction_id,))
-        else:
-            cur.execute("SELECT * FROM auctions WHERE id = ? AND status = 'Unsold'", (auction_id,))
-        auction = cur.fetchone()
-        if not auction:
-            cur.close()
-            return "Unsold auction not found", 404
-        if DATABASE_URL:
-            cur.execute("SELECT * FROM users WHERE username = %s", (auction['title'],))
-        else:
-            cur.execute("SELECT * FROM users WHERE username = ?", (auction['title'],))
-        player = cur.fetchone()
+        auction = store.get_auction(auction_id)
+        if not auction or auction['status'] != 'Unsold':
+            return action_failed("Unsold auction not found", 404, None)
+        player = store.get_user_by_id(auction['player_id'])
         if not player:
-            cur.close()
-            return "Player for this auction not found", 404
+            return action_failed("Player for this auction not found", 404, None)
         
         # नीलामी को रीसेट करें
-        if DATABASE_URL:
-            cur.execute("UPDATE auctions SET status = 'live', current_price = %s, highest_bidding_team_id = NULL WHERE id = %s", (player['base_price'], auction_id))
-        else:
-            cur.execute("UPDATE auctions SET status = 'live', current_price = ?, highest_bidding_team_id = NULL WHERE id = ?", (player['base_price'], auction_id))
-        conn.commit()
-        cur.close()
+        ends_at = auction_deadline(NO_BID_DURATION)
+        store.restart_auction(auction_id, player['base_price'], ends_at)
+        store.commit()
+        set_player_status(auction['player_id'], 'live')
+
+        # 60-सेकंड का 'नो-बिड' टाइमर फिर से शुरू करें
+        schedule_auction_timer(auction['event_id'], auction_id, ends_at, mark_as_unsold)
         
         # Re-emit the new_auction event to make it appear on all feeds
-        socketio.emit('new_auction', {
+        auction_data = {
             'id': auction_id,
             'title': auction['title'],
             'price': player['base_price'],
             'discord_name': player['discord_name'],
             'base_price': player['base_price'],
             'game_level': player['game_level'],
-            'time_left': NO_BID_DURATION
-        })
-        log_activity(f"Player '{auction['title']}' is being re-auctioned.")
-        
-        # 60-सेकंड का 'नो-बिड' टाइमर फिर से शुरू करें
-        timer_thread = Timer(NO_BID_DURATION, mark_as_unsold, args=[auction_id])
-        timer_thread.start()
-        # Store the timer thread and its end time
-        end_time = time.time() + NO_BID_DURATION
-        active_bids[auction_id] = {'thread': timer_thread, 'end_time': end_time}
+            'player_id': auction['player_id'],
+            'ends_at': ends_at
+        }
+        socketio.emit('new_auction', auction_data, to=event_room(auction['event_id']))
+        log_activity(f"Player '{auction['title']}' is being re-auctioned.", auction['event_id'])
         
     except Exception as e:
         print(f"Error re-auctioning player: {e}")
-        conn.rollback()
-        cur.close()
-    return redirect(url_for('admin_dashboard'))
+        store.rollback()
+        return action_failed(f"Could not re-auction the player: {e}", 500, 'admin_dashboard')
+    return action_done({'auction': auction_data}, 'admin_dashboard')
+
+@app.route('/admin/reauction_unsold', methods=['POST'])
+def reauction_unsold():
+    """Re-auction the selected (or, with scope=all, every) unsold player of the event in one batch."""
+    if not is_admin():
+        return admin_only()
+    form = action_form()
+    event_id = current_event_id()
+    selected = form.getlist('auction_ids') if hasattr(form, 'getlist') else form.get('auction_ids') or []
+    try:
+        selected = {int(auction_id) for auction_id in selected}
+    except (TypeError, ValueError):
+        return action_failed("auction_ids must be auction ids.", 400, 'admin_dashboard', error="auction_ids must be auction ids.")
+    reauction_all = form.get('scope') == 'all'
+    if not reauction_all and not selected:
+        return action_failed("Select at least one unsold player.", 400, 'admin_dashboard', error="Select at least one unsold player.")
+
+    try:
+        unsold = [auction for auction in store.unsold_auctions(event_id) if reauction_all or auction['id'] in selected]
+        if not unsold:
+            return action_failed("No unsold auctions to re-auction.", 404, 'admin_dashboard', error="No unsold auctions to re-auction.")
+        # First deadline as for a single re-auction, then one every REAUCTION_STAGGER_SECONDS
+        first_ends_at = auction_deadline(NO_BID_DURATION)
+        auctions = [{
+            'id': auction['id'],
+            'title': auction['title'],
+            'price': auction['base_price'],
+            'discord_name': auction['discord_name'],
+            'base_price': auction['base_price'],
+            'game_level': auction['game_level'],
+            'player_id': auction['player_id'],
+            'ends_at': round(first_ends_at + position * REAUCTION_STAGGER_SECONDS, 3),
+        } for position, auction in enumerate(unsold)]
+        restarted = set(store.restart_auctions([(auction['id'], auction['price'], auction['ends_at']) for auction in auctions]))
+        store.commit()
+    except Exception as e:
+        print(f"Error re-auctioning unsold players: {e}")
+        store.rollback()
+        return action_failed(f"Could not re-auction the players: {e}", 500, 'admin_dashboard')
+    # Auctions restarted by someone else in the meantime were left alone: no timer or event for those
+    auctions = [auction for auction in auctions if auction['id'] in restarted]
+    if not auctions:
+        return action_failed("No unsold auctions to re-auction.", 404, 'admin_dashboard', error="No unsold auctions to re-auction.")
+
+    for auction in auctions:
+        set_player_status(auction['player_id'], 'live')
+        schedule_auction_timer(event_id, auction['id'], auction['ends_at'], mark_as_unsold)
+    # One event for the whole batch instead of a new_auction per player
+    socketio.emit('auctions_restarted', {'auctions': auctions}, to=event_room(event_id))
+    log_activity(f"{len(auctions)} unsold players are being re-auctioned.", event_id)
+    return action_done({'auctions': auctions}, 'admin_dashboard')
 
 @app.route('/admin/start_auction/<int:user_id>', methods=['POST'])
 def start_auction(user_id):
     """एक खिलाड़ी के लिए नीलामी शुरू करता है जो अभी तक नीलाम नहीं हुआ है।"""
     if not is_admin():
-        return redirect(url_for('index'))
-    conn = get_db_connection()
-    cur = get_dict_cursor(conn)
+        return admin_only()
     try:
-        if DATABASE_URL:
-            cur.execute("SELECT * FROM users WHERE id = %s AND role = 'bidder'", (user_id,))
-        else:
-            cur.execute("SELECT * FROM users WHERE id = ? AND role = 'bidder'", (user_id,))
-        player = cur.fetchone()
-        if not player:
-            cur.close()
-            return "Player not found", 404
+        player = store.get_user_by_id(user_id)
+        if not player or player['role'] != 'bidder':
+            return action_failed("Player not found", 404, None)
         
-        if DATABASE_URL:
-            cur.execute("SELECT id FROM auctions WHERE title = %s", (player['username'],))
-        else:
-            cur.execute("SELECT id FROM auctions WHERE title = ?", (player['username'],))
-        existing_auction = cur.fetchone()
-        if existing_auction:
-            cur.close()
-            return redirect(url_for('admin_dashboard', error=f"Auction for {player['username']} already exists."))
+        if store.auction_for_player(user_id):
+            return action_failed(f"Auction for {player['username']} already exists.", 409, 'admin_dashboard', error=f"Auction for {player['username']} already exists.")
 
-        # खिलाड़ी के लिए एक नई नीलामी बनाएँ
-        if DATABASE_URL:
-            cur.execute("INSERT INTO auctions (title, current_price, status) VALUES (%s, %s, %s) RETURNING id", (player['username'], player['base_price'], 'live'))
-            auction_id = cur.fetchone()['id']
-        else:
-            cur.execute("INSERT INTO auctions (title, current_price, status) VALUES (?, ?, ?)", (player['username'], player['base_price'], 'live'))
-            auction_id = cur.lastrowid
-        conn.commit()
+        # खिलाड़ी के लिए एक नई नीलामी बनाएँ, in the player's own event
+        event_id = player['event_id']
+        ends_at = auction_deadline(NO_BID_DURATION)
+        auction_id = store.create_auction(player['username'], player['base_price'], event_id, player_id=user_id, ends_at=ends_at)
+        store.commit()
+        set_player_status(user_id, 'live')
+
+        # 60-सेकंड का 'नो-बिड' टाइमर शुरू करें
+        schedule_auction_timer(event_id, auction_id, ends_at, mark_as_unsold)
         
         # सभी को नई नीलामी के बारे में सूचित करें
-        socketio.emit('new_auction', {
+        auction_data = {
             'id': auction_id,
             'title': player['username'],
             'price': player['base_price'],
             'discord_name': player['discord_name'],
             'base_price': player['base_price'],
             'game_level': player['game_level'],
-            'time_left': NO_BID_DURATION
-        })
-        cur.close()
-        log_activity(f"Auction started for player '{player['username']}' with a base price of ₹{player['base_price']:.2f}.")
-
-        # 60-सेकंड का 'नो-बिड' टाइमर शुरू करें
-        timer_thread = Timer(NO_BID_DURATION, mark_as_unsold, args=[auction_id])
-        timer_thread.start()
-        end_time = time.time() + NO_BID_DURATION
-        active_bids[auction_id] = {'thread': timer_thread, 'end_time': end_time}
+            'player_id': user_id,
+            'ends_at': ends_at
+        }
+        socketio.emit('new_auction', auction_data, to=event_room(event_id))
+        log_activity(f"Auction started for player '{player['username']}' with a base price of ₹{player['base_price']:.2f}.", event_id)
     except Exception as e:
         print(f"Error starting auction: {e}")
-        conn.rollback()
-        cur.close()
-    return redirect(url_for('admin_dashboard'))
+        store.rollback()
+        return action_failed(f"Could not start the auction: {e}", 500, 'admin_dashboard')
+    return action_done({'auction': auction_data}, 'admin_dashboard')
 
 @app.route('/admin/add_auction', methods=['POST'])
 def add_auction():
@@ -999,75 +1407,95 @@ def add_auction():
         return redirect(url_for('index'))
     title = request.form['title']
     starting_price = float(request.form['price'])
-    conn = get_db_connection()
-    cur = get_dict_cursor(conn)
+    event_id = current_event_id()
     try:
-        if DATABASE_URL:
-            cur.execute("INSERT INTO auctions (title, current_price, status) VALUES (%s, %s, %s)", (title, starting_price, 'live'))
-        else:
-            cur.execute("INSERT INTO auctions (title, current_price, status) VALUES (?, ?, ?)", (title, starting_price, 'live'))
-        conn.commit()
-        cur.close()
-        socketio.emit('new_auction', {'title': title, 'price': starting_price})
+        store.create_auction(title, starting_price, event_id)
+        store.commit()
+        socketio.emit('new_auction', {'title': title, 'price': starting_price}, to=event_room(event_id))
     except Exception as e:
         print(f"Error adding auction: {e}")
-        conn.rollback()
-        cur.close()
+        store.rollback()
     return redirect(url_for('admin_dashboard'))
 
+# --- Player Search ---
+
+def load_player_search():
+    """Rebuild the player search index from the database."""
+    global player_search_loaded_at
+    rows = store.reader().player_search_rows()
+    statuses = {None: 'ready', 'live': 'live', 'Sold': 'sold', 'Unsold': 'unsold'}
+    player_search.load({
+        'id': row['id'],
+        'username': row['username'],
+        'discord_name': row['discord_name'],
+        'base_price': row['base_price'],
+        'game_level': row['game_level'],
+        'event_id': row['event_id'],
+        'status': statuses.get(row['auction_status'], 'ready'),
+    } for row in rows)
+    player_search_loaded_at = time.monotonic()
+
+def get_player_search():
+    """The player search index, (re)loaded when missing or older than PLAYER_INDEX_MAX_AGE."""
+    with player_search_lock:
+        if player_search_loaded_at is None or time.monotonic() - player_search_loaded_at > PLAYER_INDEX_MAX_AGE:
+            load_player_search()
+    return player_search
+
+def index_player(player):
+    # Until the first search loads the index there is nothing to keep current
+    if player_search_loaded_at is not None:
+        player_search.add(player)
+
+def set_player_status(player_id, status):
+    if player_search_loaded_at is not None and player_id is not None:
+        player_search.set_status(player_id, status)
+
+@app.route('/admin/players/search')
+def search_players():
+    """JSON player search: q (prefix, or substring with mode=substring), level, min_price, max_price, status."""
+    if not is_admin():
+        return jsonify({'error': 'Admin access required.'}), 403
+    args = request.args
+    try:
+        min_price = float(args['min_price']) if args.get('min_price') else None
+        max_price = float(args['max_price']) if args.get('max_price') else None
+        limit = max(1, min(int(args.get('limit', 50)), PLAYER_SEARCH_MAX_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'min_price, max_price and limit must be numbers.'}), 400
+    status = args.get('status', 'ready')
+    if status == 'all':
+        status = None
+    elif status not in player_index.STATUSES:
+        return jsonify({'error': f"status must be one of {', '.join(player_index.STATUSES)} or all."}), 400
+
+    started = time.perf_counter()
+    total, players = get_player_search().search(
+        event_id=current_event_id(),
+        q=args.get('q', '').strip(),
+        mode=args.get('mode', 'prefix'),
+        game_level=args.get('level') or None,
+        min_price=min_price,
+        max_price=max_price,
+        status=status,
+        limit=limit,
+    )
+    return jsonify({
+        'total': total,
+        'players': players,
+        'took_ms': round((time.perf_counter() - started) * 1000, 3),
+    })
+
 @app.route('/manage_teams')
 def manage_teams():
     if not is_admin():
         return redirect(url_for('index'))
-    conn = get_db_connection()
-    cur = get_dict_cursor(conn)
-    
-    if DATABASE_URL:
-        # PostgreSQL syntax for aggregate function
-        cur.execute("""
-            SELECT t.id, t.name, t.budget, STRING_AGG(sp.player_name, ', ') as members
-            FROM teams t
-            LEFT JOIN sold_players sp ON sp.winning_team_id = t.id
-            GROUP BY t.id, t.name, t.budget
-            ORDER BY t.name
-        """)
-    else:
-        # SQLite syntax for aggregate function
-        cur.execute("""
-            SELECT 
-                t.id, 
-                t.name, 
-                t.budget, 
-                (
-                    SELECT GROUP_CONCAT(sp.player_name, ', ') 
-                    FROM sold_players sp 
-                    WHERE sp.winning_team_id = t.id
-                ) as members
-            FROM teams t
-            ORDER BY t.name
-        """)
-    teams_with_budgets = cur.fetchall()
-    
+    event_id = current_event_id()
+    reads = store.reader()
+    teams_with_budgets = reads.team_rosters(event_id)
     # Get sold players by team for the display below
-    if DATABASE_URL:
-        cur.execute("""
-            SELECT t.name as team_name, sp.player_name
-            FROM sold_players sp
-            JOIN teams t ON sp.winning_team_id = t.id
-            ORDER BY t.name, sp.player_name
-        """)
-    else:
-        cur.execute("""
-            SELECT t.name as team_name, sp.player_name
-            FROM sold_players sp
-            JOIN teams t ON sp.winning_team_id = t.id
-            ORDER BY t.name, sp.player_name
-        """)
-    sold_players_by_team = cur.fetchall()
-    
-    cur.execute("SELECT id, name FROM teams ORDER BY name")
-    all_teams = cur.fetchall()
-    cur.close()
+    sold_players_by_team = reads.sold_players(event_id)
+    all_teams = reads.list_teams(event_id)
     
     return render_template('manage_teams.html', 
                            teams_with_budgets=teams_with_budgets,
@@ -1076,298 +1504,741 @@ def manage_teams():
                            error=request.args.get('error'),
                            success=request.args.get('success')) # Added success message
 
+# --- Exports ---
+# After the auction every team manager downloads the same CSVs, so each export
+# is kept as encoded bytes per event, keyed by events.data_version. Sales, new
+# teams and budget changes bump it (other SQLite workers see the bump within
+# SETTINGS_POLL_SECONDS). The version comes from the cached events row, so a
+# repeat download runs no query and no CSV encoding, and a browser sending back
+# the ETag gets a 304.
+
+def cached_export(event_id, name, build_rows):
+    """(body, etag, built_at) of an export at the event's current data version."""
+    event = get_event(event_id)
+    version = event['data_version'] if event else 0
+    cached = export_cache.get((event_id, name))
+    if cached and cached[0] == version:
+        return cached[1:]
+    with export_lock:
+        # Many managers download right after a sale; build each version once
+        cached = export_cache.get((event_id, name))
+        if cached and cached[0] == version:
+            return cached[1:]
+        output = io.StringIO()
+        csv.writer(output).writerows(build_rows(event_id))
+        body = output.getvalue().encode('utf-8')
+        etag = hashlib.sha1(body).hexdigest()[:20]
+        built_at = datetime.now(timezone.utc).replace(microsecond=0)
+        export_cache[(event_id, name)] = (version, body, etag, built_at)
+        return body, etag, built_at
+
+def export_response(export, filename):
+    body, etag, built_at = export
+    response = Response(body, mimetype="text/csv", headers={"Content-Disposition": f"attachment;filename={filename}"})
+    response.set_etag(etag)
+    response.last_modified = built_at
+    # Only for logged-in users: browsers may keep a copy but must revalidate it
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    # 304 without a body if If-None-Match / If-Modified-Since still match
+    return response.make_conditional(request)
+
+def sold_players_rows(event_id):
+    # Built from the primary: the version was bumped there, a replica may lag behind it
+    rows = [['Player Name', 'Team Name', 'Sold Price (₹)']]
+    rows.extend([player['player_name'], player['team_name'], player['sold_price']] for player in store.sold_players(event_id))
+    return rows
+
+def team_roster_rows(event_id):
+    rows = [['Team Name', 'Budget Remaining (₹)', 'Players Bought']]
+    rows.extend([team['name'], team['budget'], team['members'] or ''] for team in store.team_rosters(event_id))
+    return rows
+
 @app.route('/download_sold_players')
 def download_sold_players():
-    conn = get_db_connection()
-    cur = get_dict_cursor(conn)
-    if DATABASE_URL:
-        cur.execute("""
-            SELECT sp.player_name, t.name as team_name, sp.sold_price
-            FROM sold_players sp
-            JOIN teams t ON sp.winning_team_id = t.id
-            ORDER BY t.name, sp.player_name
-        """)
-    else:
-        cur.execute("""
-            SELECT sp.player_name, t.name as team_name, sp.sold_price
-            FROM sold_players sp
-            JOIN teams t ON sp.winning_team_id = t.id
-            ORDER BY t.name, sp.player_name
-        """)
-    sold_players_data = cur.fetchall()
-    cur.close()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['Player Name', 'Team Name', 'Sold Price (₹)'])
-    for player in sold_players_data:
-        writer.writerow([player['player_name'], player['team_name'], player['sold_price']])
-    
-    output.seek(0)
-    return Response(
-        output,
-        mimetype="text/csv",
-        headers={"Content-Disposition": "attachment;filename=sold_players.csv"}
-    )
+    if 'username' not in session:
+        return redirect(url_for('login'))
+    event_id = current_event_id()
+    return export_response(cached_export(event_id, 'sold_players', sold_players_rows), 'sold_players.csv')
 
 @app.route('/download_team_roster')
 def download_team_roster():
-    conn = get_db_connection()
-    cur = get_dict_cursor(conn)
-    
-    if DATABASE_URL:
-        cur.execute("""
-            SELECT t.name, t.budget, STRING_AGG(sp.player_name, ', ') as members
-            FROM teams t
-            LEFT JOIN sold_players sp ON sp.winning_team_id = t.id
-            GROUP BY t.id, t.name, t.budget
-            ORDER BY t.name
-        """)
-    else:
-        # SQLite
-        cur.execute("""
-            SELECT 
-                t.name, 
-                t.budget, 
-                (
-                    SELECT GROUP_CONCAT(sp.player_name, ', ') 
-                    FROM sold_players sp 
-                    WHERE sp.winning_team_id = t.id
-                ) as members
-            FROM teams t
-            ORDER BY t.name
-        """)
-    teams_data = cur.fetchall()
-    cur.close()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['Team Name', 'Budget Remaining (₹)', 'Players Bought'])
-    for team in teams_data:
-        writer.writerow([team['name'], team['budget'], team['members'] or ''])
-    
-    output.seek(0)
-    return Response(
-        output,
-        mimetype="text/csv",
-        headers={"Content-Disposition": "attachment;filename=team_roster.csv"}
-    )
+    if 'username' not in session:
+        return redirect(url_for('login'))
+    event_id = current_event_id()
+    return export_response(cached_export(event_id, 'team_roster', team_roster_rows), 'team_roster.csv')
+
+# --- Analytics ---
+
+def get_auction_analytics(event_id):
+    """Return an event's post-auction analytics report, recomputing it only after a sale."""
+    # One cheap query decides whether the cached report is still valid.
+    fingerprint = store.sales_fingerprint(event_id)
+
+    with analytics_lock:
+        cached = analytics_cache.get(event_id)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+
+        # Plain tuples: the rows are unpacked by position in analytics.build_report
+        sales, teams, total_players = store.analytics_inputs(event_id)
+
+        import analytics  # NumPy is only loaded when a report is requested
+        report = analytics.build_report(sales, teams, total_players, fingerprint[2])
+        analytics_cache[event_id] = (fingerprint, report)
+        return report
+
+@app.route('/admin/analytics')
+def auction_analytics():
+    if not is_admin():
+        return jsonify({'error': 'Admin access required.'}), 403
+    return jsonify(get_auction_analytics(current_event_id()))
+
+@app.cli.command('analytics')
+@click.option('--event', 'event_id', default=DEFAULT_EVENT_ID, help='Auction event id.')
+def analytics_command(event_id):
+    """Print an event's post-auction analytics report as JSON."""
+    print(json.dumps(get_auction_analytics(event_id), indent=2, ensure_ascii=False))
+
+# --- Backup and Restore ---
+# A backup is every table (read by storage.dump_tables from the SQLite online
+# backup API or one PostgreSQL REPEATABLE READ snapshot, so bidding carries on)
+# plus the proxy bids, which only live in memory, and the auction clock at the
+# snapshot. A live auction's deadline is auctions.ends_at: a restore moves those
+# forward by the time since the snapshot, so every auction resumes with the
+# time it had left, and re-arms the timers from them.
+
+def runtime_state():
+    """Auction state that is not in the database: the proxy (maximum) bids and the
+    clock the live deadlines count down against."""
+    return {'proxy_bids': {str(auction_id): {str(team_id): list(entry) for team_id, entry in book.items()}
+                           for auction_id, book in proxy_book.snapshot().items()},
+            'clock': clock.now()}
+
+def write_backup(out):
+    """Snapshot the database and runtime_state() into the binary file `out`; return the manifest."""
+    return backup.create_backup(store, out, runtime_state(), SCHEMA_VERSION)
+
+def restore_state(data):
+    """Replace every row with a backup archive and reload this process's caches and
+    proxy bids from it. Returns the manifest; raises ValueError for a bad archive."""
+    # Nothing still queued may settle against the restored rows
+    wait_for_settlements()
+    try:
+        manifest, state = backup.restore_backup(store, data, SCHEMA_VERSION)
+        # Taken just before the tables were read, so no auction comes back with less time than it had
+        taken_at = state.get('clock', manifest['created_at'])
+        store.shift_live_deadlines(max(0.0, clock.now() - taken_at))
+        store.commit()
+    except BaseException:
+        store.rollback()
+        raise
+    proxy_book.load({int(auction_id): {int(team_id): tuple(entry) for team_id, entry in book.items()}
+                     for auction_id, book in state.get('proxy_bids', {}).items()})
+    invalidate_settings()
+    with export_lock:
+        export_cache.clear()
+    with analytics_lock:
+        analytics_cache.clear()
+    with player_search_lock:
+        load_player_search()
+    return manifest
+
+def rearm_auction_timers():
+    """Replace this process's auction timers with one per live auction in the database."""
+    for timers in list(active_bids.values()):
+        for timer in list(timers.values()):
+            timer['thread'].cancel()
+    active_bids.clear()
+    for event in list_events():
+        for auction in store.list_auctions(event['id'], status='live'):
+            rearm_auction_timer(dict(auction, event_id=event['id']))
+
+@app.route('/admin/backup')
+def download_backup():
+    """Download a compressed snapshot of the whole auction (every event)."""
+    if not is_admin():
+        return admin_only()
+    if not store.supports_backup:
+        return action_failed("Backups need a database (STORAGE_BACKEND=sql).", 400, None)
+    out = tempfile.TemporaryFile()
+    try:
+        manifest = write_backup(out)
+    except Exception as e:
+        out.close()
+        store.rollback()
+        return action_failed(f"Backup failed: {e}", 500, None)
+    out.seek(0)
+    stamp = datetime.fromtimestamp(manifest['created_at'], timezone.utc).strftime('%Y%m%d-%H%M%S')
+    return send_file(out, mimetype='application/gzip', as_attachment=True, download_name=f"auction-backup-{stamp}.tar.gz")
+
+@app.route('/admin/restore', methods=['POST'])
+def restore_backup_upload():
+    """Replace everything with an uploaded backup, re-arming the live auctions' timers."""
+    if not is_admin():
+        return admin_only()
+    if not store.supports_backup:
+        return action_failed("Backups need a database (STORAGE_BACKEND=sql).", 400, None)
+    upload = request.files.get('backup_file')
+    if not upload or not upload.filename:
+        return action_failed("Choose a backup file to restore.", 400, None)
+    try:
+        manifest = restore_state(upload.stream)
+    except ValueError as e:
+        return action_failed(str(e), 400, None)
+    except Exception as e:
+        return action_failed(f"Restore failed: {e}", 500, None)
+    rearm_auction_timers()
+    taken = datetime.fromtimestamp(manifest['created_at'], timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+    log_activity(f"Admin restored the backup taken at {taken}.", current_event_id())
+    return action_done({'restored': {table: info['rows'] for table, info in manifest['tables'].items()}}, 'admin_dashboard')
+
+@app.cli.command('backup')
+@click.argument('output')
+def backup_command(output):
+    """Write a compressed snapshot of the database to OUTPUT (fine while the server runs)."""
+    if not store.supports_backup:
+        raise click.ClickException("Backups need a database (STORAGE_BACKEND=sql).")
+    with open(output, 'wb') as f:
+        manifest = write_backup(f)
+    rows = sum(info['rows'] for info in manifest['tables'].values())
+    print(f"Backed up {rows} rows to {output} ({os.path.getsize(output) / 1024:.1f} KiB) in {manifest['seconds']} s.")
+
+@app.cli.command('restore')
+@click.argument('backup_file')
+@click.confirmation_option(prompt='This replaces every row in the database. Continue?')
+def restore_command(backup_file):
+    """Replace the database with BACKUP_FILE. Stop the server first, or restore
+    through /admin/restore so it re-arms its auction timers."""
+    if not store.supports_backup:
+        raise click.ClickException("Backups need a database (STORAGE_BACKEND=sql).")
+    started = time.perf_counter()
+    with open(backup_file, 'rb') as f:
+        manifest = restore_state(f)
+    rows = sum(info['rows'] for info in manifest['tables'].values())
+    print(f"Restored {rows} rows in {time.perf_counter() - started:.2f} s.")
+
+# --- Profiling ---
+# One sampling run at a time per process; it blocks only the admin's own request
+
+profile_lock = threading.Lock()
+
+@app.route('/admin/profile')
+def profile_threads():
+    """Sample every thread of this worker for `seconds` (bid handlers, timers, the
+    settlement worker...). Returns the hottest functions as JSON, or with
+    format=collapsed a collapsed-stack file for flamegraph.pl / speedscope."""
+    if not is_admin():
+        return admin_only()
+    try:
+        seconds = min(float(request.args.get('seconds', 10)), PROFILE_MAX_SECONDS)
+        interval_ms = max(float(request.args.get('interval_ms', PROFILE_INTERVAL_MS)), 1.0)
+        top = int(request.args.get('top', 25))
+    except ValueError:
+        return jsonify({'error': 'seconds, interval_ms and top must be numbers.'}), 400
+    if seconds <= 0:
+        return jsonify({'error': 'seconds must be positive.'}), 400
+    if not profile_lock.acquire(blocking=False):
+        return jsonify({'error': 'A profile is already running.'}), 409
+    try:
+        profile = sampler.sample(seconds, interval_ms / 1000.0, include_idle=request.args.get('idle') == '1')
+    finally:
+        profile_lock.release()
+    if request.args.get('format') == 'collapsed':
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+        return Response(profile.collapsed(), mimetype='text/plain',
+                        headers={'Content-Disposition': f"attachment;filename=profile-{os.getpid()}-{stamp}.folded"})
+    return jsonify(dict(profile.summary(top), pid=os.getpid()))
 
 # --- SocketIO for Live Bidding ---
 
 def end_bidding(auction_id):
     """बिडिंग अवधि समाप्त होने पर कॉल किया जाने वाला फ़ंक्शन।"""
-    with app.app_context():
-        print(f"Auction {auction_id} bidding period ended. Determining winner.")
-        conn = get_db_connection()
-        cur = get_dict_cursor(conn)
-        
+    record_event('timer', name='end_bidding', auction_id=auction_id)
+    enqueue_settlement(auction_id, False)
+
+# --- Settlement Pipeline ---
+# Timer threads only enqueue expired auctions. One worker thread drains the
+# queue and closes everything pending in a single transaction, then emits the
+# results together with one stats update.
+
+settlement_queue = queue.Queue()
+settlement_thread = None
+settlement_thread_lock = threading.Lock()
+
+def enqueue_settlement(auction_id, unsold_only):
+    """Hand an expired auction to the settlement worker."""
+    global settlement_thread
+    with settlement_thread_lock:
+        if settlement_thread is None:
+            settlement_thread = threading.Thread(target=settlement_worker, name='settlement', daemon=True)
+            settlement_thread.start()
+    settlement_queue.put((auction_id, unsold_only))
+
+def wait_for_settlements():
+    """Block until every queued settlement has been processed (used by replay)."""
+    settlement_queue.join()
+
+def settlement_worker():
+    while True:
+        batch = [settlement_queue.get()]
+        while len(batch) < SETTLEMENT_BATCH_MAX:
+            try:
+                batch.append(settlement_queue.get_nowait())
+            except queue.Empty:
+                break
         try:
-            if DATABASE_URL:
-                cur.execute("SELECT * FROM auctions WHERE id = %s AND status = 'live'", (auction_id,))
-            else:
-                cur.execute("SELECT * FROM auctions WHERE id = ? AND status = 'live'", (auction_id,))
-            auction = cur.fetchone()
-            
-            if not auction:
-                print(f"Auction {auction_id} not found or already closed/sold.")
-                return
-            
-            player_name = auction['title']
-            winning_team_id = auction['highest_bidding_team_id']
-            sold_price = auction['current_price']
-            
-            if winning_team_id is None:
-                # Unsold logic
-                if DATABASE_URL:
-                    cur.execute("UPDATE auctions SET status = 'Unsold' WHERE id = %s", (auction_id,))
-                else:
-                    cur.execute("UPDATE auctions SET status = 'Unsold' WHERE id = ?", (auction_id,))
-                conn.commit()
-                
-                log_activity(f"Player '{player_name}' went unsold as the timer ran out.")
-                socketio.emit('player_unsold', {'auction_id': auction_id, 'player_name': player_name})
-                broadcast_stats()
-                
-            else:
-                # Sold logic
-                if DATABASE_URL:
-                    cur.execute("UPDATE auctions SET status = 'Sold' WHERE id = %s", (auction_id,))
-                    cur.execute("INSERT INTO sold_players (player_name, winning_team_id, sold_price) VALUES (%s, %s, %s)", (player_name, winning_team_id, sold_price))
-                    cur.execute("SELECT id FROM users WHERE username = %s", (player_name,))
-                else:
-                    cur.execute("UPDATE auctions SET status = 'Sold' WHERE id = ?", (auction_id,))
-                    cur.execute("INSERT INTO sold_players (player_name, winning_team_id, sold_price) VALUES (?, ?, ?)", (player_name, winning_team_id, sold_price))
-                    cur.execute("SELECT id FROM users WHERE username = ?", (player_name,))
-                
-                player_user = cur.fetchone()
-                if player_user:
-                    if DATABASE_URL:
-                        cur.execute("UPDATE users SET team_id = %s WHERE id = %s", (winning_team_id, player_user['id']))
-                    else:
-                        cur.execute("UPDATE users SET team_id = ? WHERE id = ?", (winning_team_id, player_user['id']))
-                        
-                if DATABASE_URL:
-                    cur.execute("UPDATE teams SET budget = budget - %s WHERE id = %s", (sold_price, winning_team_id))
-                    cur.execute("SELECT name, budget FROM teams WHERE id = %s", (winning_team_id,))
-                else:
-                    cur.execute("UPDATE teams SET budget = budget - ? WHERE id = ?", (sold_price, winning_team_id))
-                    cur.execute("SELECT name, budget FROM teams WHERE id = ?", (winning_team_id,))
-                    
-                conn.commit()
-                
-                winning_team = cur.fetchone()
-                socketio.emit('player_sold', {
-                    'auction_id': auction_id,
-                    'player_name': player_name,
-                    'team_name': winning_team['name'],
-                    'price': sold_price,
-                    'winning_team_id': winning_team_id,
-                    'new_budget': winning_team['budget']
-                })
-                log_activity(f"Player '{player_name}' was sold to '{winning_team['name']}' for ₹{sold_price:.2f}.")
-                broadcast_stats()
-
-            # सक्रिय बिड से ऑक्शन को हटा दें
-            if auction_id in active_bids:
-                active_bids.pop(auction_id, None)
-
+            settle_auctions(batch)
         except Exception as e:
-            print(f"Error in end_bidding: {e}")
-            conn.rollback()
+            print(f"Error in settlement worker: {e}")
         finally:
-            cur.close()
+            for _ in batch:
+                settlement_queue.task_done()
+
+def settle_auctions(batch):
+    """Close a batch of expired auctions in one transaction, then emit all results."""
+    end_ids = sorted({auction_id for auction_id, unsold_only in batch if not unsold_only})
+    unsold_ids = sorted({auction_id for auction_id, unsold_only in batch if unsold_only} - set(end_ids))
+    auction_ids = sorted(set(end_ids) | set(unsold_ids))
+
+    # Hold the same per-auction locks as place_bid so no bid lands mid-settlement
+    locks = [proxy_book.lock(auction_id) for auction_id in auction_ids]
+    for lock in locks:
+        lock.acquire()
+    try:
+        with app.app_context():
+            try:
+                # 'Unsold'-only ids (the no-bid timer) are skipped if a bid arrived in the meantime,
+                # and so is any auction a bid extended after its timer fired
+                now = clock.now()
+                results = store.settle_auctions(end_ids, unsold_ids, now)
+
+                timestamp = time.strftime('%H:%M:%S')
+                # (event_id, message) per closed auction; a batch can span several events
+                messages = []
+                for result in results:
+                    if result['winning_team_id'] is not None:
+                        message = f"Player '{result['player_name']}' was sold to '{result['team_name']}' for ₹{result['sold_price']:.2f}."
+                    elif result['auction_id'] in unsold_ids:
+                        message = f"Player '{result['player_name']}' went unsold as no bids were placed."
+                    else:
+                        message = f"Player '{result['player_name']}' went unsold as the timer ran out."
+                    messages.append((result['event_id'], message))
+                store.add_activity([(m, timestamp, e) for e, m in messages])
+                # Sales change the sold players and roster exports
+                sold_events = [result['event_id'] for result in results if result['winning_team_id'] is not None]
+                store.bump_data_version(sold_events)
+                store.commit()
+                if sold_events:
+                    auction_events.invalidate()
+
+                # Still live: give each its timer for the stored deadline (normally the
+                # bid that moved it already did; this also covers a timer that fired early)
+                closed = {result['auction_id'] for result in results}
+                for auction_id in auction_ids:
+                    if auction_id not in closed:
+                        rearm_auction_timer(store.get_auction(auction_id))
+            except Exception as e:
+                print(f"Error settling auctions {auction_ids}: {e}")
+                store.rollback()
+                return
+    finally:
+        for lock in locks:
+            lock.release()
+
+    for result in results:
+        auction_id = result['auction_id']
+        room = event_room(result['event_id'])
+        # सक्रिय बिड से ऑक्शन को हटा दें
+        active_bids.get(result['event_id'], {}).pop(auction_id, None)
+        proxy_book.clear(auction_id)
+        set_player_status(result['player_id'], 'sold' if result['winning_team_id'] is not None else 'unsold')
+        if result['winning_team_id'] is not None:
+            socketio.emit('player_sold', {
+                'auction_id': auction_id,
+                'player_name': result['player_name'],
+                'team_name': result['team_name'],
+                'price': result['sold_price'],
+                'winning_team_id': result['winning_team_id'],
+                'new_budget': result['new_budget']
+            }, to=room)
+        else:
+            socketio.emit('player_unsold', {'auction_id': auction_id, 'player_name': result['player_name']}, to=room)
+    for event_id, message in messages:
+        socketio.emit('new_activity', {'message': message, 'timestamp': timestamp}, to=event_room(event_id))
+    # One stats update per event that had auctions close
+    for event_id in sorted({result['event_id'] for result in results}):
+        broadcast_stats(event_id)
 
 @socketio.on('connect')
 def handle_connect(auth=None):
+    if SPECTATOR_WORKER:
+        # Spectator workers only serve the /spectate namespace
+        return False
+    # Live updates are broadcast per event; each client only joins its own
+    event_id = current_event_id()
+    join_room(event_room(event_id))
+    # Running deadlines; clients count down locally from here (see clock_sync)
+    emit('auction_deadlines', auction_deadlines(event_id))
     if 'username' in session:
-        conn = get_db_connection()
-        cur = get_dict_cursor(conn)
         try:
-            if DATABASE_URL:
-                cur.execute("SELECT message, timestamp FROM activity_log ORDER BY id DESC LIMIT 50")
-            else:
-                cur.execute("SELECT message, timestamp FROM activity_log ORDER BY id DESC LIMIT 50")
-            history = cur.fetchall()
-            # Reverse order so oldest are first
-            history_data = [{'message': row['message'], 'timestamp': row['timestamp']} for row in reversed(history)]
-            emit('activity_history', history_data)
+            # Oldest first
+            emit('activity_history', store.recent_activity(event_id, 50))
         except Exception as e:
             print(f"Error fetching activity history: {e}")
-        finally:
-            cur.close()
         print(f"User {session['username']} connected.")
 
-@socketio.on('get_all_timers')
-def handle_get_all_timers():
-    """क्लाइंट को सभी सक्रिय ऑक्शन टाइमर भेजता है।"""
-    timers_data = {}
-    current_time = time.time()
-    for auction_id, data in active_bids.items():
-        time_left = max(0, int(data['end_time'] - current_time))
-        timers_data[auction_id] = time_left
-    emit('all_timers', timers_data)
-
+@socketio.on('clock_sync', namespace=SPECTATOR_NAMESPACE)
+@socketio.on('clock_sync')
+def handle_clock_sync():
+    """Acknowledge with the server clock so the client can estimate its offset."""
+    return clock.now()
+
+# --- Spectators ---
+# Viewers of a shared feed don't get the per-bid events. A ticker thread in each
+# process rebuilds one snapshot per watched event from the database (the replica
+# when configured) and emits it to that event's /spectate room only when it
+# changed, so the cost is a few queries per tick whatever the number of viewers,
+# and nothing is added to the bid handlers. Countdowns come from ends_at.
+
+spectators = {}  # sid -> event_id, for this process's /spectate connections
+spectator_snapshots = {}  # event_id -> last snapshot sent
+spectator_thread = None
+spectator_thread_lock = threading.Lock()
+
+def build_spectator_snapshot(event_id):
+    """Live auctions, stats and recent activity of one event."""
+    with app.app_context():
+        reads = store.reader(stale_ok=True)
+        auctions = [{'id': row['id'], 'title': row['title'], 'price': float(row['current_price']),
+                     'bidder': row['highest_bidder_username'], 'ends_at': row['ends_at']}
+                    for row in reads.list_auctions(event_id, status='live')]
+        stats = reads.event_stats(event_id)
+        activity = reads.recent_activity(event_id, SPECTATOR_ACTIVITY_LIMIT)
+    return {'auctions': auctions, 'stats': stats, 'activity': activity}
+
+def start_spectator_ticker():
+    global spectator_thread
+    with spectator_thread_lock:
+        if spectator_thread is None:
+            spectator_thread = threading.Thread(target=spectator_ticker, name='spectators', daemon=True)
+            spectator_thread.start()
+
+def spectator_ticker():
+    next_tick = time.monotonic()
+    while True:
+        next_tick += SPECTATOR_TICK_SECONDS
+        time.sleep(max(0.0, next_tick - time.monotonic()))
+        watched = set(spectators.values())
+        for event_id in list(spectator_snapshots):
+            if event_id not in watched:
+                del spectator_snapshots[event_id]
+        for event_id in watched:
+            try:
+                snapshot = build_spectator_snapshot(event_id)
+            except Exception as e:
+                print(f"Spectator snapshot for event {event_id} failed: {e}")
+                continue
+            if snapshot != spectator_snapshots.get(event_id):
+                spectator_snapshots[event_id] = snapshot
+                socketio.emit('snapshot', snapshot, namespace=SPECTATOR_NAMESPACE, to=event_room(event_id))
+
+@socketio.on('connect', namespace=SPECTATOR_NAMESPACE)
+def handle_spectator_connect(auth=None):
+    """No login needed: spectators pick an event and only ever receive snapshots."""
+    event_id = request.args.get('event', DEFAULT_EVENT_ID, type=int)
+    if get_event(event_id) is None:
+        return False
+    join_room(event_room(event_id))
+    spectators[request.sid] = event_id
+    start_spectator_ticker()
+    snapshot = spectator_snapshots.get(event_id)
+    emit('snapshot', snapshot if snapshot is not None else build_spectator_snapshot(event_id))
+
+@socketio.on('disconnect', namespace=SPECTATOR_NAMESPACE)
+def handle_spectator_disconnect():
+    spectators.pop(request.sid, None)
+
+
+def get_bidding_user(username):
+    """Return (user row with team budget, error message) for a bidding team account."""
+    user = store.get_bidding_user(username)
+    if not user or not user['team_id']:
+        return None, 'You are not assigned to a team.'
+    if not user['can_bid']:
+        return None, 'Your account is not authorized to place bids.'
+    return user, None
+
+def resolve_proxy_bids(auction_id, price, leader_id):
+    """Let registered max bids respond to a standing bid; returns (price, leader_id)."""
+    maxes = proxy_book.maxes(auction_id)
+    if not maxes:
+        return price, leader_id
+    budgets = store.team_budgets(list(maxes))
+    return proxy_bidding.resolve(price, leader_id, maxes, BID_INCREMENT, budgets)
+
+def save_auction_lead(auction_id, price, leader_id, ends_at):
+    """Persist the leading bid and its new deadline; return the leading team's name (caller commits)."""
+    store.update_auction_lead(auction_id, price, leader_id, ends_at)
+    return store.get_team(leader_id)['name']
+
+def publish_auction_lead(event_id, auction_id, price, team_name, ends_at):
+    """Restart the bid timer and broadcast the auction's new leading bid to its event."""
+    # Cancel previous timer and start a new one
+    schedule_auction_timer(event_id, auction_id, ends_at, end_bidding)
+
+    socketio.emit('auction_update', {
+        'auction_id': auction_id,
+        'new_price': price,
+        'bidder': team_name,
+        'ends_at': ends_at
+    }, to=event_room(event_id))
+
+def int_or_none(value):
+    """int(value), or None for a missing or malformed id from a socket payload."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
 
 @socketio.on('place_bid')
 def handle_place_bid(data):
+    record_event('place_bid', username=session.get('username'), role=session.get('role'),
+                 team_id=session.get('team_id'), event_id=session.get('event_id'),
+                 auction_id=data.get('auction_id'), bid_amount=data.get('bid_amount'))
     if not is_approved_bidder():
         emit('bid_status', {'success': False, 'message': 'You must be a verified team manager to bid.'})
         return
         
-    auction_id = data.get('auction_id')
-    new_bid = float(data.get('bid_amount'))
+    # Proxy-book locks and timers are keyed by the integer id
+    auction_id = int_or_none(data.get('auction_id'))
+    try:
+        new_bid = float(data.get('bid_amount'))
+    except (TypeError, ValueError):
+        new_bid = None
     username = session.get('username')
     
     if not auction_id or new_bid is None or new_bid <= 0:
         emit('bid_status', {'success': False, 'message': 'Invalid bid amount or auction ID.'})
         return
 
-    conn = get_db_connection()
-    cur = get_dict_cursor(conn)
-
     try:
         # Fetch team info and budget
-        if DATABASE_URL:
-            cur.execute("SELECT u.*, t.budget FROM users u JOIN teams t ON u.team_id = t.id WHERE u.username = %s", (username,))
-        else:
-            cur.execute("SELECT u.*, t.budget FROM users u JOIN teams t ON u.team_id = t.id WHERE u.username = ?", (username,))
-        user = cur.fetchone()
-        
-        if not user or not user['team_id']:
-            cur.close()
-            emit('bid_status', {'success': False, 'message': 'You are not assigned to a team.', 'auction_id': auction_id})
-            return
-        
-        if not user['can_bid']:
-            cur.close()
-            emit('bid_status', {'success': False, 'message': 'Your account is not authorized to place bids.', 'auction_id': auction_id})
+        user, error = get_bidding_user(username)
+        if error:
+            emit('bid_status', {'success': False, 'message': error, 'auction_id': auction_id})
             return
             
         team_budget = user['budget']
         
         if new_bid > team_budget:
-            cur.close()
             emit('bid_status', {'success': False, 'message': f'Bid exceeds your team budget of ₹{team_budget:.2f}.', 'auction_id': auction_id})
             return
-            
-        # Fetch auction info
-        if DATABASE_URL:
-            cur.execute("SELECT * FROM auctions WHERE id = %s", (auction_id,))
-        else:
-            cur.execute("SELECT * FROM auctions WHERE id = ?", (auction_id,))
-        auction = cur.fetchone()
-        
-        if auction and auction['status'] == 'live':
-            current_price = auction['current_price']
-            
-            if new_bid > current_price:
-                # Update auction in DB
-                if DATABASE_URL:
-                    cur.execute("UPDATE auctions SET current_price = %s, highest_bidding_team_id = %s WHERE id = %s", (new_bid, user['team_id'], auction_id))
-                    cur.execute("SELECT name FROM teams WHERE id = %s", (user['team_id'],))
-                else:
-                    cur.execute("UPDATE auctions SET current_price = ?, highest_bidding_team_id = ? WHERE id = ?", (new_bid, user['team_id'], auction_id))
-                    cur.execute("SELECT name FROM teams WHERE id = ?", (user['team_id'],))
-                    
-                team = cur.fetchone()
-                conn.commit()
-                cur.close()
-
-                # Cancel previous timer and start a new one
-                if auction_id in active_bids:
-                    active_bids[auction_id]['thread'].cancel()
-                
-                timer_thread = Timer(BID_DURATION, end_bidding, args=[auction_id])
-                timer_thread.start()
-                
-                end_time = time.time() + BID_DURATION
-                active_bids[auction_id] = {'thread': timer_thread, 'end_time': end_time}
-
-                socketio.emit('auction_update', {
-                    'auction_id': auction_id,
-                    'new_price': new_bid,
-                    'bidder': team['name'],
-                    'time_left': BID_DURATION
-                })
-
-                emit('bid_status', {'success': True, 'message': f'Bid of {new_bid} placed for {team["name"]}!', 'auction_id': auction_id})
-                
-                log_activity(f"Team '{team['name']}' bid ₹{new_bid:.2f} on '{auction['title']}'.")
 
-            else:
-                cur.close()
+        with proxy_book.lock(auction_id):
+            # Fetch auction info
+            auction = store.get_auction(auction_id)
+
+            # Teams can only bid in their own event
+            if not auction or auction['status'] != 'live' or auction['event_id'] != user['event_id']:
+                emit('bid_status', {'success': False, 'message': 'Auction is not live or does not exist.', 'auction_id': auction_id})
+                return
+
+            current_price = auction['current_price']
+            if new_bid <= current_price:
                 emit('bid_status', {'success': False, 'message': f'Bid must be strictly higher than the current price: ₹{current_price:.2f}', 'auction_id': auction_id})
+                return
+
+            # Registered max bids answer this bid in memory; only the outcome is written
+            price, leader_id = resolve_proxy_bids(auction_id, new_bid, user['team_id'])
+            ends_at = auction_deadline(BID_DURATION)
+            team_name = save_auction_lead(auction_id, price, leader_id, ends_at)
+            store.commit()
+        if DATABASE_REPLICA_URL:
+            mark_user_write()
+
+        publish_auction_lead(auction['event_id'], auction_id, price, team_name, ends_at)
+
+        if leader_id == user['team_id']:
+            emit('bid_status', {'success': True, 'message': f'Bid of {price} placed for {team_name}!', 'auction_id': auction_id})
+            log_activity(f"Team '{team_name}' bid ₹{price:.2f} on '{auction['title']}'.", auction['event_id'])
         else:
-            cur.close()
-            emit('bid_status', {'success': False, 'message': 'Auction is not live or does not exist.', 'auction_id': auction_id})
+            emit('bid_status', {'success': False, 'message': f'Outbid by a max bid. Current price: ₹{price:.2f}', 'auction_id': auction_id})
+            log_activity(f"Team '{team_name}' leads '{auction['title']}' at ₹{price:.2f} (max bid).", auction['event_id'])
     
     except Exception as e:
         print(f"Error in handle_place_bid: {e}")
-        conn.rollback()
-        cur.close()
+        store.rollback()
         emit('bid_status', {'success': False, 'message': f'An internal error occurred: {e}', 'auction_id': auction_id})
-        
+
+@socketio.on('set_max_bid')
+def handle_set_max_bid(data):
+    """Register a team's maximum bid; the server bids on its behalf up to that amount."""
+    record_event('set_max_bid', username=session.get('username'), role=session.get('role'),
+                 team_id=session.get('team_id'), event_id=session.get('event_id'),
+                 auction_id=data.get('auction_id'), max_amount=data.get('max_amount'))
+    if not is_approved_bidder():
+        emit('bid_status', {'success': False, 'message': 'You must be a verified team manager to bid.'})
+        return
+
+    auction_id = int_or_none(data.get('auction_id'))
+    try:
+        max_amount = float(data.get('max_amount'))
+    except (TypeError, ValueError):
+        max_amount = None
+    if not auction_id or max_amount is None or max_amount <= 0:
+        emit('bid_status', {'success': False, 'message': 'Invalid max bid or auction ID.', 'auction_id': auction_id})
+        return
+
+    try:
+        user, error = get_bidding_user(session.get('username'))
+        if error:
+            emit('bid_status', {'success': False, 'message': error, 'auction_id': auction_id})
+            return
+        if max_amount > user['budget']:
+            emit('bid_status', {'success': False, 'message': f"Max bid exceeds your team budget of ₹{user['budget']:.2f}.", 'auction_id': auction_id})
+            return
+
+        with proxy_book.lock(auction_id):
+            auction = store.get_auction(auction_id)
+            if not auction or auction['status'] != 'live' or auction['event_id'] != user['event_id']:
+                emit('bid_status', {'success': False, 'message': 'Auction is not live or does not exist.', 'auction_id': auction_id})
+                return
+            if max_amount <= auction['current_price']:
+                emit('bid_status', {'success': False, 'message': f"Max bid must be higher than the current price: ₹{auction['current_price']:.2f}", 'auction_id': auction_id})
+                return
+
+            proxy_book.set_max(auction_id, user['team_id'], max_amount)
+            leader_id = auction['highest_bidding_team_id']
+            price, new_leader_id = resolve_proxy_bids(auction_id, auction['current_price'], leader_id)
+            changed = (price, new_leader_id) != (auction['current_price'], leader_id)
+            if changed:
+                ends_at = auction_deadline(BID_DURATION)
+                team_name = save_auction_lead(auction_id, price, new_leader_id, ends_at)
+                store.commit()
+
+        if changed:
+            if DATABASE_REPLICA_URL:
+                mark_user_write()
+            publish_auction_lead(auction['event_id'], auction_id, price, team_name, ends_at)
+            log_activity(f"Team '{team_name}' leads '{auction['title']}' at ₹{price:.2f} (max bid).", auction['event_id'])
+
+        leading = (new_leader_id == user['team_id'])
+        message = f'Max bid of ₹{max_amount:.2f} set. ' + (f'You lead at ₹{price:.2f}.' if leading else f'Current price: ₹{price:.2f}.')
+        emit('bid_status', {'success': True, 'message': message, 'auction_id': auction_id})
+
+    except Exception as e:
+        print(f"Error in handle_set_max_bid: {e}")
+        store.rollback()
+        emit('bid_status', {'success': False, 'message': f'An internal error occurred: {e}', 'auction_id': auction_id})
+
+@app.cli.command('replay')
+@click.argument('events_file')
+@click.option('--speed', default=50.0, help='Wall-clock speedup over the recording (0 = as fast as possible).')
+def replay_command(events_file, speed):
+    """Replay a RECORD_EVENTS log against the configured database with a virtual clock."""
+    import sys
+    from replay import replay_events
+    report = replay_events(sys.modules[__name__], events_file, speed=speed)
+    print(json.dumps(report, indent=2))
+
+@app.cli.command('wire-bench')
+@click.option('--rounds', default=2000, help='Encodes per payload.')
+def wire_bench_command(rounds):
+    """Compare frame size and encode time of JSON vs compact (msgpack) Socket.IO frames."""
+    from socketio import packet
+    import wire
+    auction = {'id': 412, 'title': 'ShadowSniper', 'price': 2500.0, 'discord_name': 'shadow#4412',
+               'base_price': 2500.0, 'game_level': 'Semi Pro', 'player_id': 1093, 'ends_at': 1760890000.125}
+    samples = {
+        'auction_update': {'auction_id': 412, 'new_price': 12600.0, 'bidder': 'Night Owls', 'ends_at': 1760890030.125},
+        'new_auction': auction,
+        'player_sold': {'auction_id': 412, 'player_name': 'ShadowSniper', 'team_name': 'Night Owls', 'price': 12600.0,
+                        'winning_team_id': 7, 'new_budget': 87400.0},
+        'stats_update': {'total_players': 480, 'sold_players': 212, 'unsold_players': 268},
+        'activity_history': [{'message': f"Team 'Night Owls' bid ₹{12600 + i * 100:.2f} on 'ShadowSniper'.", 'timestamp': '21:04:%02d' % (i % 60)}
+                             for i in range(50)],
+    }
+    print(f"{'event':<18}{'json B':>8}{'compact B':>11}{'saved':>8}{'json us':>9}{'compact us':>12}")
+    for event, payload in samples.items():
+        timings = {}
+        sizes = {}
+        for name, packet_class in (('json', packet.Packet), ('compact', wire.CompactPacket)):
+            started = time.perf_counter()
+            for _ in range(rounds):
+                encoded = packet_class(packet.EVENT, namespace='/', data=[event, payload]).encode()
+            timings[name] = (time.perf_counter() - started) / rounds * 1e6
+            sizes[name] = len(encoded.encode('utf-8') if isinstance(encoded, str) else encoded)
+        saved = 100.0 * (1 - sizes['compact'] / sizes['json'])
+        print(f"{event:<18}{sizes['json']:>8}{sizes['compact']:>11}{saved:>7.0f}%{timings['json']:>9.1f}{timings['compact']:>12.1f}")
+
+@app.cli.command('coldstart')
+@click.option('--runs', default=5, help='Number of fresh interpreter starts to measure.')
+def coldstart_command(runs):
+    """Measure worker cold-start time (import of app.py) in fresh interpreters."""
+    import statistics
+    import subprocess
+    import sys
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, '-c', 'import json, app; print(json.dumps(app.STARTUP_STATS))'],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        wall_ms = (time.perf_counter() - started) * 1000
+        stats = json.loads(out.stdout.strip().splitlines()[-1])
+        timings.append((stats['cold_start_ms'], wall_ms))
+        print(f"module startup {stats['cold_start_ms']:.1f} ms, process wall {wall_ms:.1f} ms, schema {stats['schema']}")
+    print(f"median module startup {statistics.median(t[0] for t in timings):.1f} ms, "
+          f"median process wall {statistics.median(t[1] for t in timings):.1f} ms over {runs} runs")
+
+@app.cli.command('seed-league')
+@click.option('--players', default=1000, help='Registered players in the league.')
+@click.option('--teams', default=None, type=int, help='Teams (default: one per 250 players, at least 8).')
+@click.option('--auction-ratio', default=0.5, help='Share of players that get an auction.')
+@click.option('--sold-ratio', default=0.7, help='Share of auctions that end sold.')
+@click.option('--activity-per-auction', default=3.0, help='activity_log rows per auction.')
+@click.option('--seed', default=0, help='Random seed.')
+def seed_league_command(players, teams, auction_ratio, sold_ratio, activity_per_auction, seed):
+    """Add a synthetic auction event (league) to the configured database."""
+    import league_gen
+    league = league_gen.seed_league(store, generate_password_hash('league-password'), players=players, teams=teams,
+                                    auction_ratio=auction_ratio, sold_ratio=sold_ratio,
+                                    activity_per_auction=activity_per_auction, seed=seed)
+    invalidate_settings()
+    print(json.dumps(league, indent=2))
+    print("Team and player accounts use the password 'league-password'.")
+
+@app.cli.command('route-bench')
+@click.option('--sizes', default='1000,10000,100000', help='Comma-separated player counts, one league each.')
+@click.option('--repeat', default=5, help='Warm requests per route.')
+@click.option('--seed', default=0, help='Random seed.')
+@click.option('--output', default=None, help='Also write the full report as JSON to this file.')
+def route_bench_command(sizes, repeat, seed, output):
+    """Seed a league per size and compare latency, queries and peak memory of the heavy pages.
+
+    Writes the leagues into the configured database: point DATABASE_URL (or run
+    from a copy of auction.db, or STORAGE_BACKEND=memory) at a scratch store.
+    """
+    global QUERY_TRACE, QUERY_DEBUG_HEADER
+    import sys
+    import route_bench
+    QUERY_TRACE = QUERY_DEBUG_HEADER = True  # per-request query counts for the report
+    report = route_bench.run_benchmark(sys.modules[__name__], [int(size) for size in sizes.split(',')], repeat=repeat,
+                                       seed=seed, password_hash=generate_password_hash('league-password'))
+    print(route_bench.format_report(report))
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+# --- Startup report ---
+STARTUP_STATS = {
+    'pid': os.getpid(),
+    'cold_start_ms': (time.perf_counter() - BOOT_STARTED) * 1000,
+    'schema': schema_state,
+}
+print(f"Worker {STARTUP_STATS['pid']} ready in {STARTUP_STATS['cold_start_ms']:.1f} ms (schema {schema_state})")
 
 if __name__ == '__main__':
     # Use 'PORT' environment variable for Render, default to 5000 for local dev
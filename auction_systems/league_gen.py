@@ -0,0 +1,95 @@
+# league_gen.py - seed synthetic auction events (leagues) for scale tests and benchmarks
+
+import random
+import time
+
+GAME_LEVELS = ('Beginner', 'Intermediate', 'Semi Pro', 'Pro')
+# Rows per statement / commit while seeding
+CHUNK = 1000
+# Auctions left running, so the live feed has something to show
+LIVE_AUCTIONS = 20
+
+
+def seed_league(store, password_hash, players=1000, teams=None, auction_ratio=0.5, sold_ratio=0.7,
+                activity_per_auction=3, seed=0, name=None):
+    """Create one event filled with synthetic players, teams, auctions, sales and activity.
+
+    Everything goes through `store` (any storage backend), in chunks of CHUNK rows
+    with a commit per chunk. `teams` defaults to one per 250 players (at least 8);
+    `auction_ratio` of the players get an auction, `sold_ratio` of those are sold
+    and the rest go unsold, except LIVE_AUCTIONS left live. Every account gets
+    `password_hash`. Returns the row counts and the seconds it took.
+    """
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    teams = teams or max(8, players // 250)
+    budget = 1000000.0
+
+    event_id = store.create_event(name or f"Synthetic league {players} players {int(time.time())}", budget)
+    store.commit()
+    tag = f"L{event_id}"
+
+    team_ids = []
+    for i in range(teams):
+        team_name = f"{tag} Team {i + 1:04d}"
+        team_id = store.add_team(team_name, budget, event_id)
+        store.add_user(team_name, password_hash, 'bidder', is_approved=True, team_id=team_id, can_bid=True, event_id=event_id)
+        team_ids.append(team_id)
+    store.commit()
+
+    player_rows = {}
+    for start in range(0, players, CHUNK):
+        rows = [(f"{tag}_player{i + 1:06d}", password_hash, f"{tag}_player{i + 1:06d}#{rng.randrange(10000):04d}",
+                 float(rng.randrange(1, 51) * 100), rng.choice(GAME_LEVELS), event_id)
+                for i in range(start, min(start + CHUNK, players))]
+        ids = store.add_players(rows)
+        store.commit()
+        player_rows.update((ids[row[0]], row) for row in rows)
+
+    # Players with an auction, in random order; the last LIVE_AUCTIONS stay live
+    auctioned = rng.sample(sorted(player_rows), int(players * auction_ratio))
+    live = min(LIVE_AUCTIONS, len(auctioned))
+    sold = 0
+    for start in range(0, len(auctioned), CHUNK):
+        rows = []
+        for player_id in auctioned[start:start + CHUNK]:
+            username, _, _, base_price, _, _ = player_rows[player_id]
+            if rng.random() < sold_ratio:
+                # A winning bid of up to three times the base price
+                price = base_price + rng.randrange(0, int(base_price * 2) + 1, 100)
+                rows.append((username, price, player_id, event_id, rng.choice(team_ids), None))
+            else:
+                rows.append((username, base_price, player_id, event_id, None, None))
+        store.add_auctions(rows)
+        store.commit()
+
+    # Close everything but the live ones; sold rows charge their team and fill sold_players
+    running = store.list_auctions(event_id, status='live')
+    closing = [row['id'] for row in running[:len(running) - live]]
+    for start in range(0, len(closing), CHUNK):
+        results = store.settle_auctions(closing[start:start + CHUNK], [], time.time())
+        store.commit()
+        sold += sum(1 for result in results if result['winning_team_id'] is not None)
+
+    activity = int(len(auctioned) * activity_per_auction)
+    team_names = [f"{tag} Team {i + 1:04d}" for i in range(teams)]
+    for start in range(0, activity, CHUNK):
+        entries = []
+        for i in range(start, min(start + CHUNK, activity)):
+            username = player_rows[auctioned[i % len(auctioned)]][0]
+            entries.append((f"Team '{rng.choice(team_names)}' bid ₹{rng.randrange(1, 100) * 100:.2f} on '{username}'.",
+                            time.strftime('%H:%M:%S', time.gmtime(i)), event_id))
+        store.add_activity(entries)
+        store.commit()
+
+    return {
+        'event_id': event_id,
+        'players': players,
+        'teams': teams,
+        'auctions': len(auctioned),
+        'sold': sold,
+        'unsold': len(closing) - sold,
+        'live': live,
+        'activity': activity,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
@@ -0,0 +1,461 @@
+# memory_storage.py - in-memory Storage backend (no database, no I/O)
+
+import itertools
+import threading
+
+from storage import Storage
+
+
+class IntegrityError(Exception):
+    """A unique name (username, team or event name) is already taken."""
+
+
+class _Record:
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class User(_Record):
+    __slots__ = ('id', 'username', 'password', 'role', 'is_approved', 'team_id', 'can_bid',
+                 'discord_name', 'base_price', 'game_level', 'event_id')
+
+
+class Team(_Record):
+    __slots__ = ('id', 'name', 'budget', 'event_id')
+
+
+class Auction(_Record):
+    __slots__ = ('id', 'title', 'current_price', 'highest_bidding_team_id', 'status', 'player_id',
+                 'event_id', 'ends_at')
+
+
+class SoldPlayer(_Record):
+    __slots__ = ('id', 'player_name', 'winning_team_id', 'sold_price', 'player_id')
+
+
+class Activity(_Record):
+    __slots__ = ('id', 'message', 'timestamp', 'event_id')
+
+
+class Event(_Record):
+    __slots__ = ('id', 'name', 'registration_open_until', 'default_team_budget', 'data_version')
+
+
+class MemoryStorage(Storage):
+    """Storage kept in dicts of __slots__ records, indexed for every lookup the app makes.
+
+    For simulations, load tests and benchmarks of the app logic alone: every
+    call is a few dict operations. State lives in this process only and is
+    lost on exit. Writes apply immediately; commit() is a no-op and rollback()
+    cannot undo them, so a request that writes several rows checks names
+    first (register_team and bulk_teams call taken_team_names) and add_teams
+    validates the whole batch before adding anything. Rows are returned as
+    fresh dicts.
+    """
+
+    IntegrityError = IntegrityError
+    # Nothing to snapshot: the state dies with the process
+    supports_backup = False
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids = {table: itertools.count(1) for table in ('users', 'teams', 'auctions', 'sold_players', 'activity_log', 'events')}
+        self._settings = {}
+        self._events = {}
+        self._event_names = {}
+        self._users = {}
+        self._usernames = {}
+        # event_id -> ids of registered players (bidders with a base price)
+        self._players_by_event = {}
+        self._teams = {}
+        self._team_names = {}
+        self._teams_by_event = {}
+        self._auctions = {}
+        self._auction_by_player = {}
+        self._auctions_by_event = {}
+        # (event_id, status) -> auction ids
+        self._auctions_by_status = {}
+        self._sold = {}
+        self._sold_by_team = {}
+        self._activity_by_event = {}
+
+    # --- Transactions ---
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    # --- Schema, settings and events ---
+
+    def init_schema(self):
+        with self._lock:
+            if not self._events:
+                self.create_event('Main Event', 100000.0)
+
+    def load_settings(self):
+        with self._lock:
+            return dict(self._settings)
+
+    def set_setting(self, key, value):
+        with self._lock:
+            self._settings[key] = value
+
+    def load_events(self):
+        with self._lock:
+            return {event_id: event.as_dict() for event_id, event in self._events.items()}
+
+    def create_event(self, name, default_team_budget):
+        with self._lock:
+            if name in self._event_names:
+                raise IntegrityError(f"event name {name!r} is taken")
+            event = Event(id=next(self._ids['events']), name=name, registration_open_until=0.0,
+                          default_team_budget=float(default_team_budget), data_version=0)
+            self._events[event.id] = event
+            self._event_names[name] = event.id
+            return event.id
+
+    def update_event(self, event_id, **fields):
+        with self._lock:
+            event = self._events.get(event_id)
+            if event is None:
+                return
+            for name in ('registration_open_until', 'default_team_budget'):
+                if name in fields:
+                    setattr(event, name, float(fields[name]))
+
+    def bump_data_version(self, event_ids):
+        with self._lock:
+            for event_id in set(event_ids):
+                event = self._events.get(event_id)
+                if event is not None:
+                    event.data_version += 1
+
+    # --- Users and teams ---
+
+    def get_user(self, username):
+        user = self._users.get(self._usernames.get(username))
+        return user.as_dict() if user else None
+
+    def get_user_by_id(self, user_id):
+        user = self._users.get(user_id)
+        return user.as_dict() if user else None
+
+    def add_user(self, username, password, role, is_approved=False, team_id=None, can_bid=False, event_id=None,
+                 discord_name=None, base_price=None, game_level=None):
+        with self._lock:
+            if username in self._usernames:
+                raise IntegrityError(f"username {username!r} is taken")
+            user = User(id=next(self._ids['users']), username=username, password=password, role=role,
+                        is_approved=1 if is_approved else 0, team_id=team_id, can_bid=1 if can_bid else 0,
+                        discord_name=discord_name, base_price=base_price, game_level=game_level, event_id=event_id)
+            self._users[user.id] = user
+            self._usernames[username] = user.id
+            if role == 'bidder' and base_price is not None:
+                self._players_by_event.setdefault(event_id, set()).add(user.id)
+            return user.id
+
+    def add_players(self, rows):
+        inserted = {}
+        with self._lock:
+            for username, password, discord_name, base_price, game_level, event_id in rows:
+                if username in self._usernames:
+                    continue
+                inserted[username] = self.add_user(username, password, 'bidder', is_approved=True, event_id=event_id,
+                                                   discord_name=discord_name, base_price=base_price, game_level=game_level)
+        return inserted
+
+    def get_bidding_user(self, username):
+        user = self._users.get(self._usernames.get(username))
+        team = self._teams.get(user.team_id) if user else None
+        if team is None:
+            return None
+        row = user.as_dict()
+        row['budget'] = team.budget
+        return row
+
+    def add_team(self, name, budget, event_id):
+        with self._lock:
+            if name in self._team_names:
+                raise IntegrityError(f"team name {name!r} is taken")
+            team = Team(id=next(self._ids['teams']), name=name, budget=float(budget), event_id=event_id)
+            self._teams[team.id] = team
+            self._team_names[name] = team.id
+            self._teams_by_event.setdefault(event_id, []).append(team.id)
+            return team.id
+
+    def add_teams(self, rows, event_id):
+        with self._lock:
+            # All or nothing, like the single transaction of the SQL backends
+            if self.taken_team_names([name for name, _, _ in rows]) or len({name for name, _, _ in rows}) < len(rows):
+                raise IntegrityError("a team name is taken")
+            teams = []
+            for name, budget, password in rows:
+                team_id = self.add_team(name, budget, event_id)
+                self.add_user(name, password, 'bidder', is_approved=True, team_id=team_id, can_bid=True, event_id=event_id)
+                teams.append({'id': team_id, 'name': name, 'budget': float(budget)})
+            return teams
+
+    def taken_team_names(self, names):
+        return {name for name in names if name in self._team_names or name in self._usernames}
+
+    def get_team(self, team_id):
+        team = self._teams.get(team_id)
+        return team.as_dict() if team else None
+
+    def _event_teams(self, event_id):
+        teams = [self._teams[team_id] for team_id in self._teams_by_event.get(event_id, ())]
+        teams.sort(key=lambda team: team.name)
+        return teams
+
+    def list_teams(self, event_id):
+        with self._lock:
+            return [{'id': team.id, 'name': team.name, 'budget': team.budget} for team in self._event_teams(event_id)]
+
+    def team_budgets(self, team_ids):
+        return {team_id: self._teams[team_id].budget for team_id in team_ids if team_id in self._teams}
+
+    def set_team_budget(self, team_id, budget):
+        with self._lock:
+            team = self._teams.get(_int_or_none(team_id))
+            if team is None:
+                return None
+            team.budget = float(budget)
+            return team.as_dict()
+
+    def update_team_budgets(self, event_id, budget=None, delta=None, team_ids=None):
+        with self._lock:
+            teams = self._event_teams(event_id)
+            if team_ids is not None:
+                wanted = {_int_or_none(team_id) for team_id in team_ids}
+                teams = [team for team in teams if team.id in wanted]
+            for team in teams:
+                team.budget = float(budget) if budget is not None else max(team.budget + float(delta), 0.0)
+            return [{'id': team.id, 'name': team.name, 'budget': team.budget} for team in teams]
+
+    def team_rosters(self, event_id):
+        with self._lock:
+            rosters = []
+            for team in self._event_teams(event_id):
+                members = [self._sold[sale_id].player_name for sale_id in self._sold_by_team.get(team.id, ())]
+                rosters.append({'id': team.id, 'name': team.name, 'budget': team.budget,
+                                'members': ', '.join(members) if members else None})
+            return rosters
+
+    def sold_players(self, event_id):
+        with self._lock:
+            rows = [{'player_name': self._sold[sale_id].player_name, 'team_name': team.name,
+                     'sold_price': self._sold[sale_id].sold_price}
+                    for team in self._event_teams(event_id) for sale_id in self._sold_by_team.get(team.id, ())]
+        rows.sort(key=lambda row: (row['team_name'], row['player_name']))
+        return rows
+
+    # --- Players and auctions ---
+
+    def players_ready(self, event_id):
+        with self._lock:
+            ids = sorted((user_id for user_id in self._players_by_event.get(event_id, ())
+                          if user_id not in self._auction_by_player), reverse=True)
+            return [{field: getattr(self._users[user_id], field)
+                     for field in ('id', 'username', 'discord_name', 'base_price', 'game_level')} for user_id in ids]
+
+    def player_search_rows(self):
+        with self._lock:
+            rows = []
+            for user_ids in self._players_by_event.values():
+                for user_id in user_ids:
+                    user = self._users[user_id]
+                    auction = self._auctions.get(self._auction_by_player.get(user_id))
+                    rows.append({'id': user.id, 'username': user.username, 'discord_name': user.discord_name,
+                                 'base_price': user.base_price, 'game_level': user.game_level,
+                                 'event_id': user.event_id, 'auction_status': auction.status if auction else None})
+            return rows
+
+    def get_auction(self, auction_id):
+        auction = self._auctions.get(_int_or_none(auction_id))
+        return auction.as_dict() if auction else None
+
+    def auction_for_player(self, player_id):
+        auction = self._auctions.get(self._auction_by_player.get(player_id))
+        return auction.as_dict() if auction else None
+
+    def _set_status(self, auction, status):
+        self._auctions_by_status.get((auction.event_id, auction.status), set()).discard(auction.id)
+        auction.status = status
+        self._auctions_by_status.setdefault((auction.event_id, status), set()).add(auction.id)
+
+    def create_auction(self, title, price, event_id, player_id=None, ends_at=None, leader_id=None):
+        with self._lock:
+            auction = Auction(id=next(self._ids['auctions']), title=title, current_price=float(price),
+                              highest_bidding_team_id=leader_id, player_id=player_id, event_id=event_id, ends_at=ends_at)
+            self._auctions[auction.id] = auction
+            if player_id is not None:
+                self._auction_by_player[player_id] = auction.id
+            self._auctions_by_event.setdefault(event_id, []).append(auction.id)
+            self._set_status(auction, 'live')
+            return auction.id
+
+    def add_auctions(self, rows):
+        with self._lock:
+            for title, price, player_id, event_id, leader_id, ends_at in rows:
+                self.create_auction(title, price, event_id, player_id=player_id, ends_at=ends_at, leader_id=leader_id)
+
+    def restart_auction(self, auction_id, price, ends_at):
+        with self._lock:
+            auction = self._auctions[auction_id]
+            auction.current_price = float(price)
+            auction.highest_bidding_team_id = None
+            auction.ends_at = ends_at
+            self._set_status(auction, 'live')
+
+    def update_auction_lead(self, auction_id, price, leader_id, ends_at):
+        with self._lock:
+            auction = self._auctions[_int_or_none(auction_id)]
+            auction.current_price = float(price)
+            auction.highest_bidding_team_id = leader_id
+            auction.ends_at = ends_at
+
+    def shift_live_deadlines(self, seconds):
+        with self._lock:
+            for auction in self._auctions.values():
+                if auction.status == 'live' and auction.ends_at is not None:
+                    auction.ends_at += seconds
+
+    def list_auctions(self, event_id, status=None, newest_first=False):
+        with self._lock:
+            if status:
+                ids = sorted(self._auctions_by_status.get((event_id, status), ()))
+            else:
+                ids = list(self._auctions_by_event.get(event_id, ()))
+            if newest_first:
+                ids.reverse()
+            rows = []
+            for auction_id in ids:
+                row = self._auctions[auction_id].as_dict()
+                team = self._teams.get(row['highest_bidding_team_id'])
+                row['highest_bidder_username'] = team.name if team else None
+                rows.append(row)
+            return rows
+
+    def unsold_auctions(self, event_id):
+        with self._lock:
+            rows = []
+            for auction_id in sorted(self._auctions_by_status.get((event_id, 'Unsold'), ())):
+                auction = self._auctions[auction_id]
+                user = self._users.get(auction.player_id)
+                if user is None:
+                    continue
+                rows.append({'id': auction.id, 'title': auction.title, 'player_id': auction.player_id,
+                             'discord_name': user.discord_name, 'base_price': user.base_price, 'game_level': user.game_level})
+            return rows
+
+    def restart_auctions(self, rows):
+        restarted = []
+        with self._lock:
+            for auction_id, price, ends_at in rows:
+                auction = self._auctions.get(auction_id)
+                if auction is not None and auction.status == 'Unsold':
+                    self.restart_auction(auction_id, price, ends_at)
+                    restarted.append(auction_id)
+        return restarted
+
+    def settle_auctions(self, end_ids, unsold_ids, now):
+        end_set = set(end_ids)
+        results = []
+        with self._lock:
+            for auction_id in sorted(end_set | set(unsold_ids)):
+                auction = self._auctions.get(auction_id)
+                if auction is None or auction.status != 'live':
+                    continue
+                if auction_id not in end_set and auction.highest_bidding_team_id is not None:
+                    # The no-bid timer fired but a bid arrived in the meantime
+                    continue
+                if auction.ends_at is not None and auction.ends_at > now:
+                    # A bid moved the deadline after the timer fired
+                    continue
+                team = self._teams.get(auction.highest_bidding_team_id)
+                if team is not None:
+                    self._set_status(auction, 'Sold')
+                    sale = SoldPlayer(id=next(self._ids['sold_players']), player_name=auction.title,
+                                      winning_team_id=team.id, sold_price=auction.current_price, player_id=auction.player_id)
+                    self._sold[sale.id] = sale
+                    self._sold_by_team.setdefault(team.id, []).append(sale.id)
+                    player = self._users.get(auction.player_id)
+                    if player is not None:
+                        player.team_id = team.id
+                    team.budget -= auction.current_price
+                else:
+                    self._set_status(auction, 'Unsold')
+                results.append({
+                    'auction_id': auction.id,
+                    'player_name': auction.title,
+                    'player_id': auction.player_id,
+                    'winning_team_id': auction.highest_bidding_team_id,
+                    'sold_price': auction.current_price,
+                    'team_name': team.name if team else None,
+                    'new_budget': None,
+                    'event_id': auction.event_id,
+                })
+            # Budgets after every sale of the batch, as the SQL backends report them
+            for result in results:
+                if result['winning_team_id'] is not None:
+                    result['new_budget'] = self._teams[result['winning_team_id']].budget
+        return results
+
+    def event_stats(self, event_id):
+        return {
+            'total_players': len(self._players_by_event.get(event_id, ())),
+            'sold_players': len(self._auctions_by_status.get((event_id, 'Sold'), ())),
+            'unsold_players': len(self._auctions_by_status.get((event_id, 'Unsold'), ())),
+        }
+
+    # --- Activity log ---
+
+    def add_activity(self, entries):
+        with self._lock:
+            for message, timestamp, event_id in entries:
+                entry = Activity(id=next(self._ids['activity_log']), message=message, timestamp=timestamp, event_id=event_id)
+                self._activity_by_event.setdefault(event_id, []).append(entry)
+
+    def recent_activity(self, event_id, limit):
+        with self._lock:
+            entries = self._activity_by_event.get(event_id, [])[-limit:] if limit > 0 else []
+            return [{'message': entry.message, 'timestamp': entry.timestamp} for entry in entries]
+
+    # --- Analytics ---
+
+    def _event_sales(self, event_id):
+        return [self._sold[sale_id] for team_id in self._teams_by_event.get(event_id, ())
+                for sale_id in self._sold_by_team.get(team_id, ())]
+
+    def sales_fingerprint(self, event_id):
+        with self._lock:
+            sales = self._event_sales(event_id)
+            return (len(sales), max((sale.id for sale in sales), default=None),
+                    len(self._auctions_by_status.get((event_id, 'Unsold'), ())),
+                    sum(self._teams[team_id].budget for team_id in self._teams_by_event.get(event_id, ())))
+
+    def analytics_inputs(self, event_id):
+        with self._lock:
+            sales = []
+            for sale in self._event_sales(event_id):
+                player = self._users.get(sale.player_id)
+                sales.append((sale.winning_team_id, sale.sold_price,
+                              player.base_price if player else None, player.game_level if player else None))
+            teams = [(team.id, team.name, team.budget) for team in self._event_teams(event_id)]
+            return sales, teams, len(self._players_by_event.get(event_id, ()))
+
+
+def _int_or_none(value):
+    # Ids from forms and socket payloads may arrive as strings, as SQL would coerce them
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
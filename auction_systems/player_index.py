@@ -0,0 +1,172 @@
+# player_index.py - in-memory search index over registered players (admin dashboard search)
+
+import bisect
+import heapq
+import threading
+
+# Auction state of an indexed player
+STATUSES = ('ready', 'live', 'sold', 'unsold')
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class PlayerIndex:
+    """Players searchable by username / discord_name (prefix or substring),
+    game_level and base_price range, within one auction event.
+
+    - prefix: bisect over sorted (key, id) lists, one per text field
+    - substring: trigram -> ids postings, candidates verified against the text
+    - base_price: sorted (price, id) list, ranges found with bisect
+    Every lookup starts from the most selective structure, so a search costs
+    about the size of its result rather than the number of players.
+    """
+
+    FIELDS = ('username', 'discord_name')
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._players = {}
+            self._sorted = {field: [] for field in self.FIELDS}
+            self._grams = {}
+            self._by_level = {}
+            self._by_event = {}
+            self._by_status = {status: set() for status in STATUSES}
+            self._prices = []
+
+    def load(self, players):
+        """Rebuild from dicts with id, username, discord_name, base_price, game_level, event_id, status."""
+        with self._lock:
+            self.clear()
+            for player in players:
+                self._insert(player, keep_sorted=False)
+            for keys in self._sorted.values():
+                keys.sort()
+            self._prices.sort()
+
+    def add(self, player):
+        with self._lock:
+            if player['id'] in self._players:
+                self._delete(player['id'])
+            self._insert(player, keep_sorted=True)
+
+    def set_status(self, player_id, status):
+        with self._lock:
+            player = self._players.get(player_id)
+            if player is None or player['status'] == status:
+                return
+            self._by_status[player['status']].discard(player_id)
+            player['status'] = status
+            self._by_status[status].add(player_id)
+
+    def __len__(self):
+        return len(self._players)
+
+    def _insert(self, player, keep_sorted):
+        player = dict(player)
+        player.setdefault('status', 'ready')
+        player_id = player['id']
+        self._players[player_id] = player
+        for field in self.FIELDS:
+            key = (player.get(field) or '').lower()
+            entry = (key, player_id)
+            if keep_sorted:
+                bisect.insort(self._sorted[field], entry)
+            else:
+                self._sorted[field].append(entry)
+            for gram in _trigrams(key):
+                self._grams.setdefault(gram, set()).add(player_id)
+        level = (player.get('game_level') or '').lower()
+        self._by_level.setdefault(level, set()).add(player_id)
+        self._by_event.setdefault(player.get('event_id'), set()).add(player_id)
+        self._by_status[player['status']].add(player_id)
+        price_entry = (float(player.get('base_price') or 0.0), player_id)
+        if keep_sorted:
+            bisect.insort(self._prices, price_entry)
+        else:
+            self._prices.append(price_entry)
+
+    def _delete(self, player_id):
+        player = self._players.pop(player_id)
+        for field in self.FIELDS:
+            key = (player.get(field) or '').lower()
+            keys = self._sorted[field]
+            i = bisect.bisect_left(keys, (key, player_id))
+            if i < len(keys) and keys[i] == (key, player_id):
+                del keys[i]
+            for gram in _trigrams(key):
+                self._grams.get(gram, set()).discard(player_id)
+        self._by_level.get((player.get('game_level') or '').lower(), set()).discard(player_id)
+        self._by_event.get(player.get('event_id'), set()).discard(player_id)
+        self._by_status[player['status']].discard(player_id)
+        price_entry = (float(player.get('base_price') or 0.0), player_id)
+        i = bisect.bisect_left(self._prices, price_entry)
+        if i < len(self._prices) and self._prices[i] == price_entry:
+            del self._prices[i]
+
+    def _prefix_ids(self, text):
+        ids = set()
+        for field in self.FIELDS:
+            keys = self._sorted[field]
+            i = bisect.bisect_left(keys, (text,))
+            while i < len(keys) and keys[i][0].startswith(text):
+                ids.add(keys[i][1])
+                i += 1
+        return ids
+
+    def _substring_ids(self, text):
+        if len(text) < 3:
+            # Too short for trigrams; scan the keys (still only the text fields)
+            return {player_id for field in self.FIELDS for key, player_id in self._sorted[field] if text in key}
+        postings = sorted((self._grams.get(gram, set()) for gram in _trigrams(text)), key=len)
+        ids = set(postings[0]).intersection(*postings[1:])
+        return {player_id for player_id in ids
+                if any(text in (self._players[player_id].get(field) or '').lower() for field in self.FIELDS)}
+
+    def _price_ids(self, min_price, max_price):
+        lo = 0 if min_price is None else bisect.bisect_left(self._prices, (min_price,))
+        hi = len(self._prices) if max_price is None else bisect.bisect_right(self._prices, (max_price, float('inf')))
+        return {player_id for _, player_id in self._prices[lo:hi]}
+
+    def search(self, event_id=None, q=None, mode='prefix', game_level=None, min_price=None, max_price=None,
+               status='ready', limit=50):
+        """Return (total_matches, players) ordered by base_price desc, newest first on ties."""
+        with self._lock:
+            candidate_sets = []
+            if event_id is not None:
+                candidate_sets.append(self._by_event.get(event_id, set()))
+            if status:
+                candidate_sets.append(self._by_status.get(status, set()))
+            if game_level:
+                candidate_sets.append(self._by_level.get(game_level.lower(), set()))
+            if q:
+                text = q.lower()
+                candidate_sets.append(self._substring_ids(text) if mode == 'substring' else self._prefix_ids(text))
+            if min_price is not None or max_price is not None:
+                candidate_sets.append(self._price_ids(min_price, max_price))
+
+            if candidate_sets:
+                candidate_sets.sort(key=len)
+                ids = candidate_sets[0].intersection(*candidate_sets[1:])
+            else:
+                ids = self._players.keys()
+
+            if limit <= 0:
+                return len(ids), []
+            if len(ids) * 8 >= len(self._prices):
+                # Broad match: walk the price order from the top, stop after `limit`
+                top_ids = []
+                for _, player_id in reversed(self._prices):
+                    if player_id in ids:
+                        top_ids.append(player_id)
+                        if len(top_ids) == limit:
+                            break
+            else:
+                top_ids = heapq.nsmallest(limit, ids, key=lambda player_id: (
+                    -float(self._players[player_id].get('base_price') or 0.0), -player_id))
+            return len(ids), [dict(self._players[player_id]) for player_id in top_ids]
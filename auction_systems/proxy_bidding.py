@@ -0,0 +1,86 @@
+# proxy_bidding.py - server-side maximum (proxy) bids, resolved in memory
+
+import itertools
+import threading
+
+
+class ProxyBook:
+    """Maximum bids registered by teams, per auction (kept in process memory)."""
+
+    def __init__(self):
+        self._books = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+        self._seq = itertools.count()
+
+    def lock(self, auction_id):
+        """Per-auction lock held while a bid is resolved and persisted."""
+        with self._guard:
+            return self._locks.setdefault(auction_id, threading.Lock())
+
+    def set_max(self, auction_id, team_id, amount):
+        with self._guard:
+            book = self._books.setdefault(auction_id, {})
+            previous = book.get(team_id)
+            # Keeping the same max keeps the team's place in the tie order
+            seq = previous[1] if previous and previous[0] == amount else next(self._seq)
+            book[team_id] = (amount, seq)
+
+    def maxes(self, auction_id):
+        """{team_id: (max_amount, seq)} for the auction; lower seq wins ties."""
+        with self._guard:
+            return dict(self._books.get(auction_id, {}))
+
+    def clear(self, auction_id):
+        with self._guard:
+            self._books.pop(auction_id, None)
+            self._locks.pop(auction_id, None)
+
+    def snapshot(self):
+        """{auction_id: {team_id: (max_amount, seq)}} of every book, for backups."""
+        with self._guard:
+            return {auction_id: dict(book) for auction_id, book in self._books.items()}
+
+    def load(self, books):
+        """Replace every book with a snapshot(); new maxes are ordered after the loaded ones."""
+        with self._guard:
+            self._books = {auction_id: dict(book) for auction_id, book in books.items()}
+            last = max((seq for book in books.values() for _, seq in book.values()), default=-1)
+            self._seq = itertools.count(last + 1)
+
+
+def resolve(price, leader_id, maxes, increment, budgets):
+    """Let every proxy bid respond to the standing bid in a single step.
+
+    price/leader_id: the standing bid (leader_id None when nobody has bid yet).
+    maxes: {team_id: (max_amount, seq)}; budgets: {team_id: budget} caps each max.
+    Returns (price, leader_id) after all proxies have responded: the highest max
+    wins at the runner-up's max plus `increment`, never above its own max.
+    """
+    entries = []
+    for team_id, (amount, seq) in maxes.items():
+        amount = min(amount, budgets.get(team_id, amount))
+        if team_id == leader_id:
+            continue
+        if amount > price:
+            entries.append((amount, seq, team_id))
+    if leader_id is not None:
+        own = maxes.get(leader_id)
+        leader_max = max(price, min(own[0], budgets.get(leader_id, own[0]))) if own else price
+        # The standing bid was there first, so the leader wins ties
+        entries.append((leader_max, -1, leader_id))
+
+    if not entries:
+        return price, leader_id
+
+    entries.sort(key=lambda e: (-e[0], e[1]))
+    winner_max, _, winner = entries[0]
+    runner_up = entries[1][0] if len(entries) > 1 else None
+
+    if winner == leader_id:
+        if runner_up is None or runner_up <= price:
+            return price, leader_id
+        return min(winner_max, runner_up + increment), leader_id
+
+    floor = price if runner_up is None else max(price, runner_up)
+    return min(winner_max, floor + increment), winner
@@ -0,0 +1,106 @@
+# query_trace.py - per-request SQL tracing: timings, N+1 detection and a slow-query log
+
+import json
+import re
+import threading
+import time
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))+\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """Statement text with literals replaced by ? so repeated shapes compare equal."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST_RE.sub('(?...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryTrace:
+    """Statements run while serving one HTTP request or Socket.IO event."""
+
+    def __init__(self, label):
+        self.label = label
+        self.queries = []
+        self.started = time.perf_counter()
+
+    def add(self, sql, duration_ms, rows):
+        self.queries.append((normalize(sql), duration_ms, rows))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_ms(self):
+        return sum(q[1] for q in self.queries)
+
+    def repeated(self, threshold):
+        """{normalized_sql: times} for statements run at least `threshold` times (likely N+1)."""
+        counts = {}
+        for sql, _, _ in self.queries:
+            counts[sql] = counts.get(sql, 0) + 1
+        return {sql: n for sql, n in counts.items() if n >= threshold}
+
+
+class SlowQueryLog:
+    """JSON-lines log of statements slower than `threshold_ms` (printed if no path)."""
+
+    def __init__(self, threshold_ms, path=None):
+        self.threshold_ms = threshold_ms
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8', buffering=1) if path else None
+
+    def check(self, label, sql, duration_ms, rows):
+        if duration_ms < self.threshold_ms:
+            return
+        entry = {'ts': time.time(), 'where': label, 'ms': round(duration_ms, 3), 'rows': rows, 'sql': normalize(sql)}
+        if self._file is None:
+            print(f"Slow query ({entry['ms']} ms) in {label}: {entry['sql']}")
+            return
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+
+
+class TracedCursor:
+    """Wraps a DB-API cursor and records every execute() into a QueryTrace."""
+
+    def __init__(self, cursor, trace, slow_log):
+        self._cursor = cursor
+        self._trace = trace
+        self._slow_log = slow_log
+
+    def _timed(self, method, sql, *params):
+        t0 = time.perf_counter()
+        try:
+            return method(sql, *params)
+        finally:
+            duration_ms = (time.perf_counter() - t0) * 1000
+            rows = self._cursor.rowcount
+            self._trace.add(sql, duration_ms, rows)
+            if self._slow_log is not None:
+                self._slow_log.check(self._trace.label, sql, duration_ms, rows)
+
+    def execute(self, sql, params=None):
+        # psycopg2 formats the SQL whenever params is given, even if empty
+        if params is None:
+            self._timed(self._cursor.execute, sql)
+        else:
+            self._timed(self._cursor.execute, sql, params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._timed(self._cursor.executemany, sql, seq_of_params)
+        return self
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        # fetchone/fetchall/close/lastrowid/description... go straight to the real cursor
+        return getattr(self._cursor, name)
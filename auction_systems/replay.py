@@ -0,0 +1,165 @@
+# replay.py - record live auction sessions and replay them against a virtual clock
+
+import json
+import statistics
+import threading
+import time
+
+# Form fields never written to the event log; replayed with REPLAY_PASSWORD
+REDACTED_FIELDS = ('password',)
+REPLAY_PASSWORD = 'replay-password'
+
+
+class EventRecorder:
+    """Append-only JSON-lines log of bids, max bids, admin/HTTP actions and timer firings."""
+
+    def __init__(self, path, clock):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8', buffering=1)
+
+    def record(self, kind, **fields):
+        event = {'ts': self._clock.now(), 'kind': kind}
+        event.update(fields)
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def record_request(self, request, session):
+        # Every value of a repeated field (checkbox lists, team_ids...), not just the first
+        form = {key: (['<redacted>'] * len(values) if key in REDACTED_FIELDS else values)
+                for key, values in request.form.to_dict(flat=False).items()}
+        self.record('http', method=request.method, path=request.path, endpoint=request.endpoint,
+                    form=form, username=session.get('username'), role=session.get('role'),
+                    team_id=session.get('team_id'), event_id=session.get('event_id'))
+
+
+def load_events(path):
+    with open(path, encoding='utf-8') as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    events.sort(key=lambda e: e['ts'])
+    return events
+
+
+class _Actor:
+    """Flask + Socket.IO test clients logged in as one recorded user."""
+
+    def __init__(self, app_module, username, role, team_id, event_id):
+        self.http = app_module.app.test_client()
+        with self.http.session_transaction() as sess:
+            if username:
+                sess['username'] = username
+                sess['role'] = role
+                if team_id is not None:
+                    sess['team_id'] = team_id
+                if event_id is not None:
+                    sess['event_id'] = event_id
+        self._app_module = app_module
+        self._socket = None
+
+    @property
+    def socket(self):
+        if self._socket is None:
+            self._socket = self._app_module.socketio.test_client(self._app_module.app, flask_test_client=self.http)
+        return self._socket
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def replay_events(app_module, path, speed=50.0):
+    """Replay a recorded session through the app and return a summary report.
+
+    Installs a VirtualClock on the app so end_bidding/mark_as_unsold fire exactly
+    at their recorded offsets. `speed` paces wall time (50 = 50x faster than the
+    recording); 0 replays as fast as possible. Replay against a copy of the
+    database as it was when recording started so ids line up.
+    """
+    from clock import VirtualClock
+
+    events = load_events(path)
+    if not events:
+        return {'events': 0}
+
+    clock = VirtualClock(start=events[0]['ts'])
+    app_module.set_clock(clock)
+
+    actors = {}
+    latencies = {}
+    recorded_timers = {}
+    failures = 0
+
+    def actor_for(event):
+        key = (event.get('username'), event.get('role'), event.get('team_id'), event.get('event_id'))
+        if key not in actors:
+            actors[key] = _Actor(app_module, *key)
+        return actors[key]
+
+    started = time.perf_counter()
+    previous_ts = events[0]['ts']
+    for event in events:
+        if speed:
+            time.sleep(max(0.0, (event['ts'] - previous_ts) / speed))
+        previous_ts = event['ts']
+        clock.advance_to(event['ts'])
+        # Timers only enqueue settlements; let them land before the next event
+        app_module.wait_for_settlements()
+
+        kind = event['kind']
+        if kind == 'timer':
+            # Timers are re-created by the virtual clock; keep counts to compare
+            recorded_timers[event['name']] = recorded_timers.get(event['name'], 0) + 1
+            continue
+
+        actor = actor_for(event)
+        t0 = time.perf_counter()
+        if kind == 'place_bid':
+            actor.socket.emit('place_bid', {'auction_id': event['auction_id'], 'bid_amount': event['bid_amount']})
+            label = 'place_bid'
+        elif kind == 'set_max_bid':
+            actor.socket.emit('set_max_bid', {'auction_id': event['auction_id'], 'max_amount': event['max_amount']})
+            label = 'set_max_bid'
+        elif kind == 'http':
+            # Values are lists (every value of the field); older logs hold one string per field
+            form = {key: (REPLAY_PASSWORD if key in REDACTED_FIELDS else value) for key, value in event['form'].items()}
+            response = actor.http.open(event['path'], method=event['method'], data=form)
+            if response.status_code >= 500:
+                failures += 1
+            label = event.get('endpoint') or event['path']
+        else:
+            continue
+        latencies.setdefault(label, []).append((time.perf_counter() - t0) * 1000)
+        # Broadcasts pile up in every test client's queue; drop them
+        for other in actors.values():
+            if other._socket is not None:
+                other._socket.get_received()
+
+    # Let auctions still running at the end of the log close out
+    deadline = clock.next_deadline()
+    while deadline is not None:
+        clock.advance_to(deadline)
+        app_module.wait_for_settlements()
+        deadline = clock.next_deadline()
+
+    wall = time.perf_counter() - started
+    virtual = clock.now() - events[0]['ts']
+    return {
+        'events': len(events),
+        'virtual_seconds': round(virtual, 3),
+        'wall_seconds': round(wall, 3),
+        'effective_speedup': round(virtual / wall, 1) if wall else None,
+        'http_5xx': failures,
+        'timers_recorded': recorded_timers,
+        'timers_replayed': dict(clock.fired),
+        'latency_ms': {
+            label: {
+                'count': len(values),
+                'p50': round(statistics.median(values), 3),
+                'p95': round(_percentile(values, 0.95), 3),
+                'max': round(max(values), 3),
+            }
+            for label, values in sorted(latencies.items())
+        },
+    }
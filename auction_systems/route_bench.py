@@ -0,0 +1,112 @@
+# route_bench.py - latency, query count and peak memory of the heavy pages as a league grows
+
+import contextvars
+import statistics
+import time
+import tracemalloc
+
+import league_gen
+
+# (name, path, who): pages whose cost grows with the size of an event
+ROUTES = (
+    ('index', '/', 'team'),
+    ('admin_dashboard', '/admin', 'admin'),
+    ('manage_teams', '/manage_teams', 'admin'),
+    ('download_sold_players', '/download_sold_players', 'admin'),
+    ('download_team_roster', '/download_team_roster', 'admin'),
+    ('auction_analytics', '/admin/analytics', 'admin'),
+    ('search_players', '/admin/players/search?status=all', 'admin'),
+)
+
+
+def _client(app_module, session_values):
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session.update(session_values)
+    return client
+
+
+def bench_routes(app_module, event_id, team, repeat=5):
+    """Time every ROUTES page of one event: {name: metrics}.
+
+    The first request is reported as `cold_ms` (it fills caches such as the
+    analytics report and the player search index), the next `repeat` as the
+    median / max warm latency. Queries come from the request's query trace and
+    `peak_kb` is the Python heap peak of one warm request (tracemalloc).
+    """
+    clients = {
+        'admin': _client(app_module, {'username': 'admin', 'role': 'admin', 'event_id': event_id}),
+        'team': _client(app_module, {'username': team['name'], 'role': 'bidder', 'team_id': team['id'], 'event_id': event_id}),
+    }
+    results = {}
+    for name, path, who in ROUTES:
+        client = clients[who]
+        started = time.perf_counter()
+        response = client.get(path)
+        cold_ms = (time.perf_counter() - started) * 1000
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(path)
+            response.get_data()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        tracemalloc.start()
+        try:
+            client.get(path).get_data()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        results[name] = {
+            'status': response.status_code,
+            'bytes': len(response.get_data()),
+            'cold_ms': round(cold_ms, 2),
+            'median_ms': round(statistics.median(timings), 2) if timings else None,
+            'max_ms': round(max(timings), 2) if timings else None,
+            'queries': int(response.headers.get('X-Query-Count', 0)),
+            'query_ms': float(response.headers.get('X-Query-Time-Ms', 0.0)),
+            'peak_kb': round(peak / 1024, 1),
+        }
+    return results
+
+
+def run_benchmark(app_module, sizes, repeat=5, seed=0, password_hash='', **league_options):
+    """Seed one league per size into the configured storage and benchmark its pages."""
+    report = {'backend': type(app_module.store).__name__, 'repeat': repeat, 'sizes': []}
+    for players in sizes:
+        # Outside the CLI's app context, so every request gets its own g (connection
+        # and query trace) as it would under a server
+        report['sizes'].append(contextvars.Context().run(_bench_size, app_module, players, repeat, seed, password_hash, league_options))
+    return report
+
+
+def _bench_size(app_module, players, repeat, seed, password_hash, league_options):
+    with app_module.app.app_context():
+        league = league_gen.seed_league(app_module.store, password_hash, players=players, seed=seed, **league_options)
+        team = app_module.store.list_teams(league['event_id'])[0]
+        # Pick up the new event and its players (seeding bypasses the search index)
+        app_module.invalidate_settings()
+        with app_module.player_search_lock:
+            app_module.load_player_search()
+    print(f"Seeded {players} players in {league['seconds']} s (event {league['event_id']}), benchmarking...")
+    return {'league': league, 'routes': bench_routes(app_module, league['event_id'], team, repeat=repeat)}
+
+
+def format_report(report):
+    """One table per metric: a row per route, a column per league size."""
+    sizes = report['sizes']
+    header = f"{'route':<24}" + ''.join(f"{entry['league']['players']:>12}" for entry in sizes)
+    lines = [f"Backend {report['backend']}, median of {report['repeat']} warm requests"]
+    for metric, label in (('median_ms', 'latency ms'), ('cold_ms', 'first request ms'),
+                          ('queries', 'queries'), ('peak_kb', 'peak KiB'), ('bytes', 'response bytes')):
+        lines.append('')
+        lines.append(f"{label} by players")
+        lines.append(header)
+        for name, _, _ in ROUTES:
+            lines.append(f"{name:<24}" + ''.join(f"{entry['routes'][name][metric]:>12}" for entry in sizes))
+    failed = [(entry['league']['players'], name, route['status']) for entry in sizes
+              for name, route in entry['routes'].items() if route['status'] != 200]
+    for players, name, status in failed:
+        lines.append(f"WARNING: {name} answered {status} at {players} players")
+    return '\n'.join(lines)
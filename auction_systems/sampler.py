@@ -0,0 +1,136 @@
+# sampler.py - on-demand sampling profiler: stacks of every thread, collapsed for flamegraphs
+
+import collections
+import os
+import re
+import sys
+import threading
+import time
+
+# Frames above this depth (from the leaf) are dropped from a sample
+MAX_DEPTH = 64
+# Leaf frames of a thread that is blocked waiting, not working: (file, function)
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'),
+    ('selectors.py', 'select'),
+    ('socket.py', 'accept'),
+    ('socket.py', 'readinto'),
+    ('socketserver.py', 'serve_forever'),
+    # The app's own background loops, which sleep (or select) in C between rounds
+    ('settings_cache.py', 'poll'),
+    ('settings_cache.py', 'listen'),
+    ('app.py', 'spectator_ticker'),
+}
+_THREAD_NUMBER_RE = re.compile(r'-\d+')
+
+
+def thread_label(name):
+    """Thread name without its counter, so every request thread or Timer shares one root."""
+    return _THREAD_NUMBER_RE.sub('', name).replace(';', ',')
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ',')
+
+
+class Profile:
+    """Result of one sampling run: {stack: samples}, stacks as (thread, outermost frame, ..., leaf)."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.idle = 0
+        self.seconds = 0.0
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed-stack format (flamegraph.pl, speedscope): one 'a;b;c count' line per stack."""
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit=25):
+        """The `limit` hottest functions by self samples, with their inclusive samples."""
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            # A recursive function counts once per stack
+            for frame in set(stack[1:]):
+                total[frame] += count
+        busy = sum(self.stacks.values()) or 1
+        return [{'function': frame, 'self': count, 'self_pct': round(100.0 * count / busy, 1),
+                 'total': total[frame], 'total_pct': round(100.0 * total[frame] / busy, 1)}
+                for frame, count in own.most_common(limit)]
+
+    def threads(self):
+        """{thread: busy samples}"""
+        counts = collections.Counter()
+        for stack, count in self.stacks.items():
+            counts[stack[0]] += count
+        return dict(counts.most_common())
+
+    def summary(self, limit=25):
+        return {
+            'seconds': round(self.seconds, 3),
+            'interval_ms': self.interval * 1000,
+            'samples': self.samples,
+            'idle_samples': self.idle,
+            'threads': self.threads(),
+            'top': self.top_functions(limit),
+        }
+
+
+def sample(seconds, interval=0.01, include_idle=False):
+    """Sample the stack of every other thread each `interval` seconds for `seconds`.
+
+    Runs on the calling thread and only reads frames (sys._current_frames), so
+    the sampled threads never wait on it. Threads blocked in IDLE_FRAMES are
+    counted in `idle` and left out of the stacks unless `include_idle`.
+    """
+    profile = Profile(interval)
+    own = threading.get_ident()
+    # Code objects repeat from sample to sample; label and classify each once
+    labels = {}
+    idle = {}
+    started = time.perf_counter()
+    deadline = started + seconds
+    next_tick = started
+    while True:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            if not stack:
+                continue
+            profile.samples += 1
+            leaf = stack[0]
+            if leaf not in idle:
+                idle[leaf] = _is_idle(leaf)
+            if idle[leaf] and not include_idle:
+                profile.idle += 1
+                continue
+            for code in stack:
+                if code not in labels:
+                    labels[code] = frame_label(code)
+            thread = thread_label(names.get(ident, f"thread {ident}"))
+            profile.stacks[(thread,) + tuple(labels[code] for code in reversed(stack))] += 1
+        next_tick += interval
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        if next_tick > now:
+            time.sleep(min(next_tick, deadline) - now)
+        else:
+            # Fell behind (a long GIL hold): skip the missed ticks instead of bursting
+            next_tick = now
+    profile.seconds = time.perf_counter() - started
+    return profile
+
+
+def _is_idle(code):
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
@@ -0,0 +1,104 @@
+# settings_cache.py - in-process cache of system_settings with cross-worker invalidation
+
+import select
+import threading
+import time
+
+
+class SettingsCache:
+    """key -> value snapshot of system_settings, reloaded lazily after invalidate().
+
+    `loader` returns the whole table as a dict. A generation counter makes sure
+    a load that raced with an invalidation is not kept. If a reload fails, the
+    last snapshot is served (not kept) and the next read tries again; with no
+    snapshot yet the error propagates.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._values = None
+        self._last = None
+        self._generation = 0
+
+    def get(self, key, default=None):
+        values = self._values
+        if values is None:
+            values = self.reload()
+        return values.get(key, default)
+
+    def all(self):
+        values = self._values
+        if values is None:
+            values = self.reload()
+        return dict(values)
+
+    def reload(self):
+        with self._lock:
+            generation = self._generation
+        try:
+            values = self._loader()
+        except Exception as e:
+            if self._last is None:
+                raise
+            print(f"Reloading the settings cache failed, serving the previous values: {e}")
+            return self._last
+        with self._lock:
+            self._last = values
+            if generation == self._generation:
+                self._values = values
+        return values
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._values = None
+
+
+def start_pg_listener(dsn, channel, on_change, retry_seconds=5.0):
+    """LISTEN on a PostgreSQL channel in a daemon thread; call on_change() per notification.
+
+    on_change() also runs after every (re)connect, since notifications sent
+    while disconnected are lost.
+    """
+    import psycopg2
+
+    def listen():
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(dsn)
+                conn.set_session(autocommit=True)
+                conn.cursor().execute(f"LISTEN {channel}")
+                on_change()
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        on_change()
+            except psycopg2.Error as e:
+                print(f"Settings listener lost its connection, retrying: {e}")
+                on_change()
+                time.sleep(retry_seconds)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    thread = threading.Thread(target=listen, name=f'listen-{channel}', daemon=True)
+    thread.start()
+    return thread
+
+
+def start_poller(interval, on_change):
+    """Call on_change() every `interval` seconds (for databases without notifications)."""
+
+    def poll():
+        while True:
+            time.sleep(interval)
+            on_change()
+
+    thread = threading.Thread(target=poll, name='settings-poller', daemon=True)
+    thread.start()
+    return thread
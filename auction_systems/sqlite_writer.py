@@ -0,0 +1,382 @@
+# sqlite_writer.py - tuned SQLite mode: WAL, pooled readers and one group-committing writer thread
+
+import queue
+import re
+import sqlite3
+import threading
+
+# Statements that only read. Everything else (INSERT/UPDATE/DELETE/DDL, PRAGMA x = y)
+# is sent to the writer thread.
+_READ_RE = re.compile(r'^\s*(SELECT|EXPLAIN)\b', re.IGNORECASE)
+_READ_PRAGMA_RE = re.compile(r'^\s*PRAGMA\s+[\w.]+(\s*\(.*\))?\s*;?\s*$', re.IGNORECASE | re.DOTALL)
+_WITH_WRITE_RE = re.compile(r'\b(INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+
+def is_write(sql):
+    """Return True if the statement has to run on the writer connection."""
+    if _READ_RE.match(sql) or _READ_PRAGMA_RE.match(sql):
+        return False
+    if re.match(r'^\s*WITH\b', sql, re.IGNORECASE):
+        return bool(_WITH_WRITE_RE.search(sql))
+    return True
+
+
+class _Session:
+    """One logical write transaction, served by the writer thread."""
+
+    def __init__(self):
+        self.commands = queue.Queue()
+        self.replies = queue.Queue()
+        self.committed = False
+        self.owner = threading.get_ident()
+
+
+class _BufferedCursor:
+    """Cursor-like result of a statement executed on the writer thread."""
+
+    def __init__(self, rows, lastrowid, rowcount, description):
+        self._rows = rows
+        self._pos = 0
+        self.lastrowid = lastrowid
+        self.rowcount = rowcount
+        self.description = description
+
+    def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        row = self._rows[self._pos]
+        self._pos += 1
+        return row
+
+    def fetchall(self):
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+    def close(self):
+        pass
+
+
+class RoutedCursor:
+    """Cursor that reads on a pooled connection and writes through the writer thread."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._result = None
+        self.lastrowid = None
+        self.rowcount = -1
+        self.description = None
+
+    def execute(self, sql, params=()):
+        if self._conn._session is not None or is_write(sql):
+            self._result = self._conn._call(('execute', sql, params))
+        else:
+            self._result = self._conn._reader().execute(sql, params)
+        self.lastrowid = self._result.lastrowid
+        self.rowcount = self._result.rowcount
+        self.description = self._result.description
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._result = self._conn._call(('executemany', sql, list(seq_of_params)))
+        self.lastrowid = self._result.lastrowid
+        self.rowcount = self._result.rowcount
+        self.description = None
+        return self
+
+    def fetchone(self):
+        return self._result.fetchone() if self._result else None
+
+    def fetchall(self):
+        return self._result.fetchall() if self._result else []
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        if self._result is not None:
+            self._result.close()
+
+
+class RoutedConnection:
+    """Drop-in for sqlite3.Connection used by the request code in tuned mode.
+
+    The first write opens a session on the writer thread; every statement after
+    that (reads included, so they see the pending writes) runs there until
+    commit() or rollback(). commit() returns once the group COMMIT is durable.
+    """
+
+    def __init__(self, engine):
+        self._engine = engine
+        self._read_conn = None
+        self._session = None
+
+    def _reader(self):
+        if self._read_conn is None:
+            self._read_conn = self._engine.pool.acquire()
+        return self._read_conn
+
+    def _call(self, command):
+        if self._session is None:
+            self._session = self._engine.open_session()
+        self._session.commands.put(command)
+        status, value = self._session.replies.get()
+        if status == 'aborted':
+            self._end_session()
+        if status != 'ok':
+            raise value
+        return value
+
+    def _end_session(self):
+        self._engine.close_session(self._session)
+        self._session = None
+
+    def cursor(self):
+        return RoutedCursor(self)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def commit(self):
+        if self._session is None:
+            return
+        try:
+            self._call(('commit',))
+        finally:
+            self._end_session()
+
+    def rollback(self):
+        if self._session is None:
+            return
+        try:
+            self._call(('rollback',))
+        finally:
+            self._end_session()
+
+    def close(self):
+        if self._session is not None:
+            # Not committed: discard the writes without waiting for the writer.
+            self._session.commands.put(('rollback',))
+            self._end_session()
+        if self._read_conn is not None:
+            self._engine.pool.release(self._read_conn)
+            self._read_conn = None
+
+
+class ReadPool:
+    """Bounded LIFO pool of read-only connections."""
+
+    def __init__(self, engine, size, timeout):
+        self._engine = engine
+        self._size = size
+        self._timeout = timeout
+        self._created = 0
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self._size:
+                self._created += 1
+                return self._engine.open_connection(read_only=True)
+        try:
+            return self._idle.get(timeout=self._timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f'no read connection free within {self._timeout:g}s') from None
+
+    def release(self, conn):
+        self._idle.put(conn)
+
+
+class WriterThread(threading.Thread):
+    """Owns the only write connection and group-commits queued sessions.
+
+    Sessions are served one at a time inside a shared transaction, each under
+    its own SAVEPOINT so a rollback only discards that session. The outer
+    COMMIT happens when the queue runs dry, `max_batch` sessions committed, or
+    the session being served has not sent its next statement within
+    `group_wait`: then its partial work is set aside, the sessions before it
+    commit without waiting for it, and its statements are replayed in the next
+    transaction. A burst of writes pays for one fsync instead of one per
+    request, and a commit never waits on a slow request behind it.
+    """
+
+    def __init__(self, engine, max_batch, idle_timeout, group_wait):
+        super().__init__(name='sqlite-writer', daemon=True)
+        self._engine = engine
+        self._sessions = queue.Queue()
+        self._conn = None
+        self._batch = []
+        self.max_batch = max_batch
+        self.idle_timeout = idle_timeout
+        self.group_wait = group_wait
+
+    def submit(self, session):
+        self._sessions.put(session)
+
+    def run(self):
+        self._conn = self._engine.open_connection(read_only=False)
+        while True:
+            session = self._sessions.get()
+            while session is not None:
+                self._serve(session)
+                if len(self._batch) >= self.max_batch:
+                    self._flush()
+                try:
+                    session = self._sessions.get_nowait()
+                except queue.Empty:
+                    session = None
+            self._flush()
+
+    def _flush(self):
+        """COMMIT the shared transaction and answer the sessions that committed in it."""
+        conn = self._conn
+        if not conn.in_transaction:
+            return
+        try:
+            conn.execute('COMMIT')
+            reply = ('ok', None)
+        except sqlite3.Error as e:
+            conn.execute('ROLLBACK')
+            reply = ('error', e)
+        for done in self._batch:
+            done.replies.put(reply)
+        self._batch = []
+
+    def _begin(self, session):
+        """Open the session's SAVEPOINT, starting the shared transaction if needed."""
+        if not self._conn.in_transaction:
+            try:
+                self._conn.execute('BEGIN IMMEDIATE')
+            except sqlite3.Error as e:
+                # Another process holds the write lock past busy_timeout
+                session.replies.put(('aborted', e))
+                return False
+        self._conn.execute('SAVEPOINT session')
+        return True
+
+    def _discard(self, session):
+        self._conn.execute('ROLLBACK TO session')
+        self._conn.execute('RELEASE session')
+
+    def _serve(self, session):
+        if not self._begin(session):
+            return
+        # (command, outcome) of every statement run so far, replayed if the session is set aside
+        done = []
+        while True:
+            try:
+                command = session.commands.get(timeout=self.group_wait if self._batch else self.idle_timeout)
+            except queue.Empty:
+                self._discard(session)
+                if not self._batch:
+                    # The caller went away (or is blocked on another write) - free the writer.
+                    session.replies.put(('aborted', sqlite3.OperationalError('write transaction timed out')))
+                    return
+                # Between statements: commit the sessions before this one now, then pick it up again
+                self._flush()
+                if not self._replay(session, done):
+                    return
+                continue
+            op = command[0]
+            if op == 'commit':
+                self._conn.execute('RELEASE session')
+                session.committed = True
+                self._batch.append(session)
+                return
+            if op == 'rollback':
+                self._discard(session)
+                session.replies.put(('ok', None))
+                return
+            reply, outcome = self._run(command)
+            done.append((command, outcome))
+            session.replies.put(reply)
+
+    def _run(self, command):
+        """Execute one statement: (reply for the caller, comparable outcome for _replay)."""
+        try:
+            if command[0] == 'executemany':
+                cur = self._conn.executemany(command[1], command[2])
+            else:
+                cur = self._conn.execute(command[1], command[2])
+            rows = cur.fetchall() if cur.description else []
+            result = _BufferedCursor(rows, cur.lastrowid, cur.rowcount, cur.description)
+            cur.close()
+            return ('ok', result), ([tuple(row) for row in rows], cur.lastrowid, cur.rowcount)
+        except Exception as e:
+            return ('error', e), (type(e), str(e))
+
+    def _replay(self, session, done):
+        """Re-run a set-aside session's statements in a new transaction.
+
+        The database is back in the state the session first saw, so the
+        statements give the same results unless another process wrote in
+        between; then the session is aborted instead of continuing on results
+        its caller never saw.
+        """
+        if not self._begin(session):
+            return False
+        for command, outcome in done:
+            if self._run(command)[1] != outcome:
+                self._discard(session)
+                session.replies.put(('aborted', sqlite3.OperationalError('write transaction changed under a group commit')))
+                return False
+        return True
+
+
+class SQLiteEngine:
+    """Tuned SQLite database: one writer thread plus a pool of concurrent readers."""
+
+    def __init__(self, path, busy_timeout_ms=5000, mmap_size=268435456, cache_size_kb=65536,
+                 read_pool_size=8, max_batch=64, idle_timeout=5.0, group_wait=0.002):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        # journal_mode is persistent in the database file, set it once up front
+        setup = sqlite3.connect(path, timeout=busy_timeout_ms / 1000.0)
+        setup.execute('PRAGMA journal_mode=WAL')
+        setup.close()
+        # thread ident -> its open write session
+        self._sessions = {}
+        self.pool = ReadPool(self, read_pool_size, busy_timeout_ms / 1000.0)
+        self.writer = WriterThread(self, max_batch, idle_timeout, group_wait)
+        self.writer.start()
+
+    def open_connection(self, read_only):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000.0,
+                               check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        if read_only:
+            conn.execute('PRAGMA query_only=ON')
+        return conn
+
+    def open_session(self):
+        """Start a write session for the calling thread.
+
+        A thread gets one at a time: a second connection writing before the
+        first commits would wait on the writer, which is waiting on the first.
+        That fails right away, like a plain SQLite connection hitting the
+        write lock its own thread holds (minus busy_timeout).
+        """
+        if threading.get_ident() in self._sessions:
+            raise sqlite3.OperationalError('database is locked: this thread has an uncommitted write on another connection')
+        session = self._sessions[threading.get_ident()] = _Session()
+        self.writer.submit(session)
+        return session
+
+    def close_session(self, session):
+        if self._sessions.get(session.owner) is session:
+            del self._sessions[session.owner]
+
+    def connect(self):
+        return RoutedConnection(self)
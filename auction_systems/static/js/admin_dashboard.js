@@ -0,0 +1,381 @@
+// admin_dashboard.js - live admin dashboard: socket updates and XHR admin actions
+
+// Socket.IO से कनेक्ट करें
+function formatTime(seconds) {
+    const minutes = Math.floor(seconds / 60);
+    const remainingSeconds = seconds % 60;
+    return `${minutes}:${remainingSeconds < 10 ? '0' : ''}${remainingSeconds}`;
+}
+
+function updateTimer(auctionId, timeLeft) {
+    const timerElement = document.getElementById(`admin-time-left-${auctionId}`);
+    if (timerElement) {
+        timerElement.textContent = formatTime(timeLeft);
+    }
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text == null ? '' : String(text);
+    return div.innerHTML;
+}
+
+function formatPrice(value) {
+    return `₹${parseFloat(value || 0).toFixed(2)}`;
+}
+
+function adjustCount(id, delta) {
+    const element = document.getElementById(id);
+    if (element) element.textContent = Math.max(0, parseInt(element.textContent, 10) + delta);
+}
+
+// --- Patching the page in place (admin action responses and Socket.IO events) ---
+
+const STATUS_STYLES = {
+    live: {border: 'border-indigo-400', text: 'text-green-600'},
+    sold: {border: 'border-green-400', text: 'text-blue-600'},
+    unsold: {border: 'border-gray-300', text: 'text-red-600'},
+};
+
+function upsertAuctionCard(auction) {
+    let card = document.getElementById(`auction-card-${auction.id}`);
+    if (!card) {
+        const empty = document.getElementById('auction-list-empty');
+        if (empty) empty.remove();
+        card = document.createElement('div');
+        card.id = `auction-card-${auction.id}`;
+        card.innerHTML = `
+            <h3 class="text-xl font-bold text-gray-900 dark:text-gray-100 mb-2">${escapeHtml(auction.title)}</h3>
+            <div class="grid grid-cols-2 gap-2 text-sm">
+                <p class="text-gray-600">Final/Current Price:</p>
+                <p id="auction-price-${auction.id}" class="font-bold text-red-600"></p>
+
+                <p class="text-gray-600">Highest Bidder:</p>
+                <p id="auction-bidder-${auction.id}" class="font-medium text-indigo-600">N/A</p>
+
+                <p class="text-gray-600">Status:</p>
+                <p id="auction-status-${auction.id}" class="font-bold"></p>
+
+                <p class="text-gray-600">Time Left:</p>
+                <p id="admin-time-left-${auction.id}" class="font-bold text-red-500 text-lg">--</p>
+            </div>
+        `;
+        document.getElementById('auction-list').prepend(card);
+        adjustCount('auctions-count', 1);
+    }
+    setAuctionCard(auction.id, {price: auction.price, bidder: 'N/A', status: 'live'});
+}
+
+function setAuctionCard(auctionId, changes) {
+    const card = document.getElementById(`auction-card-${auctionId}`);
+    if (!card) return;
+    if (changes.price !== undefined) {
+        document.getElementById(`auction-price-${auctionId}`).textContent = formatPrice(changes.price);
+    }
+    if (changes.bidder !== undefined) {
+        document.getElementById(`auction-bidder-${auctionId}`).textContent = changes.bidder || 'N/A';
+    }
+    if (changes.status) {
+        const style = STATUS_STYLES[changes.status];
+        card.className = `bg-white dark:bg-gray-800 rounded-xl shadow-lg p-5 border-2 ${style.border}`;
+        const statusElement = document.getElementById(`auction-status-${auctionId}`);
+        statusElement.className = `font-bold ${style.text}`;
+        statusElement.textContent = changes.status.toUpperCase();
+        if (changes.status !== 'live') {
+            auctionClock.stop(auctionId);
+        }
+    }
+}
+
+function removePlayerReady(playerId) {
+    const row = document.getElementById(`player-ready-${playerId}`);
+    if (row) {
+        row.remove();
+        adjustCount('players-ready-count', -1);
+    }
+    const searchRow = document.getElementById(`player-search-${playerId}`);
+    if (searchRow) searchRow.remove();
+}
+
+function addUnsoldRow(auctionId, title) {
+    if (document.getElementById(`unsold-${auctionId}`)) return;
+    const list = document.getElementById('unsold-players-list');
+    const empty = list.querySelector('p.py-3');
+    if (empty) empty.remove();
+    const row = document.createElement('div');
+    row.id = `unsold-${auctionId}`;
+    row.className = 'py-4 flex flex-col md:flex-row md:justify-between md:items-center gap-4';
+    row.innerHTML = `
+        <input type="checkbox" name="auction_ids" value="${auctionId}" form="bulk-reauction" class="h-4 w-4">
+        <div class="flex-grow">
+            <p class="font-bold text-gray-800 dark:text-gray-100">${escapeHtml(title)}</p>
+        </div>
+        <form method="POST" action="/admin/reauction/${auctionId}" data-ajax="reauction">
+            <button type="submit" class="bg-red-600 text-white font-bold px-4 py-2 rounded-md text-sm hover:bg-red-700 shadow-md transition duration-150">
+                Re-auction
+            </button>
+        </form>
+    `;
+    list.appendChild(row);
+    adjustCount('unsold-count', 1);
+}
+
+function removeUnsoldRow(auctionId) {
+    const row = document.getElementById(`unsold-${auctionId}`);
+    if (row) {
+        row.remove();
+        adjustCount('unsold-count', -1);
+    }
+}
+
+function applyRegistration(registration) {
+    const isOpen = registration.status === 'open';
+    const status = document.getElementById('reg-status');
+    status.textContent = registration.status_display;
+    status.className = `font-bold ${isOpen ? 'text-green-600' : 'text-red-600'}`;
+    const endsAt = document.getElementById('reg-ends-at');
+    endsAt.textContent = `Closes at: ${registration.ends_at || ''}`;
+    endsAt.classList.toggle('hidden', !(isOpen && registration.ends_at));
+    const toggle = document.getElementById('reg-toggle');
+    toggle.value = isOpen ? 'close' : 'open';
+    toggle.textContent = isOpen ? 'Close Registration' : 'Open Registration (24h)';
+    toggle.className = `${isOpen ? 'bg-red-600 hover:bg-red-700' : 'bg-green-600 hover:bg-green-700'} text-white font-bold px-4 py-2 rounded-md text-sm shadow-md transition duration-150`;
+}
+
+// What each kind of admin form patches from its JSON response
+const ACTION_PATCHES = {
+    'registration': data => applyRegistration(data.registration),
+    'default-budget': data => {
+        document.getElementById('default_budget').value = parseFloat(data.default_team_budget).toFixed(2);
+    },
+    'start-auction': data => {
+        removePlayerReady(data.auction.player_id);
+        upsertAuctionCard(data.auction);
+        auctionClock.set(data.auction.id, data.auction.ends_at);
+    },
+    'reauction': data => {
+        removeUnsoldRow(data.auction.id);
+        upsertAuctionCard(data.auction);
+        auctionClock.set(data.auction.id, data.auction.ends_at);
+    },
+    'reauction-bulk': data => data.auctions.forEach(auction => {
+        removeUnsoldRow(auction.id);
+        upsertAuctionCard(auction);
+        auctionClock.set(auction.id, auction.ends_at);
+    }),
+};
+
+function showActionError(message) {
+    const box = document.getElementById('action-error');
+    box.innerHTML = `<strong>Error:</strong> ${escapeHtml(message)}`;
+    box.classList.remove('hidden');
+}
+
+// Admin forms marked data-ajax are sent with fetch(); the server answers with
+// only the changed entities instead of redirecting back to the full dashboard.
+document.addEventListener('submit', function(event) {
+    const form = event.target;
+    const patch = ACTION_PATCHES[form.dataset.ajax];
+    if (!patch) return;
+    event.preventDefault();
+    const body = new FormData(form);
+    if (event.submitter && event.submitter.name) body.set(event.submitter.name, event.submitter.value);
+    form.querySelectorAll('button').forEach(button => button.disabled = true);
+    fetch(form.action, {
+        method: 'POST',
+        body: body,
+        headers: {'X-Requested-With': 'XMLHttpRequest', 'Accept': 'application/json'},
+    })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.ok) throw new Error(data.error || 'Action failed.');
+            document.getElementById('action-error').classList.add('hidden');
+            patch(data);
+        })
+        .catch(error => showActionError(error.message))
+        .finally(() => form.querySelectorAll('button').forEach(button => button.disabled = false));
+});
+
+// --- Player search (served from the in-memory index on the server) ---
+const playersReadyList = document.getElementById('players-ready-list');
+const playerSearchResults = document.getElementById('player-search-results');
+let playerSearchTimer = null;
+
+function renderPlayerResults(data) {
+    const summary = document.getElementById('player-search-summary');
+    summary.textContent = `${data.total} match${data.total === 1 ? '' : 'es'}` + (data.total > data.players.length ? `, showing ${data.players.length}` : '') + ` (${data.took_ms} ms)`;
+    summary.classList.remove('hidden');
+    playersReadyList.classList.add('hidden');
+    playerSearchResults.classList.remove('hidden');
+    if (!data.players.length) {
+        playerSearchResults.innerHTML = '<p class="text-gray-500 dark:text-gray-400 py-3">No players match this search.</p>';
+        return;
+    }
+    playerSearchResults.innerHTML = data.players.map(player => `
+        <div id="player-search-${player.id}" class="py-4 flex flex-col md:flex-row md:justify-between md:items-center gap-4">
+            <div class="flex-grow">
+                <p class="font-bold text-gray-800 dark:text-gray-100">${escapeHtml(player.username)}</p>
+                <div class="text-xs text-gray-500 dark:text-gray-400 mt-1 space-x-2 sm:space-x-4">
+                    <span>Discord: <span class="font-semibold text-gray-700">${escapeHtml(player.discord_name)}</span></span>
+                    <span>Base Price: <span class="font-semibold text-gray-700">${formatPrice(player.base_price)}</span></span>
+                    <span>Level: <span class="font-semibold text-gray-700">${escapeHtml(player.game_level)}</span></span>
+                </div>
+            </div>
+            <form method="POST" action="/admin/start_auction/${player.id}" data-ajax="start-auction">
+                <button type="submit" class="bg-purple-600 text-white font-bold px-4 py-2 rounded-md text-sm hover:bg-purple-700 shadow-md transition duration-150">
+                    Start Auction
+                </button>
+            </form>
+        </div>
+    `).join('');
+}
+
+function searchPlayers() {
+    const params = new URLSearchParams();
+    const q = document.getElementById('player-search-q').value.trim();
+    const level = document.getElementById('player-search-level').value.trim();
+    const minPrice = document.getElementById('player-search-min').value;
+    const maxPrice = document.getElementById('player-search-max').value;
+    if (!q && !level && !minPrice && !maxPrice) {
+        // No filter: back to the full server-rendered list
+        playerSearchResults.classList.add('hidden');
+        playersReadyList.classList.remove('hidden');
+        document.getElementById('player-search-summary').classList.add('hidden');
+        return;
+    }
+    if (q) params.set('q', q);
+    if (document.getElementById('player-search-substring').checked) params.set('mode', 'substring');
+    if (level) params.set('level', level);
+    if (minPrice) params.set('min_price', minPrice);
+    if (maxPrice) params.set('max_price', maxPrice);
+    fetch(`/admin/players/search?${params}`)
+        .then(response => response.json())
+        .then(renderPlayerResults)
+        .catch(error => console.error('Player search failed:', error));
+}
+
+document.querySelectorAll('#player-search input').forEach(input => {
+    input.addEventListener('input', () => {
+        clearTimeout(playerSearchTimer);
+        playerSearchTimer = setTimeout(searchPlayers, 150);
+    });
+});
+
+const socket = io();
+// On connect the server sends every running deadline; no timer polling needed
+const auctionClock = AuctionClock(socket, updateTimer);
+
+socket.on('new_team', function(data) {
+    // नया टीम विकल्प बनाएं
+    var newOption = document.createElement('option');
+    newOption.value = data.team_name;
+    newOption.textContent = data.team_name;
+
+    // सभी टीम असाइनमेंट सेलेक्ट फ़ील्ड में नया विकल्प जोड़ें
+    var selectElements = document.querySelectorAll('select[name="team_id"]');
+    selectElements.forEach(function(selectElement) {
+        selectElement.add(newOption.cloneNode(true)); // हर सेलेक्ट फ़ील्ड के लिए एक कॉपी जोड़ें
+    });
+
+    // अलर्ट दिखाएं
+    alert(`New team "${data.team_name}" created!`);
+});
+
+// Listener for activity history on connect
+socket.on('activity_history', function(history) {
+    const activityFeed = document.getElementById('activity-feed');
+    // Clear the "Waiting for bids..." message
+    activityFeed.innerHTML = ''; 
+    history.forEach(function(activity) {
+        const newActivity = document.createElement('li');
+        newActivity.className = 'text-sm p-2 bg-gray-100 dark:bg-gray-700 rounded-md';
+        newActivity.innerHTML = `${activity.message} <span class="text-gray-400 text-xs float-right">${activity.timestamp}</span>`;
+        // Append so that the order is correct (oldest at the top)
+        activityFeed.appendChild(newActivity);
+    });
+});
+
+// New Activity Listener
+socket.on('new_activity', function(data) {
+    const activityFeed = document.getElementById('activity-feed');
+    const newActivity = document.createElement('li');
+    newActivity.className = 'text-sm p-2 bg-gray-100 dark:bg-gray-700 rounded-md';
+    newActivity.innerHTML = `${data.message} <span class="text-gray-400 text-xs float-right">${data.timestamp}</span>`;
+    activityFeed.appendChild(newActivity); // सबसे नीचे नई गतिविधि जोड़ें
+    activityFeed.scrollTop = activityFeed.scrollHeight; // स्क्रॉल को नीचे रखें
+});
+
+// Stats Update Listener
+socket.on('stats_update', function(data) {
+    document.getElementById('total-players').textContent = data.total_players;
+    document.getElementById('sold-players').textContent = data.sold_players;
+    document.getElementById('unsold-players').textContent = data.unsold_players;
+});
+
+function setTeamBudget(teamId, teamName, budget) {
+    const teamBudgetLi = document.getElementById(`team-budget-${teamId}`);
+    if (teamBudgetLi) {
+        teamBudgetLi.innerHTML = `
+            <span class="font-bold text-gray-800 dark:text-gray-100">${escapeHtml(teamName)}</span>
+            <span class="font-semibold text-green-600">${formatPrice(budget)}</span>
+        `;
+    }
+}
+
+socket.on('player_sold', function(data) {
+    // Update the budget for the winning team in the list
+    setTeamBudget(data.winning_team_id, data.team_name, data.new_budget);
+    setAuctionCard(data.auction_id, {price: data.price, bidder: data.team_name, status: 'sold'});
+});
+
+function addTeamBudgetRow(data) {
+    if (document.getElementById(`team-budget-${data.id}`)) return;
+    const list = document.getElementById('team-budgets-list');
+    const empty = list.querySelector('p');
+    if (empty) empty.remove();
+    const li = document.createElement('li');
+    li.id = `team-budget-${data.id}`;
+    li.className = 'py-2 flex justify-between items-center';
+    li.innerHTML = `
+        <span class="font-bold text-gray-800 dark:text-gray-100">${escapeHtml(data.name)}</span>
+        <span class="font-semibold text-green-600">${formatPrice(data.budget)}</span>
+    `;
+    list.appendChild(li);
+}
+
+socket.on('new_team_added', addTeamBudgetRow);
+
+// Bulk team upload / bulk budget change: one event for the whole batch
+socket.on('teams_added', data => data.teams.forEach(addTeamBudgetRow));
+
+socket.on('team_budgets_updated', function(data) {
+    data.teams.forEach(team => setTeamBudget(team.id, team.name, team.budget));
+});
+
+
+socket.on('player_unsold', function(data) {
+    setAuctionCard(data.auction_id, {status: 'unsold'});
+    addUnsoldRow(data.auction_id, data.player_name);
+});
+
+socket.on('new_auction', function(data) {
+    // This event is fired for both new and re-auctions (including ones started from another tab).
+    if (data.player_id) removePlayerReady(data.player_id);
+    removeUnsoldRow(data.id);
+    upsertAuctionCard(data);
+    auctionClock.set(data.id, data.ends_at);
+});
+
+socket.on('auctions_restarted', function(data) {
+    // A bulk re-auction, possibly started from another tab
+    data.auctions.forEach(function(auction) {
+        removeUnsoldRow(auction.id);
+        upsertAuctionCard(auction);
+        auctionClock.set(auction.id, auction.ends_at);
+    });
+});
+
+socket.on('auction_update', function(data) {
+    setAuctionCard(data.auction_id, {price: data.new_price, bidder: data.bidder});
+    auctionClock.set(data.auction_id, data.ends_at);
+});
@@ -0,0 +1,64 @@
+// Auction countdowns. The server sends absolute deadlines (`ends_at`, server
+// clock in epoch seconds) and answers `clock_sync` with its clock; every
+// page counts down locally against the estimated offset, so all clients
+// show the same time without polling.
+function AuctionClock(socket, render) {
+    const SYNC_SAMPLES = 3;
+    const deadlines = {};
+    const shown = {};
+    let offset = 0;  // server clock minus local clock, in ms
+
+    function sync() {
+        let best = null;
+        let remaining = SYNC_SAMPLES;
+        (function sample() {
+            const sent = Date.now();
+            socket.emit('clock_sync', function(serverNow) {
+                const received = Date.now();
+                const rtt = received - sent;
+                // Keep the sample with the shortest round trip (least queueing noise)
+                if (best === null || rtt < best.rtt) {
+                    best = {rtt: rtt, offset: serverNow * 1000 - (sent + received) / 2};
+                    offset = best.offset;
+                    tick();
+                }
+                if (--remaining > 0) sample();
+            });
+        })();
+    }
+
+    function secondsLeft(auctionId) {
+        return Math.max(0, Math.ceil((deadlines[auctionId] * 1000 - (Date.now() + offset)) / 1000));
+    }
+
+    function tick() {
+        for (const auctionId in deadlines) {
+            const left = secondsLeft(auctionId);
+            if (shown[auctionId] !== left) {
+                shown[auctionId] = left;
+                render(auctionId, left);
+            }
+            if (left === 0) delete deadlines[auctionId];
+        }
+    }
+
+    socket.on('connect', sync);
+    socket.on('auction_deadlines', function(data) {
+        for (const auctionId in data) deadlines[auctionId] = data[auctionId];
+        tick();
+    });
+    setInterval(tick, 250);
+
+    return {
+        set(auctionId, endsAt) {
+            deadlines[auctionId] = endsAt;
+            delete shown[auctionId];
+            tick();
+        },
+        stop(auctionId) {
+            delete deadlines[auctionId];
+            shown[auctionId] = 0;
+            render(auctionId, 0);
+        },
+    };
+}
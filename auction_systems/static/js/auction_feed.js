@@ -0,0 +1,301 @@
+// auction_feed.js - the bidders' live auction feed (values from the page in AUCTION_FEED)
+
+// Socket.IO से कनेक्ट करें
+const socket = io();
+
+// --- Utility Function ---
+function formatCurrency(amount) {
+    return `₹${parseFloat(amount).toFixed(2)}`;
+}
+
+function formatTime(seconds) {
+    const minutes = Math.floor(seconds % 3600 / 60);
+    const remainingSeconds = Math.floor(seconds % 60);
+    return `${minutes}:${remainingSeconds < 10 ? '0' : ''}${remainingSeconds}`;
+}
+
+function updateTimer(auctionId, timeLeft) {
+    const timerElement = document.getElementById(`time-left-${auctionId}`);
+    if (timerElement) {
+        timerElement.textContent = formatTime(timeLeft);
+    }
+}
+
+// On connect the server sends every running deadline; no timer polling needed
+const auctionClock = AuctionClock(socket, updateTimer);
+function showBidMessage(auctionId, message, color) {
+    const msgElement = document.getElementById(`bid-message-${auctionId}`);
+    if (msgElement) {
+        msgElement.className = `text-xs mt-1 h-3 text-center font-medium ${color === 'red' ? 'text-red-600' : 'text-green-600'}`;
+        msgElement.textContent = message;
+        // मैसेज 3 सेकंड के बाद साफ़ करें
+        setTimeout(() => { msgElement.textContent = ''; }, 3000); 
+    }
+}
+
+function createAuctionCard(auction) {
+    const canBid = AUCTION_FEED.canBid;
+    const minBidAmount = auction.price + 100;
+
+    let formHtml = '';
+    if (canBid) {
+        formHtml = `
+            <form onsubmit="submitBid(event, ${auction.id})" class="mt-4 flex flex-col space-y-2">
+                <label for="bid-${auction.id}" class="block text-sm font-medium text-gray-700">
+                    Your Bid (Min ${formatCurrency(minBidAmount)}):
+                </label>
+                <input type="number" id="bid-input-${auction.id}" name="bid" 
+                    min="${minBidAmount.toFixed(2)}" 
+                    step="0.01" 
+                    value="${minBidAmount.toFixed(2)}" 
+                    required
+                    class="w-full p-3 border-2 border-indigo-300 rounded-lg text-lg focus:ring-indigo-500 focus:border-indigo-500 font-mono bg-white dark:bg-gray-700 text-gray-800 dark:text-gray-200">
+                    
+                <button type="submit"
+                    class="w-full bg-indigo-600 hover:bg-indigo-700 text-white font-bold py-3 rounded-lg shadow-md transition duration-200 transform hover:scale-[1.01] disabled:bg-gray-400">
+                    PLACE BID
+                </button>
+                <div class="flex gap-2">
+                    <input type="number" id="max-bid-input-${auction.id}" step="0.01" placeholder="Max bid (auto-bid)"
+                        class="flex-grow p-2 border-2 border-purple-300 rounded-lg text-sm font-mono bg-white dark:bg-gray-700 text-gray-800 dark:text-gray-200">
+                    <button type="button" onclick="submitMaxBid(${auction.id})"
+                        class="bg-purple-600 hover:bg-purple-700 text-white font-bold px-3 rounded-lg shadow-md text-sm">SET MAX</button>
+                </div>
+                <p id="bid-message-${auction.id}" class="text-xs mt-1 h-3 text-center font-medium"></p>
+            </form>
+        `;
+    }
+
+    return `
+        <div class="bg-white dark:bg-gray-800 p-6 rounded-xl shadow-lg border-2 border-gray-200 dark:border-gray-700 transition duration-300 hover:shadow-xl space-y-4" id="auction-${auction.id}">
+            <h3 class="text-xl font-extrabold text-indigo-700">${auction.title}</h3>
+            <div class="grid grid-cols-2 gap-4 text-sm font-medium">
+                <p class="text-gray-600">Current Bid:</p>
+                <p id="price-${auction.id}" class="text-2xl font-bold text-orange-600">
+                    ${formatCurrency(auction.price)}
+                </p>
+                <p class="text-gray-600">Highest Bidding Team:</p>
+                <p id="bidder-${auction.id}" class="text-indigo-600 dark:text-indigo-400 font-bold">N/A</p>
+                <p class="text-gray-600">Time Left:</p>
+                <p id="time-left-${auction.id}" class="text-red-500 font-bold text-lg">--</p>
+            </div>
+            ${formHtml}
+        </div>
+    `;
+}
+
+// --- SocketIO Event Handlers ---
+
+// 1. Bid Submission (क्लाइंट से सर्वर को)
+window.submitBid = function(event, auctionId) {
+    event.preventDefault();
+    
+    const bidInput = document.getElementById(`bid-input-${auctionId}`);
+    const bidAmount = parseFloat(bidInput.value);
+    
+    showBidMessage(auctionId, "Placing bid...", 'gray');
+
+    // सर्वर को 'place_bid' इवेंट भेजें
+    socket.emit('place_bid', {
+        auction_id: auctionId,
+        bid_amount: bidAmount
+    });
+};
+
+// 1b. Max (proxy) bid: the server bids for the team up to this amount
+window.submitMaxBid = function(auctionId) {
+    const maxInput = document.getElementById(`max-bid-input-${auctionId}`);
+    const maxAmount = parseFloat(maxInput.value);
+    if (!maxAmount) return;
+
+    showBidMessage(auctionId, "Setting max bid...", 'gray');
+    socket.emit('set_max_bid', {
+        auction_id: auctionId,
+        max_amount: maxAmount
+    });
+};
+
+// 2. Live Update Listener (सर्वर से सभी क्लाइंट्स को)
+socket.on('auction_update', function(data) {
+    const auctionId = data.auction_id;
+    const newPrice = data.new_price;
+    const bidder = data.bidder;
+
+
+    // a. प्राइस अपडेट करें
+    const priceElement = document.getElementById(`price-${auctionId}`);
+    if (priceElement) {
+        priceElement.textContent = formatCurrency(newPrice);
+    }
+
+    // b. बिडर नाम अपडेट करें
+    const bidderElement = document.getElementById(`bidder-${auctionId}`);
+
+
+
+
+
+    const currentUserTeam = AUCTION_FEED.teamName;
+
+    if (bidderElement) {
+        // चेक करें कि क्या वर्तमान यूज़र की टीम उच्चतम बिडर है
+        if (bidder === currentUserTeam) {
+            bidderElement.innerHTML = `<span class="text-indigo-600 dark:text-indigo-400 font-bold">${bidder} (Your Team)</span>`;
+        } else {
+            bidderElement.innerHTML = `<span class="text-indigo-600 dark:text-indigo-400 font-bold">${bidder}</span>`; 
+        }
+        
+        // c. इनपुट फ़ील्ड को नए मिनिमम बिड के साथ अपडेट करें
+        const newMinBid = newPrice + 100; // ₹100 का मिनिमम इंक्रीमेंट
+        const bidInput = document.getElementById(`bid-input-${auctionId}`);
+        if (bidInput) {
+            bidInput.min = newMinBid.toFixed(2);
+            // नए मिनिमम बिड को डिफ़ॉल्ट वैल्यू के रूप में सेट करें
+            if (bidInput.value < newMinBid) {
+                 bidInput.value = newMinBid.toFixed(2);
+            }
+            // लेबल को भी अपडेट करें
+            const labelElement = bidInput.previousElementSibling;
+            if (labelElement && labelElement.tagName === 'LABEL') {
+                 labelElement.textContent = `Your Bid (Min ${formatCurrency(newMinBid)}):`;
+            }
+        }
+    }
+    // नई डेडलाइन से काउंटडाउन फिर से शुरू करें
+    auctionClock.set(auctionId, data.ends_at);
+
+});
+
+// 3. Bid Status Feedback (सर्वर से केवल बिड लगाने वाले क्लाइंट को)
+socket.on('bid_status', function(data) {
+     const auctionId = data.auction_id;
+     if (data.success) {
+         showBidMessage(auctionId, data.message, 'green');
+     } else {
+         showBidMessage(auctionId, data.message, 'red');
+     }
+ });
+ 
+// 4. New Auction Alert 
+function addAuctionCard(data) {
+    const auctionList = document.getElementById('auction-list');
+    const noAuctionsMsg = auctionList.querySelector('.col-span-full');
+    if (noAuctionsMsg) {
+        noAuctionsMsg.remove();
+    }
+    const newCardHtml = createAuctionCard(data);
+    auctionList.insertAdjacentHTML('beforeend', newCardHtml);
+
+    auctionClock.set(data.id, data.ends_at);
+}
+
+socket.on('new_auction', addAuctionCard);
+
+// Bulk re-auction: one event with every restarted auction
+socket.on('auctions_restarted', function(data) {
+    data.auctions.forEach(addAuctionCard);
+});
+
+// 5. New Team Listener
+function addTeamChip(data) {
+    const teamList = document.getElementById('team-list');
+    const teamCountSpan = document.getElementById('team-count');
+    const noTeamsMsg = document.getElementById('no-teams-msg');
+
+    // "No teams" संदेश हटाएं यदि मौजूद है
+    if (noTeamsMsg) {
+        noTeamsMsg.remove();
+    }
+
+    // सूची में नई टीम जोड़ें
+    const newTeamLi = document.createElement('li');
+    newTeamLi.className = 'bg-purple-100 text-purple-800 dark:bg-purple-900 dark:text-purple-200 text-sm font-semibold px-3 py-1 rounded-full';
+    newTeamLi.textContent = data.name;
+    teamList.appendChild(newTeamLi);
+
+    // टीम गिनती अपडेट करें
+    teamCountSpan.textContent = parseInt(teamCountSpan.textContent) + 1;
+}
+
+socket.on('new_team_added', addTeamChip);
+
+// Bulk team upload: one event for the whole batch
+socket.on('teams_added', function(data) {
+    data.teams.forEach(addTeamChip);
+});
+
+// Bulk budget change by the admin
+socket.on('team_budgets_updated', function(data) {
+    const currentUserTeam = AUCTION_FEED.teamName;
+    const budgetEl = document.getElementById('team-budget');
+    data.teams.forEach(function(team) {
+        if (budgetEl && team.name === currentUserTeam) {
+            budgetEl.textContent = formatCurrency(team.budget);
+        }
+    });
+});
+
+// 6. Player Sold Listener
+ socket.on('player_sold', function(data) {
+    const auctionId = data.auction_id;
+    const auctionCard = document.getElementById(`auction-${auctionId}`);
+    if (auctionCard) {
+        auctionCard.innerHTML = `
+            <h3 class="text-xl font-extrabold text-green-700">${data.player_name}</h3>
+            <p class="text-center text-lg font-bold text-green-600">
+                SOLD to ${data.team_name} for ${formatCurrency(data.price)}
+            </p>
+        `;
+        auctionCard.classList.remove('border-gray-200', 'dark:border-gray-700');
+        auctionCard.classList.add('border-green-500', 'bg-green-50', 'dark:bg-green-900/50', 'dark:border-green-700');
+    }
+
+    // Update team budget if the current user is on the winning team
+    const currentUserTeam = AUCTION_FEED.teamName;
+    if (data.team_name === currentUserTeam) {
+        document.getElementById('team-budget').textContent = formatCurrency(data.new_budget);
+    }
+});
+
+// Listener for unsold players
+socket.on('player_unsold', function(data) {
+    const auctionId = data.auction_id;
+    const auctionCard = document.getElementById(`auction-${auctionId}`);
+    if (auctionCard) {
+        auctionCard.innerHTML = `
+            <h3 class="text-xl font-extrabold text-red-700">${data.player_name}</h3>
+            <p class="text-center text-lg font-bold text-red-600">UNSOLD</p>
+        `;
+        auctionCard.classList.remove('border-gray-200', 'dark:border-gray-700');
+        auctionCard.classList.add('border-red-500', 'bg-red-50', 'dark:bg-red-900/50', 'dark:border-red-700');
+    }
+});
+// Listener for activity history on connect
+socket.on('activity_history', function(history) {
+    const activityFeed = document.getElementById('activity-feed');
+    // Clear the "Waiting for bids..." message
+    activityFeed.innerHTML = '';
+    history.forEach(function(activity) {
+        const newActivity = document.createElement('li');
+        newActivity.className = 'text-sm p-2 bg-gray-100 dark:bg-gray-700 rounded-md';
+        newActivity.innerHTML = `${activity.message} <span class="text-gray-400 text-xs float-right">${activity.timestamp}</span>`;
+        activityFeed.appendChild(newActivity);
+    });
+});
+
+// 7. New Activity Listener
+socket.on('new_activity', function(data) {
+    const activityFeed = document.getElementById('activity-feed');
+    const newActivity = document.createElement('li');
+    newActivity.className = 'text-sm p-2 bg-gray-100 dark:bg-gray-700 rounded-md'; 
+    newActivity.innerHTML = `${data.message} <span class="text-gray-400 text-xs float-right">${data.timestamp}</span>`;
+    activityFeed.appendChild(newActivity); // सबसे नीचे नई गतिविधि जोड़ें
+    activityFeed.scrollTop = activityFeed.scrollHeight; // स्क्रॉल को नीचे रखें
+});
+
+// 8. Stats Update Listener
+socket.on('stats_update', function(data) {
+    document.getElementById('total-players').textContent = data.total_players;
+    document.getElementById('sold-players').textContent = data.sold_players;
+    document.getElementById('unsold-players').textContent = data.unsold_players;
+});
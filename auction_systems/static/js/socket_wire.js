@@ -0,0 +1,55 @@
+// Compact Socket.IO mode (SOCKETIO_COMPACT=1): frames are msgpack with short
+// keys and money in paise (see wire.py). The parser below expands incoming
+// events back to the usual payloads, so the page's handlers are unchanged.
+(function() {
+    const WIRE = window.SOCKET_WIRE;
+    const MONEY = new Set(WIRE.money);
+    const EVENT = 2;
+
+    function expand(value) {
+        if (Array.isArray(value)) return value.map(expand);
+        if (value && typeof value === 'object') {
+            const out = {};
+            for (const key in value) {
+                const name = WIRE.keys[key] || key;
+                out[name] = MONEY.has(name) && typeof value[key] === 'number' ? value[key] / 100 : expand(value[key]);
+            }
+            return out;
+        }
+        return value;
+    }
+
+    // socket.io-parser interface, same packet shape as python-socketio's msgpack serializer
+    class Encoder {
+        encode(packet) {
+            const out = {type: packet.type, data: packet.data, nsp: packet.nsp};
+            if (packet.id !== undefined) out.id = packet.id;
+            return [MessagePack.encode(out)];
+        }
+    }
+
+    class Decoder {
+        constructor() { this.listeners = []; }
+        on(event, fn) { if (event === 'decoded') this.listeners.push(fn); return this; }
+        off(event, fn) { this.listeners = fn ? this.listeners.filter(l => l !== fn) : []; return this; }
+        add(chunk) {
+            const packet = MessagePack.decode(new Uint8Array(chunk));
+            if (packet.nsp == null) packet.nsp = '/';
+            if (packet.id == null) delete packet.id;
+            if (packet.type === EVENT && Array.isArray(packet.data)) {
+                packet.data = [packet.data[0]].concat(packet.data.slice(1).map(expand));
+            }
+            this.listeners.forEach(fn => fn(packet));
+        }
+        destroy() { this.listeners = []; }
+    }
+
+    const baseIo = window.io;
+    window.io = function(uri, opts) {
+        if (uri && typeof uri === 'object') {
+            opts = uri;
+            uri = undefined;
+        }
+        return baseIo(uri, Object.assign({}, opts, {parser: {Encoder: Encoder, Decoder: Decoder}}));
+    };
+})();
@@ -0,0 +1,1126 @@
+# storage.py - storage interface for the auction app, with the SQLite and PostgreSQL backends
+
+import contextlib
+import functools
+import io
+import re
+
+# Tables whose rows belong to one auction event
+EVENT_TABLES = ('users', 'teams', 'auctions', 'activity_log')
+# Tables in a backup, parents first: restores load them in this order
+BACKUP_TABLES = ('events', 'system_settings', 'teams', 'users', 'auctions', 'sold_players', 'activity_log')
+# Rows per executemany() when a backup is loaded into SQLite
+RESTORE_BATCH = 1000
+# Rows per multi-row VALUES statement (SQLite limits the bound parameters of one statement)
+VALUES_BATCH = 1000
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+_COPY_SPECIAL_RE = re.compile(r'[\\\t\n\r]')
+_COPY_UNESCAPE_RE = re.compile(r'\\(.)')
+_COPY_CODES = {'t': '\t', 'n': '\n', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v'}
+
+
+def _copy_field(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, str):
+        # Most values need no escaping; a search is much cheaper than translate()
+        return value.translate(_COPY_ESCAPES) if _COPY_SPECIAL_RE.search(value) else value
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def copy_line(row):
+    """One row in PostgreSQL COPY text format: tab separated, \\N for NULL, newline terminated."""
+    return '\t'.join(map(_copy_field, row)) + '\n'
+
+
+def copy_values(line):
+    """The values of a copy_line() (all strings, None for NULL)."""
+    values = []
+    for field in line[:-1].split('\t') if line.endswith('\n') else line.split('\t'):
+        if field == '\\N':
+            values.append(None)
+        elif '\\' in field:
+            values.append(_COPY_UNESCAPE_RE.sub(lambda match: _COPY_CODES.get(match.group(1), match.group(1)), field))
+        else:
+            values.append(field)
+    return values
+
+
+class Storage:
+    """Everything app.py reads or writes: users, teams, auctions, sold_players,
+    activity_log, events and system_settings.
+
+    Rows come back as mappings (row['name']). Writes are not committed until
+    commit() (or the end of a transaction() block), so one request's writes
+    land together. Backends: SQLiteStorage, PostgresStorage and
+    memory_storage.MemoryStorage (no I/O, for simulations and load tests).
+    """
+
+    # Raised when a unique name (username, team or event name) is taken
+    IntegrityError = Exception
+    # Whether dump_tables() / load_tables() (backup and restore) are available
+    supports_backup = False
+
+    # --- Transactions ---
+
+    def commit(self):
+        raise NotImplementedError
+
+    def rollback(self):
+        raise NotImplementedError
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Commit on success, roll back if the block raises."""
+        try:
+            yield self
+            self.commit()
+        except BaseException:
+            self.rollback()
+            raise
+
+    def reader(self, stale_ok=False):
+        """Storage for read-only pages (may be served by a replica and lag slightly)."""
+        return self
+
+    # --- Schema, settings and events ---
+
+    def init_schema(self):
+        """Create or migrate tables; the first event is created if there is none."""
+        raise NotImplementedError
+
+    def load_settings(self):
+        """system_settings as a dict ({} before init_schema)."""
+        raise NotImplementedError
+
+    def set_setting(self, key, value):
+        raise NotImplementedError
+
+    def load_events(self):
+        """{event_id: {id, name, registration_open_until, default_team_budget, data_version}} ({} before init_schema)."""
+        raise NotImplementedError
+
+    def create_event(self, name, default_team_budget):
+        """Return the new event id."""
+        raise NotImplementedError
+
+    def update_event(self, event_id, **fields):
+        """Set registration_open_until and/or default_team_budget."""
+        raise NotImplementedError
+
+    def bump_data_version(self, event_ids):
+        """Mark the events' sales, teams or budgets as changed (invalidates cached exports)."""
+        raise NotImplementedError
+
+    # --- Users and teams ---
+
+    def get_user(self, username):
+        raise NotImplementedError
+
+    def get_user_by_id(self, user_id):
+        raise NotImplementedError
+
+    def add_user(self, username, password, role, is_approved=False, team_id=None, can_bid=False, event_id=None):
+        """Return the new user id."""
+        raise NotImplementedError
+
+    def add_players(self, rows):
+        """Insert (username, password, discord_name, base_price, game_level, event_id) rows
+        as approved bidders, skipping taken usernames; return {username: id} of the inserted."""
+        raise NotImplementedError
+
+    def get_bidding_user(self, username):
+        """The user row plus its team's `budget`, None if the user has no team."""
+        raise NotImplementedError
+
+    def add_team(self, name, budget, event_id):
+        """Return the new team id."""
+        raise NotImplementedError
+
+    def add_teams(self, rows, event_id):
+        """Insert (name, budget, password) rows as teams plus their bidder logins; return
+        id, name, budget of the new teams. Raises IntegrityError if a name is taken."""
+        raise NotImplementedError
+
+    def taken_team_names(self, names):
+        """The names among `names` already used by a team or a user."""
+        raise NotImplementedError
+
+    def get_team(self, team_id):
+        raise NotImplementedError
+
+    def list_teams(self, event_id):
+        """id, name, budget of an event's teams, by name."""
+        raise NotImplementedError
+
+    def team_budgets(self, team_ids):
+        """{team_id: budget}"""
+        raise NotImplementedError
+
+    def set_team_budget(self, team_id, budget):
+        """Return the updated team (id, name, budget, event_id), None if there is no such team."""
+        raise NotImplementedError
+
+    def update_team_budgets(self, event_id, budget=None, delta=None, team_ids=None):
+        """Set every team of an event (or just `team_ids`) to `budget`, or add `delta`
+        (never below zero); return id, name, budget of the updated teams."""
+        raise NotImplementedError
+
+    def team_rosters(self, event_id):
+        """id, name, budget and `members` (sold player names, comma separated or None) per team, by name."""
+        raise NotImplementedError
+
+    def sold_players(self, event_id):
+        """player_name, team_name, sold_price of an event's sales, by team then player."""
+        raise NotImplementedError
+
+    # --- Players and auctions ---
+
+    def players_ready(self, event_id):
+        """Registered players without an auction, newest first."""
+        raise NotImplementedError
+
+    def player_search_rows(self):
+        """Every registered player with the status of their auction (`auction_status`, None if none)."""
+        raise NotImplementedError
+
+    def get_auction(self, auction_id):
+        raise NotImplementedError
+
+    def auction_for_player(self, player_id):
+        raise NotImplementedError
+
+    def create_auction(self, title, price, event_id, player_id=None, ends_at=None):
+        """Create a live auction; return its id."""
+        raise NotImplementedError
+
+    def add_auctions(self, rows):
+        """Bulk-create live auctions from (title, price, player_id, event_id, leader_id, ends_at) rows."""
+        raise NotImplementedError
+
+    def restart_auction(self, auction_id, price, ends_at):
+        """Put an auction back live at `price` with no bidder."""
+        raise NotImplementedError
+
+    def update_auction_lead(self, auction_id, price, leader_id, ends_at):
+        raise NotImplementedError
+
+    def shift_live_deadlines(self, seconds):
+        """Move the ends_at of every live auction `seconds` later (a restored backup resuming)."""
+        raise NotImplementedError
+
+    def list_auctions(self, event_id, status=None, newest_first=False):
+        """Auctions with `highest_bidder_username`, by id."""
+        raise NotImplementedError
+
+    def unsold_auctions(self, event_id):
+        """Unsold auctions (by id) with their player's player_id, discord_name, base_price and game_level."""
+        raise NotImplementedError
+
+    def restart_auctions(self, rows):
+        """Batch restart_auction() from (auction_id, price, ends_at) rows; auctions no longer
+        'Unsold' are left alone. Returns the ids of the restarted auctions."""
+        raise NotImplementedError
+
+    def settle_auctions(self, end_ids, unsold_ids, now):
+        """Close expired live auctions: `end_ids` in any case, `unsold_ids` only without a bidder.
+
+        Auctions whose ends_at is still after `now` (a bid moved the deadline
+        after the timer fired) stay live. Sold players are recorded, assigned
+        to the team and charged to its budget.
+        Returns one dict per closed auction: auction_id, player_name, player_id,
+        winning_team_id, sold_price, team_name, new_budget, event_id.
+        """
+        raise NotImplementedError
+
+    def event_stats(self, event_id):
+        """{'total_players', 'sold_players', 'unsold_players'} of one event."""
+        raise NotImplementedError
+
+    # --- Activity log ---
+
+    def add_activity(self, entries):
+        """Append (message, timestamp, event_id) entries."""
+        raise NotImplementedError
+
+    def recent_activity(self, event_id, limit):
+        """The event's last `limit` entries as {'message', 'timestamp'}, oldest first."""
+        raise NotImplementedError
+
+    # --- Analytics ---
+
+    def sales_fingerprint(self, event_id):
+        """(sales, last sale id, unsold auctions, total team budget): changes whenever the report would."""
+        raise NotImplementedError
+
+    def analytics_inputs(self, event_id):
+        """(sales, teams, total_players) for analytics.build_report, rows as tuples."""
+        raise NotImplementedError
+
+    # --- Backup and restore ---
+
+    def dump_tables(self, open_table):
+        """Write one consistent snapshot of BACKUP_TABLES without holding up writers.
+
+        `open_table(table, columns)` returns the binary file that gets the table's
+        rows in PostgreSQL COPY text format (see copy_line).
+        """
+        raise NotImplementedError
+
+    def load_tables(self, tables):
+        """Replace the rows of every BACKUP_TABLES table with (table, columns, binary file)
+        entries written by dump_tables, in BACKUP_TABLES order. Not committed."""
+        raise NotImplementedError
+
+
+class SQLStorage(Storage):
+    """Shared SQL of the SQLite and PostgreSQL backends.
+
+    Connections and cursors come from the app (`connect`, `read_connect` and
+    `cursor`), so request-scoped connections, the tuned SQLite writer, the read
+    replica and query tracing work as before. Statements are written with {p}
+    for the driver's placeholder.
+    """
+
+    p = '?'
+    supports_backup = True
+
+    def __init__(self, connect, read_connect, cursor):
+        self._connect = connect
+        self._read_connect = read_connect
+        self._cursor_for = cursor
+
+    def reader(self, stale_ok=False):
+        return type(self)(functools.partial(self._read_connect, stale_ok=stale_ok), self._read_connect, self._cursor_for)
+
+    def commit(self):
+        self._connect().commit()
+
+    def rollback(self):
+        self._connect().rollback()
+
+    def _cursor(self):
+        return self._cursor_for(self._connect())
+
+    def _all(self, sql, params=()):
+        cur = self._cursor()
+        try:
+            cur.execute(sql.format(p=self.p), params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    def _one(self, sql, params=()):
+        cur = self._cursor()
+        try:
+            cur.execute(sql.format(p=self.p), params)
+            return cur.fetchone()
+        finally:
+            cur.close()
+
+    def _execute(self, sql, params=()):
+        cur = self._cursor()
+        try:
+            cur.execute(sql.format(p=self.p), params)
+            return cur.rowcount
+        finally:
+            cur.close()
+
+    def _executemany(self, sql, rows):
+        if not rows:
+            return
+        cur = self._cursor()
+        try:
+            cur.executemany(sql.format(p=self.p), rows)
+        finally:
+            cur.close()
+
+    def _insert(self, sql, params):
+        """Run an INSERT and return the new row's id."""
+        raise NotImplementedError
+
+    def _in(self, values):
+        """(SQL condition tail, params) for `column IN values`."""
+        return f"IN ({', '.join('?' * len(values))})", list(values)
+
+    def _missing_table(self, error):
+        """True if `error` says the queried table does not exist (a database before init_schema)."""
+        raise NotImplementedError
+
+    def _table_columns(self, table):
+        cur = self._cursor()
+        try:
+            cur.execute(f"SELECT * FROM {table} LIMIT 0")
+            return [column[0] for column in cur.description]
+        finally:
+            cur.close()
+
+    def _check_backup_tables(self, tables):
+        """Raise ValueError unless `tables` are BACKUP_TABLES in order, each with exactly the
+        live table's columns in the live order. Table and column names from an archive end
+        up in INSERT / COPY statements, so only names this database already has get there."""
+        if [table for table, _, _ in tables] != list(BACKUP_TABLES):
+            raise ValueError(f"The backup must hold the tables {', '.join(BACKUP_TABLES)} in that order.")
+        for table, columns, _ in tables:
+            live = self._table_columns(table)
+            if list(columns) != live:
+                raise ValueError(f"The backup's {table} columns do not match this database's ({', '.join(live)}).")
+
+    # --- Schema, settings and events ---
+
+    def load_settings(self):
+        try:
+            return {row['key']: row['value'] for row in self._all("SELECT key, value FROM system_settings")}
+        except Exception as e:
+            self.rollback()
+            if not self._missing_table(e):
+                raise
+            # system_settings does not exist yet
+            return {}
+
+    def set_setting(self, key, value):
+        self._execute(
+            "INSERT INTO system_settings (key, value) VALUES ({p}, {p}) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, value))
+        self._settings_changed()
+
+    def load_events(self):
+        try:
+            rows = self._all("SELECT id, name, registration_open_until, default_team_budget, data_version FROM events ORDER BY id")
+        except Exception as e:
+            self.rollback()
+            if not self._missing_table(e):
+                raise
+            # events does not exist yet
+            return {}
+        return {row['id']: dict(row) for row in rows}
+
+    def create_event(self, name, default_team_budget):
+        event_id = self._insert("INSERT INTO events (name, default_team_budget) VALUES ({p}, {p})", (name, default_team_budget))
+        self._settings_changed()
+        return event_id
+
+    def update_event(self, event_id, **fields):
+        columns = [column for column in ('registration_open_until', 'default_team_budget') if column in fields]
+        assignments = ', '.join(f"{column} = {{p}}" for column in columns)
+        self._execute(f"UPDATE events SET {assignments} WHERE id = {{p}}", [fields[column] for column in columns] + [event_id])
+        self._settings_changed()
+
+    def bump_data_version(self, event_ids):
+        if not event_ids:
+            return
+        condition, params = self._in(sorted(set(event_ids)))
+        self._execute(f"UPDATE events SET data_version = data_version + 1 WHERE id {condition}", params)
+        self._settings_changed()
+
+    def _settings_changed(self):
+        """Called in the transaction that changed system_settings or events."""
+
+    # --- Users and teams ---
+
+    def get_user(self, username):
+        return self._one("SELECT * FROM users WHERE username = {p}", (username,))
+
+    def get_user_by_id(self, user_id):
+        return self._one("SELECT * FROM users WHERE id = {p}", (user_id,))
+
+    def add_user(self, username, password, role, is_approved=False, team_id=None, can_bid=False, event_id=None):
+        return self._insert(
+            "INSERT INTO users (username, password, role, is_approved, team_id, can_bid, event_id) VALUES ({p}, {p}, {p}, {p}, {p}, {p}, {p})",
+            (username, password, role, self._flag(is_approved), team_id, self._flag(can_bid), event_id))
+
+    def _flag(self, value):
+        # users.is_approved / can_bid are INTEGER columns on both databases
+        return 1 if value else 0
+
+    def add_players(self, rows):
+        if not rows:
+            return {}
+        values = ', '.join(["({p}, {p}, 'bidder', 1, {p}, {p}, {p}, {p})"] * len(rows))
+        inserted = self._all(f"""
+            INSERT INTO users (username, password, role, is_approved, discord_name, base_price, game_level, event_id)
+            VALUES {values}
+            ON CONFLICT (username) DO NOTHING
+            RETURNING id, username
+        """, [value for row in rows for value in row])
+        return {row['username']: row['id'] for row in inserted}
+
+    def get_bidding_user(self, username):
+        return self._one("SELECT u.*, t.budget FROM users u JOIN teams t ON u.team_id = t.id WHERE u.username = {p}", (username,))
+
+    def add_team(self, name, budget, event_id):
+        return self._insert("INSERT INTO teams (name, budget, event_id) VALUES ({p}, {p}, {p})", (name, budget, event_id))
+
+    def add_teams(self, rows, event_id):
+        if not rows:
+            return []
+        values = ', '.join(["({p}, {p}, {p})"] * len(rows))
+        teams = self._all(f"INSERT INTO teams (name, budget, event_id) VALUES {values} RETURNING id, name, budget",
+                          [value for name, budget, _ in rows for value in (name, budget, event_id)])
+        team_ids = {team['name']: team['id'] for team in teams}
+        values = ', '.join(["({p}, {p}, 'bidder', 1, {p}, 1, {p})"] * len(rows))
+        self._execute(f"INSERT INTO users (username, password, role, is_approved, team_id, can_bid, event_id) VALUES {values}",
+                      [value for name, _, password in rows for value in (name, password, team_ids[name], event_id)])
+        teams.sort(key=lambda team: team['id'])
+        return teams
+
+    def taken_team_names(self, names):
+        if not names:
+            return set()
+        condition, params = self._in(names)
+        rows = self._all(f"SELECT name FROM teams WHERE name {condition} UNION SELECT username FROM users WHERE username {condition}",
+                         params + params)
+        return {row['name'] for row in rows}
+
+    def get_team(self, team_id):
+        return self._one("SELECT id, name, budget, event_id FROM teams WHERE id = {p}", (team_id,))
+
+    def list_teams(self, event_id):
+        return self._all("SELECT id, name, budget FROM teams WHERE event_id = {p} ORDER BY name", (event_id,))
+
+    def team_budgets(self, team_ids):
+        if not team_ids:
+            return {}
+        condition, params = self._in(team_ids)
+        return {row['id']: row['budget'] for row in self._all(f"SELECT id, budget FROM teams WHERE id {condition}", params)}
+
+    def set_team_budget(self, team_id, budget):
+        return self._one("UPDATE teams SET budget = {p} WHERE id = {p} RETURNING id, name, budget, event_id", (budget, team_id))
+
+    def update_team_budgets(self, event_id, budget=None, delta=None, team_ids=None):
+        if budget is not None:
+            assignment, params = "budget = {p}", [budget]
+        else:
+            assignment, params = "budget = CASE WHEN budget + {p} < 0 THEN 0 ELSE budget + {p} END", [delta, delta]
+        sql = f"UPDATE teams SET {assignment} WHERE event_id = {{p}}"
+        params.append(event_id)
+        if team_ids is not None:
+            if not team_ids:
+                return []
+            condition, id_params = self._in(team_ids)
+            sql += f" AND id {condition}"
+            params += id_params
+        return sorted(self._all(sql + " RETURNING id, name, budget", params), key=lambda team: team['name'])
+
+    def team_rosters(self, event_id):
+        return self._all("""
+            SELECT
+                t.id,
+                t.name,
+                t.budget,
+                (
+                    SELECT GROUP_CONCAT(sp.player_name, ', ')
+                    FROM sold_players sp
+                    WHERE sp.winning_team_id = t.id
+                ) as members
+            FROM teams t
+            WHERE t.event_id = {p}
+            ORDER BY t.name
+        """, (event_id,))
+
+    def sold_players(self, event_id):
+        return self._all("""
+            SELECT sp.player_name, t.name as team_name, sp.sold_price
+            FROM sold_players sp
+            JOIN teams t ON sp.winning_team_id = t.id
+            WHERE t.event_id = {p}
+            ORDER BY t.name, sp.player_name
+        """, (event_id,))
+
+    # --- Players and auctions ---
+
+    def players_ready(self, event_id):
+        return self._all("""
+            SELECT u.id, u.username, u.discord_name, u.base_price, u.game_level
+            FROM users u LEFT JOIN auctions a ON a.player_id = u.id
+            WHERE u.role = 'bidder' AND a.id IS NULL AND u.base_price IS NOT NULL AND u.event_id = {p}
+            ORDER BY u.id DESC
+        """, (event_id,))
+
+    def player_search_rows(self):
+        return self._all("""
+            SELECT u.id, u.username, u.discord_name, u.base_price, u.game_level, u.event_id, a.status AS auction_status
+            FROM users u LEFT JOIN auctions a ON a.player_id = u.id
+            WHERE u.role = 'bidder' AND u.base_price IS NOT NULL
+        """)
+
+    def get_auction(self, auction_id):
+        return self._one("SELECT * FROM auctions WHERE id = {p}", (auction_id,))
+
+    def auction_for_player(self, player_id):
+        return self._one("SELECT * FROM auctions WHERE player_id = {p}", (player_id,))
+
+    def create_auction(self, title, price, event_id, player_id=None, ends_at=None):
+        return self._insert(
+            "INSERT INTO auctions (title, current_price, status, player_id, event_id, ends_at) VALUES ({p}, {p}, 'live', {p}, {p}, {p})",
+            (title, price, player_id, event_id, ends_at))
+
+    def add_auctions(self, rows):
+        self._executemany(
+            "INSERT INTO auctions (title, current_price, status, player_id, event_id, highest_bidding_team_id, ends_at) VALUES ({p}, {p}, 'live', {p}, {p}, {p}, {p})",
+            list(rows))
+
+    def restart_auction(self, auction_id, price, ends_at):
+        self._execute(
+            "UPDATE auctions SET status = 'live', current_price = {p}, highest_bidding_team_id = NULL, ends_at = {p} WHERE id = {p}",
+            (price, ends_at, auction_id))
+
+    def update_auction_lead(self, auction_id, price, leader_id, ends_at):
+        self._execute(
+            "UPDATE auctions SET current_price = {p}, highest_bidding_team_id = {p}, ends_at = {p} WHERE id = {p}",
+            (price, leader_id, ends_at, auction_id))
+
+    def shift_live_deadlines(self, seconds):
+        self._execute("UPDATE auctions SET ends_at = ends_at + {p} WHERE status = 'live' AND ends_at IS NOT NULL", (seconds,))
+
+    def list_auctions(self, event_id, status=None, newest_first=False):
+        condition = " AND a.status = {p}" if status else ""
+        params = (event_id, status) if status else (event_id,)
+        return self._all(f"""
+            SELECT a.id, a.title, a.current_price, a.status, a.ends_at, a.highest_bidding_team_id,
+                   t.name as highest_bidder_username
+            FROM auctions a
+            LEFT JOIN teams t ON a.highest_bidding_team_id = t.id
+            WHERE a.event_id = {{p}}{condition}
+            ORDER BY a.id {'DESC' if newest_first else 'ASC'}
+        """, params)
+
+    def unsold_auctions(self, event_id):
+        return self._all("""
+            SELECT a.id, a.title, a.player_id, u.discord_name, u.base_price, u.game_level
+            FROM auctions a
+            JOIN users u ON a.player_id = u.id
+            WHERE a.status = 'Unsold' AND a.event_id = {p}
+            ORDER BY a.id
+        """, (event_id,))
+
+    def restart_auctions(self, rows):
+        # One UPDATE ... FROM (VALUES ...) per VALUES_BATCH rows instead of a statement per row
+        restarted = []
+        for start in range(0, len(rows), VALUES_BATCH):
+            batch = rows[start:start + VALUES_BATCH]
+            restarted += [row['id'] for row in self._all(f"""
+                WITH v (id, price, ends_at) AS (VALUES {', '.join(['({p}, {p}, {p})'] * len(batch))})
+                UPDATE auctions
+                SET status = 'live', current_price = v.price, highest_bidding_team_id = NULL, ends_at = v.ends_at
+                FROM v
+                WHERE auctions.id = v.id AND auctions.status = 'Unsold'
+                RETURNING auctions.id
+            """, [value for row in batch for value in row])]
+        return restarted
+
+    def event_stats(self, event_id):
+        row = self._one("""
+            SELECT
+                (SELECT COUNT(id) FROM users WHERE role = 'bidder' AND base_price IS NOT NULL AND event_id = {p}) AS total_players,
+                (SELECT COUNT(id) FROM auctions WHERE status = 'Sold' AND event_id = {p}) AS sold_players,
+                (SELECT COUNT(id) FROM auctions WHERE status = 'Unsold' AND event_id = {p}) AS unsold_players
+        """, (event_id,) * 3)
+        return {'total_players': row['total_players'], 'sold_players': row['sold_players'], 'unsold_players': row['unsold_players']}
+
+    # --- Activity log ---
+
+    def add_activity(self, entries):
+        self._executemany("INSERT INTO activity_log (message, timestamp, event_id) VALUES ({p}, {p}, {p})", list(entries))
+
+    def recent_activity(self, event_id, limit):
+        rows = self._all("SELECT message, timestamp FROM activity_log WHERE event_id = {p} ORDER BY id DESC LIMIT {p}", (event_id, limit))
+        return [{'message': row['message'], 'timestamp': row['timestamp']} for row in reversed(rows)]
+
+    # --- Analytics ---
+
+    def sales_fingerprint(self, event_id):
+        row = self._one("""
+            SELECT
+                (SELECT COUNT(sp.id) FROM sold_players sp JOIN teams t ON t.id = sp.winning_team_id WHERE t.event_id = {p}) AS sales,
+                (SELECT MAX(sp.id) FROM sold_players sp JOIN teams t ON t.id = sp.winning_team_id WHERE t.event_id = {p}) AS last_sale_id,
+                (SELECT COUNT(id) FROM auctions WHERE status = 'Unsold' AND event_id = {p}) AS unsold,
+                (SELECT COALESCE(SUM(budget), 0) FROM teams WHERE event_id = {p}) AS budget_total
+        """, (event_id,) * 4)
+        return (row['sales'], row['last_sale_id'], row['unsold'], row['budget_total'])
+
+    def analytics_inputs(self, event_id):
+        sales = self._all("""
+            SELECT sp.winning_team_id, sp.sold_price, u.base_price, u.game_level
+            FROM sold_players sp
+            JOIN teams t ON t.id = sp.winning_team_id
+            LEFT JOIN users u ON u.id = sp.player_id
+            WHERE t.event_id = {p}
+        """, (event_id,))
+        teams = self._all("SELECT id, name, budget FROM teams WHERE event_id = {p}", (event_id,))
+        total_players = self._one("SELECT COUNT(id) AS n FROM users WHERE role = 'bidder' AND base_price IS NOT NULL AND event_id = {p}", (event_id,))['n']
+        return ([(row['winning_team_id'], row['sold_price'], row['base_price'], row['game_level']) for row in sales],
+                [(row['id'], row['name'], row['budget']) for row in teams],
+                total_players)
+
+    # --- Migrations shared by both databases ---
+
+    def _backfill_player_ids(self, cur):
+        """Fill auctions/sold_players.player_id from the legacy username link and index it."""
+        cur.execute("""
+            UPDATE auctions SET player_id = (SELECT u.id FROM users u WHERE u.username = auctions.title)
+            WHERE player_id IS NULL
+        """)
+        cur.execute("""
+            UPDATE sold_players SET player_id = (SELECT u.id FROM users u WHERE u.username = sold_players.player_name)
+            WHERE player_id IS NULL
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_auctions_player_id ON auctions (player_id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_sold_players_player_id ON sold_players (player_id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_sold_players_winning_team_id ON sold_players (winning_team_id)")
+
+    def _backfill_event_ids(self, cur):
+        """Put rows from before auction events existed into the first event and index event_id."""
+        # The admin account stays outside any event
+        for table in EVENT_TABLES:
+            condition = "event_id IS NULL AND role <> 'admin'" if table == 'users' else "event_id IS NULL"
+            cur.execute(f"UPDATE {table} SET event_id = (SELECT MIN(id) FROM events) WHERE {condition}")
+            cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_event_id ON {table} (event_id)")
+
+
+class SQLiteStorage(SQLStorage):
+    """auction.db, plain or through the tuned engine (sqlite_writer.py)."""
+
+    def __init__(self, connect, read_connect, cursor):
+        super().__init__(connect, read_connect, cursor)
+        import sqlite3
+        self.IntegrityError = sqlite3.IntegrityError
+
+    def _insert(self, sql, params):
+        cur = self._cursor()
+        try:
+            cur.execute(sql.format(p=self.p), params)
+            return cur.lastrowid
+        finally:
+            cur.close()
+
+    def _missing_table(self, error):
+        import sqlite3
+        return isinstance(error, sqlite3.OperationalError) and 'no such table' in str(error)
+
+    def settle_auctions(self, end_ids, unsold_ids, now):
+        # A few batched statements, same result rows as PostgresStorage.SETTLE_AUCTIONS
+        ids = end_ids + unsold_ids
+        cur = self._cursor()
+        try:
+            cur.execute(f"""
+                SELECT id, title, player_id, highest_bidding_team_id, current_price, event_id
+                FROM auctions
+                WHERE status = 'live' AND id IN ({', '.join('?' * len(ids))}) AND (ends_at IS NULL OR ends_at <= ?)
+                ORDER BY id
+            """, ids + [now])
+            end_set = set(end_ids)
+            closing = [row for row in cur.fetchall() if row['id'] in end_set or row['highest_bidding_team_id'] is None]
+            if not closing:
+                return []
+
+            sold = [row for row in closing if row['highest_bidding_team_id'] is not None]
+            cur.executemany("UPDATE auctions SET status = ? WHERE id = ? AND status = 'live'",
+                            [('Sold' if row['highest_bidding_team_id'] is not None else 'Unsold', row['id']) for row in closing])
+            if sold:
+                cur.executemany("INSERT INTO sold_players (player_name, winning_team_id, sold_price, player_id) VALUES (?, ?, ?, ?)",
+                                [(row['title'], row['highest_bidding_team_id'], row['current_price'], row['player_id']) for row in sold])
+            assigned = [(row['highest_bidding_team_id'], row['player_id']) for row in sold if row['player_id'] is not None]
+            if assigned:
+                cur.executemany("UPDATE users SET team_id = ? WHERE id = ?", assigned)
+            spent = {}
+            for row in sold:
+                spent[row['highest_bidding_team_id']] = spent.get(row['highest_bidding_team_id'], 0) + row['current_price']
+
+            teams = {}
+            if spent:
+                cur.executemany("UPDATE teams SET budget = budget - ? WHERE id = ?", [(amount, team_id) for team_id, amount in spent.items()])
+                team_ids = list(spent)
+                cur.execute(f"SELECT id, name, budget FROM teams WHERE id IN ({', '.join('?' * len(team_ids))})", team_ids)
+                teams = {row['id']: row for row in cur.fetchall()}
+        finally:
+            cur.close()
+
+        results = []
+        for row in closing:
+            team = teams.get(row['highest_bidding_team_id'])
+            results.append({
+                'auction_id': row['id'],
+                'player_name': row['title'],
+                'player_id': row['player_id'],
+                'winning_team_id': row['highest_bidding_team_id'],
+                'sold_price': row['current_price'],
+                'team_name': team['name'] if team else None,
+                'new_budget': team['budget'] if team else None,
+                'event_id': row['event_id'],
+            })
+        return results
+
+    def init_schema(self):
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT NOT NULL UNIQUE,
+                password TEXT NOT NULL,
+                role TEXT NOT NULL, -- 'admin', 'bidder'
+                is_approved INTEGER NOT NULL DEFAULT 0,
+                team_id INTEGER,
+                can_bid INTEGER DEFAULT 0,
+                discord_name TEXT,
+                base_price REAL,
+                game_level TEXT,
+                FOREIGN KEY (team_id) REFERENCES teams (id)
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS teams (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE,
+                budget REAL NOT NULL DEFAULT 0
+            )
+        """)
+        # Check if 'budget' column exists in 'teams' table and add it if not
+        cursor_pragma = conn.execute("PRAGMA table_info(teams)")
+        columns = [col[1] for col in cursor_pragma.fetchall()]
+        if 'budget' not in columns:
+            cur.execute("ALTER TABLE teams ADD COLUMN budget REAL NOT NULL DEFAULT 0")
+            print("Added 'budget' column to 'teams' table.") # For debugging
+
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS auctions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                current_price REAL NOT NULL,
+                highest_bidding_team_id INTEGER,
+                status TEXT NOT NULL, -- 'live' or 'closed'
+                player_id INTEGER,
+                FOREIGN KEY (highest_bidding_team_id) REFERENCES teams (id),
+                FOREIGN KEY (player_id) REFERENCES users (id)
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS sold_players (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                player_name TEXT NOT NULL,
+                winning_team_id INTEGER NOT NULL,
+                sold_price REAL NOT NULL,
+                player_id INTEGER,
+                FOREIGN KEY (winning_team_id) REFERENCES teams (id),
+                FOREIGN KEY (player_id) REFERENCES users (id)
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS activity_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                message TEXT NOT NULL,
+                timestamp TEXT NOT NULL
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS system_settings (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        """)
+
+        # Add 'player_id' to tables created before integer player links existed
+        for table in ('auctions', 'sold_players'):
+            columns = [col[1] for col in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+            if 'player_id' not in columns:
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN player_id INTEGER REFERENCES users (id)")
+                print(f"Added 'player_id' column to '{table}' table.") # For debugging
+        self._backfill_player_ids(cur)
+
+        # Auction events (leagues), each with its own registration window and default budget
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE,
+                registration_open_until REAL NOT NULL DEFAULT 0,
+                default_team_budget REAL NOT NULL DEFAULT 100000
+            )
+        """)
+        # The pre-events single auction becomes the first event, keeping its settings
+        cur.execute("""
+            INSERT INTO events (name, registration_open_until, default_team_budget)
+            SELECT 'Main Event',
+                   COALESCE((SELECT CAST(value AS REAL) FROM system_settings WHERE key = 'registration_open_until'), 0),
+                   COALESCE((SELECT CAST(value AS REAL) FROM system_settings WHERE key = 'default_team_budget'), 100000)
+            WHERE NOT EXISTS (SELECT 1 FROM events)
+        """)
+        for table in EVENT_TABLES:
+            columns = [col[1] for col in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+            if 'event_id' not in columns:
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN event_id INTEGER REFERENCES events (id)")
+                print(f"Added 'event_id' column to '{table}' table.") # For debugging
+        self._backfill_event_ids(cur)
+        # Deadline of a live auction, so processes without its timer (spectator workers) can show it
+        columns = [col[1] for col in conn.execute("PRAGMA table_info(auctions)").fetchall()]
+        if 'ends_at' not in columns:
+            cur.execute("ALTER TABLE auctions ADD COLUMN ends_at REAL")
+            print("Added 'ends_at' column to 'auctions' table.") # For debugging
+        # Bumped whenever an event's sales, teams or budgets change; keys the export cache
+        columns = [col[1] for col in conn.execute("PRAGMA table_info(events)").fetchall()]
+        if 'data_version' not in columns:
+            cur.execute("ALTER TABLE events ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0")
+            print("Added 'data_version' column to 'events' table.") # For debugging
+        cur.close()
+
+    def dump_tables(self, open_table):
+        import os
+        import sqlite3
+        import tempfile
+        path = self._one("PRAGMA database_list")['file']
+        fd, copy_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            # The online backup API copies the file's pages in one read transaction
+            # (in WAL mode writers carry on meanwhile); rows are then read from the copy
+            source = sqlite3.connect(path, timeout=30)
+            target = sqlite3.connect(copy_path)
+            try:
+                source.backup(target)
+            finally:
+                source.close()
+            try:
+                for table in BACKUP_TABLES:
+                    cur = target.execute(f"SELECT * FROM {table} ORDER BY rowid")
+                    out = open_table(table, [column[0] for column in cur.description])
+                    for rows in iter(lambda: cur.fetchmany(RESTORE_BATCH), []):
+                        out.write(''.join(copy_line(row) for row in rows).encode('utf-8'))
+            finally:
+                target.close()
+        finally:
+            os.remove(copy_path)
+
+    def load_tables(self, tables):
+        self._check_backup_tables(tables)
+        cur = self._cursor()
+        try:
+            for table in reversed(BACKUP_TABLES):
+                cur.execute(f"DELETE FROM {table}")
+            for table, columns, data in tables:
+                sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+                batch = []
+                # Column affinity turns the numeric strings back into INTEGER / REAL values
+                for line in io.TextIOWrapper(data, encoding='utf-8', newline='\n'):
+                    batch.append(copy_values(line))
+                    if len(batch) == RESTORE_BATCH:
+                        cur.executemany(sql, batch)
+                        batch = []
+                if batch:
+                    cur.executemany(sql, batch)
+        finally:
+            cur.close()
+        self._settings_changed()
+
+
+class PostgresStorage(SQLStorage):
+    """DATABASE_URL (psycopg2). Setting and event changes are announced with NOTIFY."""
+
+    p = '%s'
+
+    # Close every expired auction in the batch with one statement. 'Unsold'-only
+    # ids (the no-bid timer) are skipped if a bid arrived in the meantime, and
+    # any auction whose deadline a bid moved past `now` stays live.
+    SETTLE_AUCTIONS = """
+        WITH closed AS (
+            UPDATE auctions
+            SET status = CASE WHEN highest_bidding_team_id IS NULL THEN 'Unsold' ELSE 'Sold' END
+            WHERE status = 'live'
+              AND (id = ANY(%s::int[]) OR (id = ANY(%s::int[]) AND highest_bidding_team_id IS NULL))
+              AND (ends_at IS NULL OR ends_at <= %s)
+            RETURNING id, title, player_id, highest_bidding_team_id, current_price, event_id
+        ), sold AS (
+            INSERT INTO sold_players (player_name, winning_team_id, sold_price, player_id)
+            SELECT title, highest_bidding_team_id, current_price, player_id
+            FROM closed WHERE highest_bidding_team_id IS NOT NULL
+        ), assigned AS (
+            UPDATE users u SET team_id = c.highest_bidding_team_id
+            FROM closed c
+            WHERE u.id = c.player_id AND c.highest_bidding_team_id IS NOT NULL
+        ), charged AS (
+            UPDATE teams t SET budget = t.budget - s.spent
+            FROM (
+                SELECT highest_bidding_team_id AS team_id, SUM(current_price) AS spent
+                FROM closed WHERE highest_bidding_team_id IS NOT NULL
+                GROUP BY highest_bidding_team_id
+            ) s
+            WHERE t.id = s.team_id
+            RETURNING t.id, t.name, t.budget
+        )
+        SELECT c.id AS auction_id, c.title AS player_name, c.player_id, c.highest_bidding_team_id AS winning_team_id,
+               c.current_price AS sold_price, ch.name AS team_name, ch.budget AS new_budget, c.event_id
+        FROM closed c
+        LEFT JOIN charged ch ON ch.id = c.highest_bidding_team_id
+        ORDER BY c.id
+    """
+
+    def __init__(self, connect, read_connect, cursor, settings_channel):
+        super().__init__(connect, read_connect, cursor)
+        import psycopg2
+        self.IntegrityError = psycopg2.IntegrityError
+        self._settings_channel = settings_channel
+
+    def reader(self, stale_ok=False):
+        return type(self)(functools.partial(self._read_connect, stale_ok=stale_ok), self._read_connect, self._cursor_for,
+                          self._settings_channel)
+
+    def _settings_changed(self):
+        # Delivered to every worker's listener when the transaction commits
+        self._execute(f"NOTIFY {self._settings_channel}")
+
+    def _insert(self, sql, params):
+        return self._one(sql + " RETURNING id", params)['id']
+
+    def _in(self, values):
+        return "= ANY({p})", [list(values)]
+
+    def _missing_table(self, error):
+        # undefined_table
+        return getattr(error, 'pgcode', None) == '42P01'
+
+    def team_rosters(self, event_id):
+        return self._all("""
+            SELECT t.id, t.name, t.budget, STRING_AGG(sp.player_name, ', ') as members
+            FROM teams t
+            LEFT JOIN sold_players sp ON sp.winning_team_id = t.id
+            WHERE t.event_id = {p}
+            GROUP BY t.id, t.name, t.budget
+            ORDER BY t.name
+        """, (event_id,))
+
+    def settle_auctions(self, end_ids, unsold_ids, now):
+        cur = self._cursor()
+        try:
+            cur.execute(self.SETTLE_AUCTIONS, (end_ids, unsold_ids, now))
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    def init_schema(self):
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id SERIAL PRIMARY KEY,
+                username TEXT NOT NULL UNIQUE,
+                password TEXT NOT NULL,
+                role TEXT NOT NULL,
+                is_approved INTEGER NOT NULL DEFAULT 0,
+                team_id INTEGER,
+                can_bid INTEGER DEFAULT 0,
+                discord_name TEXT,
+                base_price REAL,
+                game_level TEXT
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS teams (
+                id SERIAL PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE,
+                budget REAL NOT NULL DEFAULT 0
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS auctions (
+                id SERIAL PRIMARY KEY,
+                title TEXT NOT NULL,
+                current_price REAL NOT NULL,
+                highest_bidding_team_id INTEGER,
+                status TEXT NOT NULL,
+                player_id INTEGER REFERENCES users (id)
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS sold_players (
+                id SERIAL PRIMARY KEY,
+                player_name TEXT NOT NULL,
+                winning_team_id INTEGER NOT NULL,
+                sold_price REAL NOT NULL,
+                player_id INTEGER REFERENCES users (id)
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS activity_log (
+                id SERIAL PRIMARY KEY,
+                message TEXT NOT NULL,
+                timestamp TEXT NOT NULL
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS system_settings (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        """)
+        # Integer player links for databases created before player_id existed
+        cur.execute("ALTER TABLE auctions ADD COLUMN IF NOT EXISTS player_id INTEGER REFERENCES users (id)")
+        cur.execute("ALTER TABLE sold_players ADD COLUMN IF NOT EXISTS player_id INTEGER REFERENCES users (id)")
+        self._backfill_player_ids(cur)
+
+        # Add FOREIGN KEY constraints for PostgreSQL after tables are created.
+        # Look them up first: a failed ALTER would abort the whole transaction.
+        constraints = {
+            'fk_team_id': "ALTER TABLE users ADD CONSTRAINT fk_team_id FOREIGN KEY (team_id) REFERENCES teams (id)",
+            'fk_highest_bidding_team_id': "ALTER TABLE auctions ADD CONSTRAINT fk_highest_bidding_team_id FOREIGN KEY (highest_bidding_team_id) REFERENCES teams (id)",
+            'fk_winning_team_id': "ALTER TABLE sold_players ADD CONSTRAINT fk_winning_team_id FOREIGN KEY (winning_team_id) REFERENCES teams (id)",
+        }
+        cur.execute("SELECT conname FROM pg_constraint WHERE conname = ANY(%s)", (list(constraints),))
+        existing = {row[0] for row in cur.fetchall()}
+        for name, ddl in constraints.items():
+            if name not in existing:
+                cur.execute(ddl)
+
+        # Auction events (leagues), each with its own registration window and default budget
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id SERIAL PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE,
+                registration_open_until DOUBLE PRECISION NOT NULL DEFAULT 0,
+                default_team_budget REAL NOT NULL DEFAULT 100000
+            )
+        """)
+        # The pre-events single auction becomes the first event, keeping its settings
+        cur.execute("""
+            INSERT INTO events (name, registration_open_until, default_team_budget)
+            SELECT 'Main Event',
+                   COALESCE((SELECT CAST(value AS DOUBLE PRECISION) FROM system_settings WHERE key = 'registration_open_until'), 0),
+                   COALESCE((SELECT CAST(value AS REAL) FROM system_settings WHERE key = 'default_team_budget'), 100000)
+            WHERE NOT EXISTS (SELECT 1 FROM events)
+        """)
+        for table in EVENT_TABLES:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS event_id INTEGER REFERENCES events (id)")
+        self._backfill_event_ids(cur)
+        # Deadline of a live auction, so processes without its timer (spectator workers) can show it
+        cur.execute("ALTER TABLE auctions ADD COLUMN IF NOT EXISTS ends_at DOUBLE PRECISION")
+        # Bumped whenever an event's sales, teams or budgets change; keys the export cache
+        cur.execute("ALTER TABLE events ADD COLUMN IF NOT EXISTS data_version INTEGER NOT NULL DEFAULT 0")
+        cur.close()
+
+    def dump_tables(self, open_table):
+        conn = self._connect()
+        # A snapshot must start its own transaction; readers never block bidding
+        conn.rollback()
+        cur = self._cursor()
+        try:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            for table in BACKUP_TABLES:
+                cur.execute(f"SELECT * FROM {table} LIMIT 0")
+                columns = [column[0] for column in cur.description]
+                cur.copy_expert(f"COPY {table} ({', '.join(columns)}) TO STDOUT", open_table(table, columns))
+        finally:
+            cur.close()
+            conn.rollback()
+
+    def load_tables(self, tables):
+        self._check_backup_tables(tables)
+        cur = self._cursor()
+        try:
+            cur.execute(f"TRUNCATE {', '.join(BACKUP_TABLES)}")
+            for table, columns, data in tables:
+                cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", data)
+                if 'id' in columns:
+                    # Continue the id sequence after the restored rows
+                    cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}")
+        finally:
+            cur.close()
+        self._settings_changed()
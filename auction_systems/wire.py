@@ -0,0 +1,85 @@
+# wire.py - compact Socket.IO frames: msgpack, short field keys, money in integer paise
+
+from decimal import Decimal
+
+import msgpack
+from socketio import packet
+from socketio.msgpack_packet import MsgPackPacket
+
+# Every field the server sends over Socket.IO, with its short key. Keys not
+# listed pass through unchanged; the browser reverses the mapping
+# (templates/_socket_wire.html) so event handlers keep using the long names.
+SHORT_KEYS = {
+    'auction_id': 'a',
+    'bidder': 'b',
+    'base_price': 'bp',
+    'budget': 'bu',
+    'discord_name': 'd',
+    'ends_at': 'e',
+    'game_level': 'g',
+    'id': 'i',
+    'message': 'm',
+    'name': 'n',
+    'new_budget': 'nb',
+    'new_price': 'np',
+    'price': 'p',
+    'player_id': 'pi',
+    'player_name': 'pn',
+    'sold_players': 'sp',
+    'success': 's',
+    'team_name': 'tn',
+    'title': 'ti',
+    'total_players': 'tp',
+    'timestamp': 'ts',
+    'unsold_players': 'up',
+    'winning_team_id': 'w',
+}
+
+# Rupee amounts, sent as integer paise (minor units)
+MONEY_FIELDS = frozenset({'base_price', 'budget', 'new_budget', 'new_price', 'price'})
+
+
+def compact(value):
+    """Shorten dict keys and convert money fields, recursively."""
+    if isinstance(value, dict):
+        out = {}
+        for key, item in value.items():
+            if key in MONEY_FIELDS and isinstance(item, (int, float, Decimal)) and not isinstance(item, bool):
+                item = int(round(float(item) * 100))
+            else:
+                item = compact(item)
+            out[SHORT_KEYS.get(key, key)] = item
+        return out
+    if isinstance(value, (list, tuple)):
+        return [compact(item) for item in value]
+    return value
+
+
+def _default(obj):
+    # Decimal from PostgreSQL and similar numeric types
+    return float(obj)
+
+
+class CompactPacket(MsgPackPacket):
+    """python-socketio serializer: msgpack frames with compacted event payloads.
+
+    Broadcasts without callbacks are encoded once for all recipients by the
+    client manager, so the compaction cost is paid once per emit.
+    """
+
+    dumps_default = staticmethod(_default)
+
+    def encode(self):
+        d = self._to_dict()
+        if self.packet_type == packet.EVENT and self.data:
+            # Incoming client events are decoded untouched; only what we send is compacted
+            d['data'] = [self.data[0]] + compact(self.data[1:])
+        return msgpack.dumps(d, default=self.__class__.dumps_default)
+
+
+def client_schema():
+    """What the browser needs to expand compact payloads (rendered into templates)."""
+    return {
+        'keys': {short: long for long, short in SHORT_KEYS.items()},
+        'money': sorted(MONEY_FIELDS),
+    }